@@ -0,0 +1,74 @@
+"""
+GistHub.query over a large synthetic gist list.
+
+Compares the old filter-everything query against the tag index.
+
+    python benchmarks/bench_gist_query.py
+"""
+import random
+import timeit
+from types import SimpleNamespace
+
+from nbx.nbmanager.tagged_gist.gisthub import GistHub, TaggedGist
+
+
+def make_gisthub(n, ntags=200, seed=0):
+    rng = random.Random(seed)
+    tags = ['#tag{0}'.format(i) for i in range(ntags)]
+    gists = {}
+    for i in range(n):
+        gist_tags = rng.sample(tags, rng.randint(0, 4))
+        if rng.random() < .8:
+            gist_tags.append('#notebook')
+        if rng.random() < .1:
+            gist_tags.append('#inactive')
+        desc = "gist {0} {1}".format(i, " ".join(gist_tags))
+        gist = SimpleNamespace(id=str(i), description=desc)
+        gists[gist.id] = TaggedGist.from_gist(gist)
+
+    gh = GistHub(SimpleNamespace(get_user=lambda: None))
+    gh._tagged_gists = gists
+    return gh
+
+
+def scan_query(gh, tag=None, active=True, filter_tag=None, drop_filter=True):
+    # the pre-index implementation
+    gists = gh._tagged_gists.values()
+    gists = gh._filter_active(gists, active)
+    filter_tag = gh._normalize_tag(filter_tag)
+    if filter_tag:
+        gists = gh._filter_tag(gists, filter_tag)
+    if not drop_filter:
+        filter_tag = None
+    return gh._select_tag(gists, tag, filter_tag=filter_tag)
+
+
+def main(n=10000, number=20):
+    gh = make_gisthub(n)
+    queries = [
+        # what GistNotebookManager.gist_query issues per listing
+        {'filter_tag': '#notebook'},
+        {'active': False, 'filter_tag': '#notebook'},
+        {'tag': '#tag7', 'filter_tag': '#notebook'},
+    ]
+
+    for kwargs in queries:
+        assert gh.query(**kwargs) == scan_query(gh, **kwargs)
+
+    print("{0} gists".format(n))
+    def cold_query(**kwargs):
+        # drop memoized results so we time the set operations
+        gh._index._memo.clear()
+        return gh.query(**kwargs)
+
+    for kwargs in queries:
+        for name, func in [('scan', lambda: scan_query(gh, **kwargs)),
+                           ('cold', lambda: cold_query(**kwargs)),
+                           ('index', lambda: gh.query(**kwargs))]:
+            elapsed = min(timeit.repeat(func, number=number, repeat=3))
+            print("{name:>6} {kwargs}: {ms:8.2f} ms/query".format(
+                name=name, kwargs=kwargs, ms=elapsed / number * 1e3))
+
+
+if __name__ == '__main__':
+    main()
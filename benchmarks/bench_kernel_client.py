@@ -0,0 +1,67 @@
+"""
+Round trip latency of KernelClient.execute against a live kernel.
+
+Compares the old polling loop (busy wait on the shell channel, 100ms sleep
+before each iopub read) with the blocking, msg_id matched run_cell.
+
+    python benchmarks/bench_kernel_client.py
+"""
+import time
+import resource
+from queue import Empty
+
+from jupyter_client.manager import start_new_kernel
+
+from nbx.kernel_client import run_cell
+
+
+def legacy_run_cell(client, cell):
+    # the old loop, ported to the current client api
+    msg_id = client.execute(cell)
+    while True:
+        try:
+            reply = client.get_shell_msg(timeout=0)
+        except Empty:
+            continue
+        if reply['parent_header'].get('msg_id') == msg_id:
+            break
+
+    data = None
+    while True:
+        time.sleep(.1)
+        sub_msg = client.get_iopub_msg()
+        if sub_msg['parent_header'].get('msg_id') != msg_id:
+            continue
+        msg_type = sub_msg['header']['msg_type']
+        if msg_type == 'execute_result':
+            data = sub_msg['content']['data']
+        if (msg_type == 'status' and
+                sub_msg['content']['execution_state'] == 'idle'):
+            return data
+
+
+def cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def main(n=20):
+    km, client = start_new_kernel()
+    try:
+        for name, func in [('legacy', legacy_run_cell), ('run_cell', run_cell)]:
+            # warm up
+            assert func(client, "'123'") == {'text/plain': "'123'"}
+            start, cpu = time.perf_counter(), cpu_time()
+            for i in range(n):
+                func(client, "'123'")
+            elapsed = (time.perf_counter() - start) / n * 1e3
+            cpu = (cpu_time() - cpu) / n * 1e3
+            print("{name:>8}: {elapsed:8.2f} ms/call {cpu:8.2f} ms cpu/call"
+                  .format(name=name, elapsed=elapsed, cpu=cpu))
+    finally:
+        client.stop_channels()
+        km.shutdown_kernel(now=True)
+
+
+if __name__ == '__main__':
+    main()
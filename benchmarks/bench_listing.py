@@ -0,0 +1,83 @@
+"""
+Directory listing cost for BundleNotebookManager.
+
+Builds a directory with a mix of bundles, plain dirs, notebooks and files and
+compares the old os.walk + FileContentsManager listing against the single
+scandir pass. The listing cache is cleared between runs so this measures the
+uncached path.
+
+    python benchmarks/bench_listing.py [n_entries]
+"""
+import os
+import sys
+import time
+import tempfile
+
+from notebook.services.contents.filemanager import FileContentsManager
+
+from nbx.nbmanager.bundle.bundlenbmanager import BundleNotebookManager
+from nbx.nbmanager.bundle.manager import is_notebook
+
+
+def make_tree(root, n):
+    for i in range(n):
+        kind = i % 4
+        if kind == 0:
+            name = 'bundle{0}.ipynb'.format(i)
+            os.mkdir(os.path.join(root, name))
+            with open(os.path.join(root, name, name), 'w') as f:
+                f.write('{}')
+        elif kind == 1:
+            os.mkdir(os.path.join(root, 'dir{0}'.format(i)))
+        elif kind == 2:
+            with open(os.path.join(root, 'nb{0}.ipynb'.format(i)), 'w') as f:
+                f.write('{}')
+        else:
+            with open(os.path.join(root, 'file{0}.txt'.format(i)), 'w') as f:
+                f.write('data')
+
+
+def legacy_listing(root):
+    # what list_dirs/list_notebooks/list_files used to do
+    fm = FileContentsManager(root_dir=root)
+    _, dirs, _ = next(os.walk(root))
+    [d for d in dirs if not is_notebook(os.path.join(root, d))]
+    _, dirs, _ = next(os.walk(root))
+    [d for d in dirs if is_notebook(os.path.join(root, d))]
+    fm.get(path='', content=True)
+    fm.get(path='', content=True)
+
+
+def scan_listing(mgr):
+    mgr.listing_cache.clear()
+    mgr.list_dirs('')
+    mgr.list_notebooks('')
+    mgr.list_files('')
+
+
+def timeit(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(n=4000):
+    with tempfile.TemporaryDirectory() as root:
+        make_tree(root, n)
+        mgr = BundleNotebookManager(root_dir=root)
+        legacy = timeit(lambda: legacy_listing(root))
+        scan = timeit(lambda: scan_listing(mgr))
+        cached = timeit(lambda: (mgr.list_dirs(''), mgr.list_notebooks(''),
+                                 mgr.list_files('')))
+        print("entries: {0}".format(n))
+        print("  legacy: {0:8.1f} ms".format(legacy * 1000))
+        print("    scan: {0:8.1f} ms".format(scan * 1000))
+        print("  cached: {0:8.1f} ms".format(cached * 1000))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
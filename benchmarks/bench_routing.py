@@ -0,0 +1,58 @@
+"""
+Per-call overhead of MetaManager path routing.
+
+Compares the old split-per-call routing against PathRouter.
+
+    python benchmarks/bench_routing.py
+"""
+import os
+import timeit
+
+from nbx.nbmanager.routing import PathRouter, ManagerMeta
+
+
+def legacy_nbm_from_path(managers, path):
+    # the pre-PathRouter implementation, minus the debug prints
+    path = path.strip('/')
+    meta = ManagerMeta()
+    if not path:
+        meta.request_path = path
+        meta.path = ''
+        meta.nbm_path = ''
+        return None, meta
+
+    bits = path.split(os.sep)
+    manager_path = bits.pop(0)
+    local_path = os.sep.join(bits)
+
+    meta.request_path = path
+    meta.path = local_path
+    meta.nbm_path = manager_path
+    return managers.get(manager_path), meta
+
+
+def main(number=200000):
+    managers = {'alias{0}'.format(i): object() for i in range(20)}
+    router = PathRouter(managers)
+    paths = ['alias{0}/dir/sub/notebook{1}.ipynb'.format(i % 20, i)
+             for i in range(100)]
+
+    def legacy():
+        for path in paths:
+            legacy_nbm_from_path(managers, path)
+
+    def routed():
+        for path in paths:
+            router.resolve(path)
+
+    loops = number // len(paths)
+    for name, func in [('legacy', legacy), ('router', routed)]:
+        elapsed = min(timeit.repeat(func, number=loops, repeat=3))
+        per_call = elapsed / (loops * len(paths)) * 1e9
+        print("{name:>8}: {per_call:8.1f} ns/call".format(name=name,
+                                                         per_call=per_call))
+    print(router.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+SearchIndex over 20k synthetic notebooks: time to index them and to
+answer word, multi word and short prefix queries.
+
+    python benchmarks/bench_search.py
+"""
+import random
+import time
+
+from nbformat.v4 import new_notebook, new_code_cell, new_markdown_cell
+
+from nbx.nbmanager.search import SearchIndex
+
+PREFIXES = ['alpha', 'beta', 'gamma', 'delta', 'pandas', 'numpy', 'plot',
+            'frame']
+
+
+def make_docs(count=20000, vocab_size=5000, seed=0):
+    rng = random.Random(seed)
+    vocab = ['{0}{1}'.format(rng.choice(PREFIXES), i)
+             for i in range(vocab_size)]
+    docs = []
+    for i in range(count):
+        nb = new_notebook(cells=[
+            new_markdown_cell(' '.join(rng.choices(vocab, k=200))),
+            new_code_cell(' '.join(rng.choices(vocab, k=300))),
+        ])
+        docs.append(('b/nb{0}.ipynb'.format(i), 'nb{0}.ipynb'.format(i), '',
+                     nb, i))
+    return docs, vocab
+
+
+def main():
+    docs, vocab = make_docs()
+    index = SearchIndex()
+    start = time.perf_counter()
+    index.add_many(docs)
+    print("index:      {0:8.1f} ms ({1} notebooks)".format(
+        (time.perf_counter() - start) * 1000, len(docs)))
+
+    queries = [('word', vocab[100]), ('two words', vocab[5] + ' ' + vocab[6]),
+               ('prefix', 'pan'), ('name', 'nb123')]
+    for label, query in queries:
+        start = time.perf_counter()
+        for i in range(5):
+            results = index.search(query)
+        elapsed = (time.perf_counter() - start) / 5
+        print("{0:10s}  {1:8.2f} ms ({2} results)".format(
+            label + ':', elapsed * 1000, len(results)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Per-call overhead of the ContentsNameApiShim layer.
+
+Compares the old per-call argspec lookups (inspect on every get/set of an
+argument) with the ArgMaps built when the shim class is created. The
+legacy manager's methods do nothing, so the numbers are all shim.
+
+    python benchmarks/bench_shim.py
+"""
+import inspect
+import timeit
+
+from notebook.services.contents.manager import ContentsManager
+
+from nbx.nbmanager.shim import contents_api_name
+from nbx.nbmanager.util import _path_split
+
+
+class LegacyManager(ContentsManager):
+    def get(self, name, path='', content=True, type=None, format=None):
+        pass
+
+    def save(self, model, name, path=''):
+        pass
+
+
+def legacy_get_invoked_arg(func, name, args, kwargs):
+    # the old util.get_invoked_arg. getargspec is gone, getfullargspec is
+    # the closest thing
+    if name in kwargs:
+        return kwargs[name]
+    argspec = inspect.getfullargspec(getattr(func, '__wrapped__', func))
+    if name not in argspec.args:
+        raise Exception('{name} was not found in invoked function'.format(name=name))
+    index = argspec.args.index(name)
+    if argspec.args[0] == 'self':
+        index -= 1
+    return args[index]
+
+
+def legacy_set_invoked_arg(func, name, value, args, kwargs):
+    argspec = inspect.getfullargspec(getattr(func, '__wrapped__', func))
+    if name in kwargs or name not in argspec.args:
+        kwargs[name] = value
+        return
+    index = argspec.args.index(name)
+    num_args = len(argspec.args)
+    if argspec.args[0] == 'self':
+        index -= 1
+        num_args -= 1
+    defaults_len = len(argspec.defaults or ())
+    if len(args) == num_args:
+        args[index] = value
+    elif len(args) == index:
+        args.append(value)
+    elif len(args) + defaults_len >= num_args:
+        args[index] = value
+    else:
+        args.insert(index, value)
+
+
+def legacy_shim(manager, name):
+    # the old ContentsNameApiShim._shim
+    current_api = getattr(ContentsManager, name)
+    legacy = getattr(manager, name)
+    def method(*args, **kwargs):
+        args = list(args)
+        path = legacy_get_invoked_arg(current_api, 'path', args, kwargs)
+        name, path = _path_split(path)
+        legacy_set_invoked_arg(legacy, 'name', name, args, kwargs)
+        legacy_set_invoked_arg(legacy, 'path', path, args, kwargs)
+        try:
+            model = legacy_get_invoked_arg(current_api, 'model', args, kwargs)
+            model_path = model.get('path', '')
+            model_name, model_path = _path_split(model_path)
+            model['path'] = model_path
+            model['name'] = model_name
+            legacy_set_invoked_arg(legacy, 'model', model, args, kwargs)
+        except:
+            pass
+        return legacy(*args, **kwargs)
+    return method
+
+
+def main(number=20000):
+    manager = LegacyManager()
+    shimmed = contents_api_name(LegacyManager)()
+    model = {'path': 'dir/sub/notebook.ipynb'}
+
+    legacy_get = legacy_shim(manager, 'get')
+    legacy_save = legacy_shim(manager, 'save')
+
+    def direct():
+        manager.get('notebook.ipynb', 'dir/sub')
+        manager.save(model, 'notebook.ipynb', 'dir/sub')
+
+    def legacy():
+        legacy_get('dir/sub/notebook.ipynb')
+        legacy_save(model, 'dir/sub/notebook.ipynb')
+
+    def shim():
+        shimmed.get('dir/sub/notebook.ipynb')
+        shimmed.save(model, 'dir/sub/notebook.ipynb')
+
+    for name, func in [('direct', direct), ('legacy', legacy), ('shim', shim)]:
+        elapsed = min(timeit.repeat(func, number=number, repeat=3))
+        per_call = elapsed / (number * 2) * 1e9
+        print("{name:>8}: {per_call:8.1f} ns/call".format(name=name,
+                                                         per_call=per_call))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+WorkareaManager.list_notebooks over a synthetic 20k notebook tree.
+
+Compares the old full walk (notebook_walk + sort + format on every
+request) with the WorkareaIndex backed listing, cold and warm, and after
+one notebook is added. Then the newest 50 only, as served for `limit=50`.
+
+    python benchmarks/bench_workarea.py
+"""
+import os
+import json
+import datetime
+import shutil
+import tempfile
+import time
+
+from nbx.nbmanager.scratchpad import WorkareaManager, notebook_walk
+
+NB_JSON = json.dumps({"cells": [], "metadata": {}, "nbformat": 4,
+                      "nbformat_minor": 4})
+
+
+def make_tree(root, workareas=2, dirs=100, per_dir=100):
+    paths = {}
+    mtime = 1000000000
+    for w in range(workareas):
+        wa_root = os.path.join(root, 'wa{0}'.format(w))
+        paths['wa{0}'.format(w)] = wa_root
+        for d in range(dirs):
+            dirname = os.path.join(wa_root, 'proj{0}'.format(d // 10),
+                                   'dir{0}'.format(d))
+            os.makedirs(dirname)
+            for n in range(per_dir):
+                os_path = os.path.join(dirname, 'nb{0}.ipynb'.format(n))
+                with open(os_path, 'w') as f:
+                    f.write(NB_JSON)
+                mtime += 7
+                os.utime(os_path, (mtime, mtime))
+    return paths
+
+
+def legacy_list_notebooks(wm, path=''):
+    # the old list_notebooks: walk every directory, sort, format
+    all_notebooks = []
+    for k, manager in wm.managers.items():
+        for p, notebooks, subdirs in notebook_walk(manager, path):
+            for nb in notebooks:
+                nb['key'] = 'ABCDEF'
+            all_notebooks.extend(notebooks)
+    all_notebooks.sort(key=lambda x: x['last_modified'], reverse=True)
+    today = datetime.datetime.now().date()
+    return wm._format_listing(all_notebooks, today)
+
+
+def timed(func, repeat=3):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    td = tempfile.mkdtemp()
+    try:
+        paths = make_tree(td)
+
+        wm = WorkareaManager(workarea_paths=paths)
+        elapsed, notebooks = timed(lambda: legacy_list_notebooks(wm), repeat=1)
+        print("legacy cold:  {0:8.1f} ms ({1} notebooks)".format(
+            elapsed * 1000, len(notebooks)))
+        elapsed, notebooks = timed(lambda: legacy_list_notebooks(wm))
+        print("legacy warm:  {0:8.1f} ms".format(elapsed * 1000))
+
+        wm = WorkareaManager(workarea_paths=paths)
+        elapsed, notebooks = timed(lambda: wm.list_notebooks(''), repeat=1)
+        print("index cold:   {0:8.1f} ms ({1} notebooks)".format(
+            elapsed * 1000, len(notebooks)))
+        elapsed, notebooks = timed(lambda: wm.list_notebooks(''))
+        print("index warm:   {0:8.1f} ms".format(elapsed * 1000))
+
+        with open(os.path.join(paths['wa0'], 'proj0', 'dir0', 'new.ipynb'),
+                  'w') as f:
+            f.write(NB_JSON)
+        elapsed, notebooks = timed(lambda: wm.list_notebooks(''), repeat=1)
+        print("index +1 nb:  {0:8.1f} ms".format(elapsed * 1000))
+
+        with open(os.path.join(paths['wa1'], 'proj0', 'dir0', 'new.ipynb'),
+                  'w') as f:
+            f.write(NB_JSON)
+        elapsed, notebooks = timed(lambda: wm.list_notebooks('', limit=50),
+                                   repeat=1)
+        print("top 50 +1 nb: {0:8.1f} ms".format(elapsed * 1000))
+        elapsed, notebooks = timed(lambda: wm.list_notebooks('', limit=50))
+        print("top 50 warm:  {0:8.1f} ms".format(elapsed * 1000))
+    finally:
+        shutil.rmtree(td)
+
+
+if __name__ == '__main__':
+    main()
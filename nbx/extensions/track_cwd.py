@@ -0,0 +1,55 @@
+"""
+Let the notebook server know when the kernel's cwd or execution count
+changes.
+
+After every execution we compare os.getcwd() and the execution count
+against the last values and on change publish an `nbx_state` message on
+iopub. nbx.kernel_state picks these up so the server doesn't need to run
+code in the kernel to find its cwd or tell whether anything has run.
+
+The server loads this into python kernels it starts. Otherwise:
+
+    %load_ext nbx.extensions.track_cwd
+"""
+import os
+
+STATE_TOPIC = b'nbx_state'
+STATE_MSG_TYPE = 'nbx_state'
+
+
+class CwdTracker(object):
+    def __init__(self, shell):
+        self.shell = shell
+        self.cwd = None
+        self.execution_count = None
+
+    def post_execute(self):
+        cwd = os.getcwd()
+        execution_count = self.shell.execution_count
+        if cwd == self.cwd and execution_count == self.execution_count:
+            return
+        self.cwd = cwd
+        self.execution_count = execution_count
+        self.publish()
+
+    def publish(self):
+        kernel = getattr(self.shell, 'kernel', None)
+        if kernel is None:
+            # not running under ipykernel
+            return
+        parent = getattr(self.shell, 'parent_header', None) or {}
+        content = {
+            'cwd': self.cwd,
+            'execution_count': self.execution_count,
+            # new for every kernel process
+            'session': kernel.session.session,
+        }
+        kernel.session.send(kernel.iopub_socket, STATE_MSG_TYPE, content,
+                            parent=parent, ident=STATE_TOPIC)
+
+
+def load_ipython_extension(shell):
+    tracker = CwdTracker(shell)
+    shell.events.register('post_execute', tracker.post_execute)
+    # report the starting cwd
+    tracker.post_execute()
@@ -7,7 +7,9 @@ from notebook.notebookapp import NotebookWebApplication
 
 NBX_HANDLERS = ['nbx.handlers.standalone',
                 'nbx.handlers.kernel_info',
-                'nbx.handlers.server_info']
+                'nbx.handlers.server_info',
+                'nbx.handlers.contents',
+                'nbx.handlers.search']
 
 def load_handlers(name):
     """Load the (URL pattern, handler) tuples for each component."""
@@ -0,0 +1,92 @@
+from tornado import web
+
+from notebook.base.handlers import path_regex
+from notebook.utils import maybe_future
+from notebook.services.contents.handlers import (
+    ContentsHandler,
+    CheckpointsHandler,
+    ModifyCheckpointsHandler,
+    TrustNotebooksHandler,
+    validate_model,
+    _checkpoint_id_regex,
+)
+
+from nbx.nbmanager.listing import parse_sort
+
+
+def _paging_argument(handler, name):
+    value = handler.get_query_argument(name, default=None)
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        value = -1
+    if value < 0:
+        raise web.HTTPError(400, u'%s must be a non-negative integer' % name)
+    return value
+
+
+class NBXContentsHandler(ContentsHandler):
+    """
+    ContentsHandler whose directory GET also takes `limit`, `offset` and
+    `sort` (name, last_modified, - prefix for descending). Without them the
+    response is the same as upstream.
+    """
+    @web.authenticated
+    async def get(self, path=''):
+        path = path or ''
+        cm = self.contents_manager
+        type = self.get_query_argument('type', default=None)
+        if type not in {None, 'directory', 'file', 'notebook'}:
+            raise web.HTTPError(400, u'Type %r is invalid' % type)
+
+        format = self.get_query_argument('format', default=None)
+        if format not in {None, 'text', 'base64'}:
+            raise web.HTTPError(400, u'Format %r is invalid' % format)
+        content = self.get_query_argument('content', default='1')
+        if content not in {'0', '1'}:
+            raise web.HTTPError(400, u'Content %r is invalid' % content)
+        content = int(content)
+        if cm.is_hidden(path) and not cm.allow_hidden:
+            raise web.HTTPError(404, u'file or directory %r does not exist' % path)
+
+        paging = self.get_paging()
+        if paging:
+            # only directories are paged. managers dispatch on the path, not
+            # on type, so check before the paging args reach get_file
+            if type not in {None, 'directory'} or not cm.dir_exists(path):
+                raise web.HTTPError(400, u'Only directories can be paged')
+            type = 'directory'
+
+        model = await maybe_future(cm.get(
+            path=path, type=type, format=format, content=content, **paging
+        ))
+        validate_model(model, expect_content=content)
+        self._finish_model(model, location=False)
+
+    def get_paging(self):
+        paging = {}
+        for name in ('limit', 'offset'):
+            value = _paging_argument(self, name)
+            if value is not None:
+                paging[name] = value
+        sort = self.get_query_argument('sort', default=None)
+        if sort is not None:
+            try:
+                parse_sort(sort)
+            except ValueError as e:
+                raise web.HTTPError(400, str(e))
+            paging['sort'] = sort
+        return paging
+
+
+# our contents handler goes ahead of notebook's. the checkpoint and trust
+# urls would match it, so they come first
+default_handlers = [
+    (r"/api/contents%s/checkpoints" % path_regex, CheckpointsHandler),
+    (r"/api/contents%s/checkpoints/%s" % (path_regex, _checkpoint_id_regex),
+        ModifyCheckpointsHandler),
+    (r"/api/contents%s/trust" % path_regex, TrustNotebooksHandler),
+    (r"/api/contents%s" % path_regex, NBXContentsHandler),
+]
@@ -1,5 +1,3 @@
-
-
 import os.path
 
 from tornado import web
@@ -8,31 +6,42 @@ import IPython
 from zmq.utils import jsonapi
 from nbx.handlers import NBXHandler
 import nbx.kernel_client as kernel_client
+from nbx.kernel_state import tracker
 
 PWD_CODE = """
-from IPython.utils import py3compat
-py3compat.getcwd()
+import os
+os.getcwd()
 """
 
 class KernelInfo(NBXHandler):
 
     @web.authenticated
-    def get(self, kernel_id):
+    async def get(self, kernel_id):
         km = self.kernel_manager
-        client = km.get_kernel(kernel_id).client()
-        client = kernel_client.KernelClient(client)
-
-        data = client.execute(PWD_CODE)
-        client.exit()
-
         model = km.kernel_model(kernel_id)
-        kernel_path = '';
-        if 'text/plain' in data:
-            kernel_path = eval(data['text/plain'])
+
+        kernel_path = None
+        # only kernels whose extension has reported have a trustworthy cwd
+        if tracker.is_reporting(kernel_id):
+            kernel_path = tracker.get_cwd(kernel_id)
+        if kernel_path is None:
+            # not tracked. ask the kernel
+            kernel_path = await self.get_kernel_path(km, kernel_id)
         model['kernel_path'] = kernel_path
 
         self.finish(jsonapi.dumps(model))
 
+    async def get_kernel_path(self, km, kernel_id):
+        try:
+            data = await kernel_client.execute_async(km, kernel_id, PWD_CODE)
+        except TimeoutError:
+            raise web.HTTPError(504, u'Kernel did not respond: %s' % kernel_id)
+
+        kernel_path = '';
+        if data and 'text/plain' in data:
+            kernel_path = eval(data['text/plain'])
+        return kernel_path
+
 _kernel_id_regex = r"(?P<kernel_id>\w+-\w+-\w+-\w+-\w+)"
 
 default_handlers = [
@@ -0,0 +1,44 @@
+import json
+
+from tornado import web
+from nbx.handlers import NBXHandler
+
+# most results a single request can ask for
+MAX_LIMIT = 200
+
+
+class SearchHandler(NBXHandler):
+    """
+    Full text search over notebook names, tags, markdown and code. See
+    nbx.nbmanager.search. Needs MetaManager.enable_search.
+
+        GET /api/nbx/search?q=words&limit=20&path=alias
+    """
+    @web.authenticated
+    def get(self):
+        index = getattr(self.contents_manager, 'search_index', None)
+        if index is None:
+            raise web.HTTPError(404, u'Search is not enabled')
+
+        query = self.get_query_argument('q', default='')
+        prefix = self.get_query_argument('path', default='').strip('/')
+        if prefix:
+            prefix += '/'
+        try:
+            limit = int(self.get_query_argument('limit', default='20'))
+        except ValueError:
+            raise web.HTTPError(400, u'limit must be an integer')
+        limit = max(1, min(limit, MAX_LIMIT))
+
+        results = index.search(query, limit=limit, prefix=prefix)
+        self.set_header('Content-Type', 'application/json')
+        self.finish(json.dumps({'query': query, 'results': results}))
+
+#-----------------------------------------------------------------------------
+# URL to handler mappings
+#-----------------------------------------------------------------------------
+
+
+default_handlers = [
+    (r"/api/nbx/search", SearchHandler),
+    ]
@@ -1,17 +1,30 @@
 import os.path
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
 
 from tornado import web
+from tornado.iostream import StreamClosedError
 
 import IPython
 from nbx.handlers import NBXHandler
 import nbx.kernel_client as kernel_client
+from nbx.kernel_state import tracker
 from notebook.base.handlers import path_regex as notebook_path_regex
 
-CODE_FMT = """
-from nbx.handlers.standalone import get_html
-get_html({html_obj}, "{attr}")
+CHUNK_CODE_FMT = """
+from nbx.handlers.standalone import send_html_chunk
+send_html_chunk({html_obj}, "{attr}", "{token}", {index}, {chunk_size})
 """
 
+DISCARD_CODE_FMT = """
+from nbx.handlers.standalone import discard_html_stream
+discard_html_stream("{token}")
+"""
+
+CHUNK_MIMETYPE = 'application/vnd.nbx.html-chunk+json'
+
 def autolink(obj):
     """
     Output a standalone link to a named variable bound to this object
@@ -75,6 +88,41 @@ def get_html(html_obj, attr):
 
     return html
 
+# kernel side. html being streamed out, keyed by request token. Only the most
+# recent few are kept in case a request was abandoned mid stream.
+_html_streams = OrderedDict()
+MAX_HTML_STREAMS = 4
+
+def send_html_chunk(html_obj, attr, token, index, chunk_size):
+    """
+    Publish the index'th chunk of the html as display_data. The html is
+    rendered on the first chunk and held until the last one is sent.
+    """
+    from IPython.display import publish_display_data
+
+    try:
+        html = _html_streams.get(token)
+        if html is None:
+            html = get_html(html_obj, attr) or ''
+            _html_streams[token] = html
+            while len(_html_streams) > MAX_HTML_STREAMS:
+                _html_streams.popitem(last=False)
+
+        start = index * chunk_size
+        chunk = html[start:start + chunk_size]
+        done = start + chunk_size >= len(html)
+        if done:
+            _html_streams.pop(token, None)
+        publish_display_data({CHUNK_MIMETYPE: {'chunk': chunk, 'done': done}})
+    except Exception:
+        # the server gives up on the stream. don't hold on to the html
+        _html_streams.pop(token, None)
+        raise
+
+def discard_html_stream(token):
+    """ Drop the html of a stream the server stopped reading """
+    _html_streams.pop(token, None)
+
 class DirectoryHtml(object):
     """
     An HTMLObject that refences a directory
@@ -95,14 +143,82 @@ class DirectoryHtml(object):
         if self.default:
             return self[self.default]
 
+class RenderCache(object):
+    """
+    Server side cache of rendered standalone html.
+
+    Keys are (kernel_id, html_obj, attr, session, execution_count). The
+    rendered html can only change when the user runs something, which bumps
+    the execution count, or when the kernel is replaced, which changes the
+    session. See nbx.kernel_state.
+
+    Sizes are in characters. Renders larger than `max_entry_size` are
+    streamed without being cached.
+    """
+    def __init__(self, max_size=64 * 1024 * 1024, max_entry_size=8 * 1024 * 1024):
+        self.max_size = max_size
+        self.max_entry_size = max_entry_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def etag(key):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return '"{0}"'.format(digest)
+
+    def get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def put(self, key, html):
+        if len(html) > self.max_entry_size:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._entries[key] = html
+            self.size += len(html)
+            while self.size > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def invalidate_kernel(self, kernel_id):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == kernel_id]:
+                self.size -= len(self._entries.pop(key))
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': self.size,
+            'entries': len(self._entries),
+        }
+
+
+render_cache = RenderCache()
+
 class StandaloneHandler(NBXHandler):
+    # characters per chunk pulled from the kernel
+    chunk_size = 1024 * 1024
+
     @web.authenticated
-    def get(self, path, name, html_obj, attr=None):
+    async def get(self, path, name, html_obj, attr=None):
         if not attr:
             self.redirect(self.request.path + '/to_html')
             return
 
-        print(path, html_obj, attr)
+        self.log.debug("standalone %s %s.%s", path, html_obj, attr)
         # path shouldn't have preceding /.
         # session.js creates session with notebook model.
         if path.startswith('/'):
@@ -111,19 +227,108 @@ class StandaloneHandler(NBXHandler):
         session = sm.get_session(path=path, name=name)
         kernel_id = session['kernel']['id']
 
+        execution_key = tracker.get_execution_key(kernel_id)
+        if execution_key is None:
+            # no way to tell if anything changed. always render
+            await self.stream_html(kernel_id, html_obj, attr)
+            return
+
+        key = (kernel_id, html_obj, attr) + execution_key
+        self.set_header('Etag', render_cache.etag(key))
+        if self.check_etag_header():
+            self.set_status(304)
+            self.finish()
+            return
+
+        html = render_cache.get(key)
+        if html is not None:
+            self.finish(html)
+            return
+
+        await self.stream_html(kernel_id, html_obj, attr, cache_key=key)
+
+    async def stream_html(self, kernel_id, html_obj, attr, cache_key=None):
+        """
+        Pull the html out of the kernel a chunk at a time and flush each one
+        to the client as it arrives. Only one chunk is held in memory at a
+        time, no matter how large the html is.
+
+        Errors on the first chunk are raised as an HTTPError. Once a chunk
+        has been flushed the 200 status is gone, so a later failure is
+        logged and the connection closed, which leaves the client with an
+        incomplete response rather than truncated html.
+
+        If cache_key is passed, the html is put in the render cache as long
+        as it's small enough.
+        """
         km = self.kernel_manager
-        client = km.get_kernel(kernel_id).client()
-        client = kernel_client.KernelClient(client)
+        token = uuid.uuid4().hex
+        index = 0
+        chunks = []
+        size = 0
+        while True:
+            try:
+                payload = await self.fetch_chunk(km, kernel_id, html_obj,
+                                                 attr, token, index)
+            except web.HTTPError as e:
+                if not index:
+                    raise
+                self.log.error("Standalone %s.%s failed after %d chunks: %s",
+                               html_obj, attr, index, e)
+                self.request.connection.close()
+                await self.discard_stream(km, kernel_id, token)
+                return
+
+            chunk = payload['chunk']
+            if cache_key is not None:
+                size += len(chunk)
+                if size <= render_cache.max_entry_size:
+                    chunks.append(chunk)
+                else:
+                    # too big. stop collecting
+                    cache_key = None
+                    chunks = []
+            self.write(chunk)
+            try:
+                await self.flush()
+            except StreamClosedError:
+                # client went away
+                if not payload['done']:
+                    await self.discard_stream(km, kernel_id, token)
+                return
+            if payload['done']:
+                break
+            index += 1
+
+        if cache_key is not None:
+            render_cache.put(cache_key, ''.join(chunks))
+        self.finish()
 
-        code = CODE_FMT.format(html_obj=html_obj, attr=attr);
-        data = client.execute(code)
-        client.exit()
+    async def fetch_chunk(self, km, kernel_id, html_obj, attr, token, index):
+        code = CHUNK_CODE_FMT.format(html_obj=html_obj, attr=attr,
+                                     token=token, index=index,
+                                     chunk_size=self.chunk_size)
+        try:
+            data = await kernel_client.execute_async(
+                km, kernel_id, code, store_history=False,
+                mimetype=CHUNK_MIMETYPE)
+        except TimeoutError:
+            raise web.HTTPError(504, u'Kernel did not respond: %s' % kernel_id)
 
-        html = '';
-        if 'text/plain' in data:
-            html = eval(data['text/plain'])
+        if data is None:
+            # the kernel errored
+            raise web.HTTPError(500, u'Could not render %s.%s' % (html_obj, attr))
+        return data[CHUNK_MIMETYPE]
 
-        self.finish(html)
+    async def discard_stream(self, km, kernel_id, token):
+        """ Tell the kernel to drop the html of an unfinished stream """
+        code = DISCARD_CODE_FMT.format(token=token)
+        try:
+            await kernel_client.execute_async(km, kernel_id, code,
+                                              store_history=False)
+        except Exception:
+            self.log.debug("Could not discard html stream %s", token,
+                           exc_info=True)
 
 _html_obj = r"(?P<html_obj>[\w-]+)"
 _attr = r"(?P<attr>[.\w-]+)"
@@ -2,64 +2,108 @@ from jupyter_client import find_connection_file
 from jupyter_client.manager import KernelManager
 
 import time
+import asyncio
+import functools
+import threading
+from queue import Empty
+from concurrent.futures import ThreadPoolExecutor
 
-def run_cell(client, cell, store_history=True):
+# seconds to wait for a kernel to finish executing
+DEFAULT_TIMEOUT = 30
+
+
+def _remaining(deadline):
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("Timed out waiting for kernel")
+    return remaining
+
+
+def _parent_id(msg):
+    return msg['parent_header'].get('msg_id', None)
+
+
+def run_cell(client, cell, store_history=True, timeout=DEFAULT_TIMEOUT,
+             mimetype=None):
     """
-    Taken from ipython.frontend.terminal.console.ZMQInteractiveShell
+    Execute cell and return the execute_result data. If mimetype is passed,
+    the data of a display_data message containing that mimetype is
+    returned instead.
+
+    Replies are matched on the execute request's msg_id. We block on the
+    channels instead of polling and return as soon as the kernel goes idle.
+
+    Raises TimeoutError if the kernel hasn't finished within `timeout`
+    seconds. None to wait forever.
     """
     if (not cell) or cell.isspace():
         return
 
-    # flush stale replies, which could have been ignored, due to missed heartbeats
-    while client.shell_channel.msg_ready():
-        client.shell_channel.get_msg()
-
+    deadline = None
+    if timeout is not None:
+        deadline = time.monotonic() + timeout
 
-    # shell_channel.execute takes 'hidden', which is the inverse of store_hist
-    msg_id = client.shell_channel.execute(cell, not store_history)
-    while not client.shell_channel.msg_ready(): # wait for completion
-        pass
-
-    if client.shell_channel.msg_ready():
-        handle_execute_reply(client, msg_id)
-
-    # meh. sometimes iopub doesn't have the pyout.
-    # sleep for 100ms to make sure it's in there
-    # probably shouldn't be here
-    data = get_pyout(client)
+    msg_id = client.execute(cell, store_history=store_history)
+    reply = get_reply(client, msg_id, deadline)
+    handle_execute_reply(reply)
+    data = get_pyout(client, msg_id, deadline, mimetype=mimetype)
     return data
 
-def handle_execute_reply(client, msg_id):
-    msg = client.shell_channel.get_msg()
+def get_reply(client, msg_id, deadline=None):
+    """
+    Wait for the shell reply to msg_id. Stale replies to earlier requests
+    are dropped.
+    """
+    while True:
+        try:
+            msg = client.get_shell_msg(timeout=_remaining(deadline))
+        except Empty:
+            raise TimeoutError("Timed out waiting for execute_reply")
+        if _parent_id(msg) == msg_id:
+            return msg
 
-    if msg["parent_header"].get("msg_id", None) == msg_id:
-        content = msg["content"]
-        status = content['status']
-        if status == 'aborted':
-            #self.write('Aborted\n')
-            return
-        elif status == 'ok':
-            # print execution payloads as well:
-            for item in content["payload"]:
-                text = item.get('text', None)
-                if text:
-                    pass
-        elif status == 'error':
-            for frame in content["traceback"]:
-                print(frame)
+def handle_execute_reply(msg):
+    content = msg["content"]
+    status = content['status']
+    if status == 'aborted':
+        #self.write('Aborted\n')
+        return
+    elif status == 'ok':
+        # print execution payloads as well:
+        for item in content.get("payload", []):
+            text = item.get('text', None)
+            if text:
+                pass
+    elif status == 'error':
+        for frame in content["traceback"]:
+            print(frame)
 
-def get_pyout(client):
+def get_pyout(client, msg_id, deadline=None, mimetype=None):
     """
-    Listen to iopub messages until we get notified that the kernel is idle
+    Listen to iopub messages for msg_id until we get notified that the
+    kernel is idle
     """
     data = None
     while True:
-        time.sleep(.1)
-        sub_msg = client.iopub_channel.get_msg()
+        try:
+            sub_msg = client.get_iopub_msg(timeout=_remaining(deadline))
+        except Empty:
+            raise TimeoutError("Timed out waiting for kernel to go idle")
+
+        if _parent_id(sub_msg) != msg_id:
+            continue
+
         msg_type = sub_msg['header']['msg_type']
-        parent = sub_msg["parent_header"]
 
-        if parent and client.session.session != parent['session']:
+        if mimetype is not None:
+            if (msg_type == 'display_data' and
+                    mimetype in sub_msg['content']['data']):
+                data = sub_msg['content']['data']
+            elif (msg_type == 'status' and
+                    sub_msg['content']['execution_state'] == 'idle'):
+                return data
             continue
 
         # only treat the execute_result as data. ignore stream message types
@@ -73,18 +117,176 @@ def get_pyout(client):
         if msg_type == 'status' and sub_msg['content']['execution_state'] == 'idle':
             return data
 
+def drain_iopub(client):
+    """
+    Drop whatever iopub output is queued without waiting. Returns the
+    number of messages dropped.
+    """
+    count = 0
+    while True:
+        try:
+            client.get_iopub_msg(timeout=0)
+        except Empty:
+            return count
+        count += 1
+
 class KernelClient(object):
-    def __init__(self, client):
+    timeout = DEFAULT_TIMEOUT
+
+    def __init__(self, client, timeout=None):
         self.client = client
+        if timeout is not None:
+            self.timeout = timeout
         self.client.start_channels()
+        # a fresh iopub subscription misses messages until it has connected.
+        # wait_for_ready round trips kernel_info until iopub is live.
+        wait_for_ready = getattr(self.client, 'wait_for_ready', None)
+        if wait_for_ready is not None:
+            try:
+                wait_for_ready(timeout=self.timeout)
+            except RuntimeError as e:
+                # jupyter_client raises RuntimeError when the kernel doesn't
+                # answer in time. callers map TimeoutError to a 504
+                self.client.stop_channels()
+                raise TimeoutError(str(e))
 
-    def execute(self, code):
-        data = run_cell(self.client, code)
+    def execute(self, code, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = self.timeout
+        # output broadcast while the client sat idle. left queued it fills
+        # the socket's high-water mark and our own replies get dropped
+        drain_iopub(self.client)
+        data = run_cell(self.client, code, timeout=timeout, **kwargs)
         return data
 
     def exit(self):
         self.client.stop_channels()
 
+class KernelClientPool(object):
+    """
+    Long lived KernelClients keyed on kernel_id.
+
+    Starting channels means setting up a handful of zmq sockets, so the
+    handlers that run snippets in a kernel keep their clients around.
+    Clients unused for `idle_timeout` seconds are stopped the next time the
+    pool is used. Call `discard` when a kernel shuts down.
+
+    Note that an idle client's iopub socket still receives the kernel's
+    broadcast output. KernelClient.execute drains that backlog before
+    sending a request, and run_cell skips anything that isn't a reply to
+    its own request.
+    """
+    def __init__(self, idle_timeout=300, max_per_kernel=1):
+        self.idle_timeout = idle_timeout
+        self.max_per_kernel = max_per_kernel
+        self._clients = {}
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, kernel_id):
+        return kernel_id in self._clients
+
+    def __len__(self):
+        return len(self._clients)
+
+    def get(self, kernel_id, factory):
+        """
+        Return the pooled KernelClient for kernel_id. `factory()` should
+        return a new jupyter client and is only called on a miss.
+        """
+        self.evict_idle()
+        with self._lock:
+            entry = self._clients.get(kernel_id)
+            if entry is not None:
+                entry[1] = time.monotonic()
+                return entry[0]
+
+        # starting channels can wait on a busy kernel for up to `timeout`.
+        # don't hold up clients of other kernels meanwhile
+        client = KernelClient(factory())
+        with self._lock:
+            entry = self._clients.get(kernel_id)
+            if entry is None:
+                entry = [client, None]
+                self._clients[kernel_id] = entry
+                client = None
+            entry[1] = time.monotonic()
+        if client is not None:
+            # another thread got there first
+            client.exit()
+        return entry[0]
+
+    def discard(self, kernel_id):
+        with self._lock:
+            entry = self._clients.pop(kernel_id, None)
+        if entry is not None:
+            entry[0].exit()
+
+    def evict_idle(self):
+        if not self.idle_timeout:
+            return
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            idle = [kernel_id for kernel_id, (client, last_used)
+                    in self._clients.items() if last_used < cutoff]
+        for kernel_id in idle:
+            self.discard(kernel_id)
+
+    def remove_kernel(self, kernel_id):
+        """ The kernel is gone. Drop everything we have for it. """
+        self.discard(kernel_id)
+        self._semaphores.pop(kernel_id, None)
+
+    def semaphore(self, kernel_id):
+        """
+        asyncio.Semaphore limiting concurrent executions on kernel_id. A
+        pooled client can only run one request at a time, so this should
+        stay at 1 unless clients aren't shared.
+        """
+        sem = self._semaphores.get(kernel_id)
+        if sem is None:
+            sem = asyncio.Semaphore(self.max_per_kernel)
+            self._semaphores[kernel_id] = sem
+        return sem
+
+    def clear(self):
+        for kernel_id in list(self._clients):
+            self.discard(kernel_id)
+        self._semaphores.clear()
+
+
+client_pool = KernelClientPool()
+
+def execute(kernel_manager, kernel_id, code, timeout=None, **kwargs):
+    """
+    Run code in kernel_id using a pooled client. kwargs are passed to
+    run_cell.
+    """
+    kernel = kernel_manager.get_kernel(kernel_id)
+    client = client_pool.get(kernel_id, kernel.client)
+    try:
+        return client.execute(code, timeout=timeout, **kwargs)
+    except Exception:
+        # don't reuse a client that might have replies in flight
+        client_pool.discard(kernel_id)
+        raise
+
+# threads that block on kernel channels for execute_async
+executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='nbx-kernel')
+
+async def execute_async(kernel_manager, kernel_id, code, timeout=None,
+                        **kwargs):
+    """
+    Coroutine version of execute. The blocking round trip runs on
+    `executor` so the IOLoop keeps serving other requests. Requests to the
+    same kernel queue up on the pool's per kernel semaphore.
+    """
+    loop = asyncio.get_running_loop()
+    func = functools.partial(execute, kernel_manager, kernel_id, code,
+                             timeout=timeout, **kwargs)
+    async with client_pool.semaphore(kernel_id):
+        return await loop.run_in_executor(executor, func)
+
 def get_client(cf, profile=None):
     """
     Usage:
@@ -0,0 +1,132 @@
+"""
+Server side view of kernel state that we'd otherwise have to ask the kernel
+for.
+
+Running code in a kernel to answer a simple question (what's your cwd?)
+queues behind whatever the user is running. Instead we record the cwd when
+the server starts the kernel and let the `nbx.extensions.track_cwd` kernel
+extension tell us when it changes. The extension publishes `nbx_state`
+messages (cwd, execution_count and the kernel's session id) on iopub under
+their own zmq topic, so the subscription we hold per kernel only ever
+receives those.
+"""
+import time
+import threading
+
+import zmq
+
+STATE_TOPIC = b'nbx_state'
+STATE_MSG_TYPE = 'nbx_state'
+
+
+class KernelStateTracker(object):
+    def __init__(self):
+        self._state = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def get(self, kernel_id, key, default=None):
+        state = self._state.get(kernel_id)
+        if state is None:
+            return default
+        return state.get(key, default)
+
+    def set(self, kernel_id, key, value):
+        self.update(kernel_id, {key: value})
+
+    def update(self, kernel_id, values):
+        with self._lock:
+            state = self._state.setdefault(kernel_id, {})
+            state.update(values)
+            state['updated_at'] = time.time()
+
+    def get_cwd(self, kernel_id):
+        """ Last known cwd of kernel_id. None if we don't know. """
+        return self.get(kernel_id, 'cwd')
+
+    def set_cwd(self, kernel_id, cwd):
+        self.set(kernel_id, 'cwd', cwd)
+
+    def started(self, kernel_id, cwd):
+        """ The server started kernel_id in cwd """
+        self.update(kernel_id, {'cwd': cwd, 'start_cwd': cwd})
+
+    def restarted(self, kernel_id):
+        """
+        The kernel process was replaced. It's back in its starting cwd and
+        its execution count starts over.
+        """
+        with self._lock:
+            state = self._state.get(kernel_id)
+            if state is None:
+                return
+            start_cwd = state.get('start_cwd')
+            state.clear()
+            if start_cwd is not None:
+                state['cwd'] = state['start_cwd'] = start_cwd
+            state['updated_at'] = time.time()
+
+    def get_execution_key(self, kernel_id):
+        """
+        (session, execution_count) of kernel_id. Changes whenever the user
+        runs a cell or the kernel process is replaced. None if the kernel
+        isn't reporting its state.
+        """
+        state = self._state.get(kernel_id)
+        if state is None or 'execution_count' not in state:
+            return None
+        return state['session'], state['execution_count']
+
+    def watch(self, kernel_id, kernel):
+        """
+        Subscribe to the nbx_state messages of a jupyter_client kernel
+        manager.
+        """
+        if kernel_id in self._streams:
+            return
+        stream = kernel.connect_iopub()
+        # only our topic. the kernel's regular output never reaches us
+        stream.socket.setsockopt(zmq.UNSUBSCRIBE, b'')
+        stream.socket.setsockopt(zmq.SUBSCRIBE, STATE_TOPIC)
+        session = kernel.session
+
+        def on_recv(msg_list):
+            idents, fed_msg_list = session.feed_identities(msg_list)
+            msg = session.deserialize(fed_msg_list)
+            self.handle_msg(kernel_id, msg)
+
+        stream.on_recv(on_recv)
+        self._streams[kernel_id] = stream
+
+    def is_watching(self, kernel_id):
+        return kernel_id in self._streams
+
+    def is_reporting(self, kernel_id):
+        """
+        True once kernel_id's track_cwd extension has sent its state. A
+        watched kernel might not have the extension loaded (nbx not
+        importable in its environment), and a restarted one hasn't
+        reported yet.
+        """
+        state = self._state.get(kernel_id)
+        return state is not None and 'session' in state
+
+    def handle_msg(self, kernel_id, msg):
+        if msg['header']['msg_type'] != STATE_MSG_TYPE:
+            return
+        content = msg['content']
+        self.update(kernel_id, {
+            'cwd': content['cwd'],
+            'execution_count': content.get('execution_count'),
+            'session': content.get('session'),
+        })
+
+    def forget(self, kernel_id):
+        stream = self._streams.pop(kernel_id, None)
+        if stream is not None:
+            stream.close()
+        with self._lock:
+            self._state.pop(kernel_id, None)
+
+
+tracker = KernelStateTracker()
@@ -1,9 +1,9 @@
 import os
-import io
 
-import nbformat
 from IPython.utils import tz
 
+from .cache import notebook_cache as default_notebook_cache
+
 
 class Bundle(object):
     def __init__(self, path):
@@ -16,38 +16,69 @@ class Bundle(object):
         return "{cname}(name={name}, path={path})".format(cname=cname,
                                                           **self.__dict__)
 
+    def _file_entries(self):
+        """
+        DirEntry objects for the files in the bundle. Stat results are
+        cached on the entries.
+        """
+        try:
+            with os.scandir(self.path) as it:
+                # filter out compiled files
+                entries = [entry for entry in it
+                           if not entry.is_dir()
+                           and not entry.name.endswith('.pyc')]
+        except OSError:
+            entries = []
+        return entries
+
     @property
     def files(self):
-        try:
-            root, dirs, files = next(os.walk(self.path))
-            # filter out compiled files
-            files = filter(lambda x: not x.endswith('.pyc'), files)
-            files = list(files)
-        except StopIteration:
-            files = []
-        return files
+        return [entry.name for entry in self._file_entries()]
 
 class NotebookBundle(Bundle):
+    notebook_cache = default_notebook_cache
+
+    def __init__(self, path, notebook_cache=None):
+        super(NotebookBundle, self).__init__(path)
+        if notebook_cache is not None:
+            self.notebook_cache = notebook_cache
 
     @property
     def notebook_content(self):
         filepath = os.path.join(self.path, self.name)
-        with io.open(filepath, 'r', encoding='utf-8') as f:
-            try:
-                nb = nbformat.read(f, as_version=4)
-            except Exception as e:
-                nb = None
-            return nb
+        try:
+            nb = self.notebook_cache.read(filepath)
+        except OSError:
+            raise
+        except Exception as e:
+            nb = None
+        return nb
+
+    def _file_entries(self):
+        entries = super(NotebookBundle, self)._file_entries()
+        names = [entry.name for entry in entries]
+        assert self.name in names
+        return [entry for entry in entries if entry.name != self.name]
 
     @property
     def files(self):
         files = super(NotebookBundle, self).files
-        assert self.name in files
-        files.remove(self.name)
         assert self.name not in files
         return files
 
-    def get_model(self, content=True, file_content=True):
+    def get_model(self, content=True, file_content=True, manifest=False):
+        """
+        Parameters
+        ----------
+        content : bool
+            Include the notebook content.
+        file_content : bool
+            Read the auxiliary files into `__files`. When False the files are
+            never opened and `__files` maps each name to None.
+        manifest : bool
+            Add a `__manifest` dict of {filename: {size, last_modified}} built
+            from stat results only.
+        """
         os_path = os.path.join(self.path, self.name)
         info = os.stat(os_path)
         last_modified = tz.utcfromtimestamp(info.st_mtime)
@@ -64,16 +95,26 @@ class NotebookBundle(Bundle):
         if content:
             model['content'] = self.notebook_content
         files = {}
-        for fn in self.files:
-            with open(os.path.join(self.path, fn), 'rb') as f:
-                data = None
-                if file_content:
+        file_manifest = {}
+        for entry in self._file_entries():
+            fn = entry.name
+            if manifest:
+                stat = entry.stat()
+                file_manifest[fn] = {
+                    'size': stat.st_size,
+                    'last_modified': tz.utcfromtimestamp(stat.st_mtime),
+                }
+            data = None
+            if file_content:
+                with open(entry.path, 'rb') as f:
                     try:
                         data = f.read().decode('utf-8')
                     except UnicodeDecodeError:
                         # TODO how to deal with binary data?
                         # right now we skip
                         continue
-                files[fn] = data
+            files[fn] = data
         model['__files'] = files
+        if manifest:
+            model['__manifest'] = file_manifest
         return model
@@ -1,21 +1,51 @@
 import datetime
 import itertools
 import os
+import time
 import inspect
+import mimetypes
 import shutil
+import threading
+from collections import OrderedDict
 from functools import wraps
 
 from tornado import web
 
-from traitlets import Unicode
+from traitlets import Unicode, Float
 from IPython.utils import tz
 from notebook.utils import is_hidden, to_os_path, url_path_join
 from notebook.services.contents.filemanager import FileContentsManager
 
 from .manager import BundleManager
+from .cache import ListingCache
 from ..nbxmanager import NBXContentsManager
 from ..dispatch import DispatcherMixin
 from .. import shim
+from ..listing import top_models
+
+# methods that can change whether a path is a bundle or a file
+MUTATING = frozenset(['save', 'update', 'rename', 'delete'])
+
+def _arg_getter(sig, name):
+    """
+    Function that pulls name out of (args, kwargs) for a call to a method
+    with signature sig. Built once at decoration time.
+    """
+    params = list(sig.parameters)[1:] # skip self
+    if name not in params:
+        return None
+    index = params.index(name)
+    default = sig.parameters[name].default
+    if default is inspect.Parameter.empty:
+        default = ''
+
+    def get(args, kwargs):
+        if name in kwargs:
+            return kwargs[name]
+        if len(args) > index:
+            return args[index]
+        return default
+    return get
 
 def notebook_type_proxy(alt):
     """
@@ -28,18 +58,22 @@ def notebook_type_proxy(alt):
         if alt is None:
             alt = meth_name
         sig = inspect.signature(meth)
+        get_path = _arg_getter(sig, 'path') or (lambda args, kwargs: '')
+        get_new_path = _arg_getter(sig, 'new_path')
+        mutates = alt in MUTATING
 
         @wraps(meth)
         def wrapper(self, *args, **kwargs):
-            scope = kwargs.copy()
-            # skip self in args
-            scope.update(zip(list(sig.parameters)[1:], args))
-            path = scope.get('path', '')
-
-            method = meth.__get__(self)
-            if self.notebook_type(path=path) == 'file':
-                method = getattr(self.filemanager, alt)
-            return method(*args, **kwargs)
+            path = get_path(args, kwargs)
+            if self.notebook_type(path=path) != 'file':
+                return meth(self, *args, **kwargs)
+
+            ret = getattr(self.filemanager, alt)(*args, **kwargs)
+            if mutates:
+                self._forget_type(path)
+                if get_new_path is not None:
+                    self._forget_type(get_new_path(args, kwargs))
+            return ret
         return wrapper
     return decorator
 
@@ -49,11 +83,29 @@ class BundleNotebookManager(NBXContentsManager):
     root_dir = Unicode()
     trash_dir = Unicode(config=True)
 
+    listing_cache_max_age = Float(30, config=True, allow_none=True,
+        help="Max seconds to serve a cached directory listing. None for no limit")
+
+    notebook_type_max_age = Float(5, config=True,
+        help="Seconds to remember whether a path is a bundle or a file notebook")
+
+    # max number of paths in the notebook_type memo
+    notebook_type_max_entries = 4096
+
+    paged_listing = True
+
     def __init__(self, *args, **kwargs):
+        watcher = kwargs.pop('watcher', None)
         super().__init__(*args, **kwargs)
         self.bundler = BundleManager()
         self.filemanager = FileContentsManager(*args, **kwargs)
         self.filemanager.root_dir = self.root_dir
+        self.listing_cache = ListingCache(watcher=watcher,
+                                          max_age=self.listing_cache_max_age)
+        # path -> (notebook_type, time checked), oldest first. used from
+        # the IOLoop, crawl workers and the search thread
+        self._notebook_types = OrderedDict()
+        self._notebook_types_lock = threading.Lock()
 
     def _get_os_path(self, path=''):
         return to_os_path(path, self.root_dir)
@@ -84,11 +136,12 @@ class BundleNotebookManager(NBXContentsManager):
         """Save the notebook model and return the model with no content."""
 
         model = self.filemanager.save(model, path)
+        self._path_changed(path)
         return model
 
     @notebook_type_proxy(alt='exists')
     def notebook_exists(self, path=''):
-        return self._notebook_exists(path)
+        return self.notebook_type(path) == 'bundle'
 
     def _notebook_exists(self, path):
         path = path.strip('/')
@@ -96,12 +149,38 @@ class BundleNotebookManager(NBXContentsManager):
         return self.bundler.notebook_exists(os_path)
 
     def notebook_type(self, path=''):
+        """
+        'bundle', 'file' or None. Memoized per path for
+        notebook_type_max_age seconds. Writes through this manager forget
+        the path right away.
+        """
+        path = path.strip('/')
+        now = time.monotonic()
+        cached = self._notebook_types.get(path)
+        if cached is not None and now - cached[1] < self.notebook_type_max_age:
+            return cached[0]
+
+        nb_type = self._notebook_type(path)
+        types = self._notebook_types
+        with self._notebook_types_lock:
+            types.pop(path, None)
+            while types and len(types) >= self.notebook_type_max_entries:
+                # drop the oldest
+                types.popitem(last=False)
+            types[path] = (nb_type, now)
+        return nb_type
+
+    def _notebook_type(self, path):
         if self._notebook_exists(path):
             return 'bundle'
-        if self.filemanager.exists(path) and path.endswith('ipynb'):
+        if path.endswith('ipynb') and self.filemanager.exists(path):
             return 'file'
         return None
 
+    def _forget_type(self, path):
+        with self._notebook_types_lock:
+            self._notebook_types.pop(path.strip('/'), None)
+
     def is_hidden(self, path):
         return False
 
@@ -112,46 +191,121 @@ class BundleNotebookManager(NBXContentsManager):
         model['type'] = 'directory'
         return model
 
+    def _cached_listing(self, path, kind, loader):
+        """
+        Listings are cached per directory. Callers get shallow copies of the
+        models since the MetaManager/WorkareaManager rewrite their paths.
+        """
+        models = self._shared_listing(path, kind, loader)
+        return [dict(model) for model in models]
+
+    def _shared_listing(self, path, kind, loader):
+        """ The cached models themselves. Don't modify. """
+        os_path = self._get_os_path(path=path)
+        return self.listing_cache.get(os_path, kind, lambda: loader(path))
+
+    def _path_changed(self, path):
+        """
+        Drop cached listings touched by a write to path.
+        """
+        path = path.strip('/')
+        self._forget_type(path)
+        os_path = self._get_os_path(path=path)
+        self.listing_cache.invalidate(os_path)
+        self.listing_cache.invalidate(os.path.dirname(os_path))
+
+    def _scan(self, os_path):
+        """
+        Cached single pass DirectoryListing for os_path.
+        """
+        return self.listing_cache.get(os_path, 'scan',
+                                      lambda: self.bundler.scan(os_path))
+
+    def _entry_model(self, path, entry, model_type):
+        """
+        Build the FileContentsManager style model (no content) for a
+        DirEntry from a DirectoryListing. None if the entry can't be
+        stat'd.
+        """
+        entry_path = (path.strip('/') + '/' + entry.name).lstrip('/')
+        try:
+            model = self.filemanager._base_model(entry_path)
+        except (OSError, web.HTTPError) as e:
+            self.log.warning("Skipping %s: %s", entry.path, e)
+            return None
+        if model_type == 'file':
+            model['mimetype'] = mimetypes.guess_type(entry.path)[0]
+        model['type'] = model_type
+        return model
+
+    def _should_list(self, entry):
+        fm = self.filemanager
+        if entry.name.startswith('.') and not fm.allow_hidden:
+            return False
+        return fm.should_list(entry.name)
+
+    def _file_entries(self, path, kind):
+        # regular files are relative to the filemanager root. normally
+        # that is the same dir so the scan is shared.
+        os_path = self.filemanager._get_os_path(path)
+        listing = self._scan(os_path)
+        return [entry for entry in getattr(listing, kind)
+                if self._should_list(entry)]
+
     def list_dirs(self, path):
+        return self._cached_listing(path, 'dirs', self._list_dirs)
+
+    def _list_dirs(self, path):
         os_path = self._get_os_path(path=path)
-        dirs = self.bundler.list_dirs(os_path)
+        if not os.path.isdir(os_path):
+            raise Exception("{path} is not a directory".format(path=os_path))
+        listing = self._scan(os_path)
+        dirs = self.bundler.list_dirs(os_path, listing=listing)
         dirs = [self.get_dir_model(path) for path in dirs]
         return dirs
 
-    def list_notebooks(self, path):
+    def list_notebooks(self, path, limit=None, sort=None):
+        """
+        With limit or sort, only the selected models are copied.
+        """
+        if limit is None and sort is None:
+            return self._cached_listing(path, 'notebooks', self._list_notebooks)
+        models = self._shared_listing(path, 'notebooks', self._list_notebooks)
+        return [dict(model) for model in top_models(models, limit, sort=sort)]
+
+    def _list_notebooks(self, path):
         os_path = self._get_os_path(path=path)
-        bundles = self.bundler.list_bundles(os_path)
+        listing = self._scan(os_path)
+        bundles = self.bundler.list_bundles(os_path, listing=listing)
         notebooks = []
         for bundle_path, bundle in bundles.items():
-            model = bundle.get_model(content=False)
+            # metadata only, never open the files inside the bundle
+            model = bundle.get_model(content=False, file_content=False)
             # the model returned from BundleManager is absolute
             # set back to relative
             model['path'] = os.path.join(path, bundle.name)
             notebooks.append(model)
 
         # also grab regular notebooks
-        dir_model = self.filemanager.get(path=path, content=True)
-        for model in dir_model['content']:
-            if model['type'] == 'notebook':
+        for entry in self._file_entries(path, 'notebooks'):
+            model = self._entry_model(path, entry, 'notebook')
+            if model is not None:
                 notebooks.append(model)
 
         return notebooks
 
     def list_files(self, path):
-        os_path = self._get_os_path(path=path)
-        notebooks = []
+        return self._cached_listing(path, 'files', self._list_files)
 
-        # also grab regular notebooks
-        dir_model = self.filemanager.get(path=path, content=True)
-        for model in dir_model['content']:
-            if model['type'] == 'file':
-                notebooks.append(model)
-
-        return notebooks
+    def _list_files(self, path):
+        models = [self._entry_model(path, entry, 'file')
+                  for entry in self._file_entries(path, 'files')]
+        return [model for model in models if model is not None]
 
 
     @notebook_type_proxy(alt='get')
-    def get_notebook(self, path='', content=True, file_content=False, **kwargs):
+    def get_notebook(self, path='', content=True, file_content=False,
+                     manifest=False, **kwargs):
         path = path.strip('/')
         if not self.notebook_exists(path=path):
             raise Exception(
@@ -161,7 +315,8 @@ class BundleNotebookManager(NBXContentsManager):
             )
         os_path = self._get_os_path(path=path)
         bundle = self.bundler.get_notebook(os_path)
-        model = bundle.get_model(content=content, file_content=file_content)
+        model = bundle.get_model(content=content, file_content=file_content,
+                                 manifest=manifest)
         model['path'] = path
         model['format'] = None
         if content:
@@ -183,6 +338,7 @@ class BundleNotebookManager(NBXContentsManager):
 
         abspath = self._get_os_path(path=path)
         self.bundler.save_notebook(model, path=abspath)
+        self._path_changed(path)
 
         model = self.get_notebook(path, content=False)
         return model
@@ -206,6 +362,8 @@ class BundleNotebookManager(NBXContentsManager):
 
         if path != new_path:
             self.bundler.rename_notebook(os_path, new_os_path)
+            self._path_changed(path)
+            self._path_changed(new_path)
         print(new_path)
         model = self.get_notebook(new_path, content=False)
         return model
@@ -232,6 +390,7 @@ class BundleNotebookManager(NBXContentsManager):
             trash_path = os.path.join(self.trash_dir, trash_name)
 
         shutil.move(bundle_path, trash_path)
+        self._path_changed(path)
 
     # Checkpoint-related utilities
     def _get_checkpoint_dir(self, path):
@@ -0,0 +1,204 @@
+"""
+Caches for the bundle backend.
+"""
+import io
+import os
+import time
+import threading
+from collections import OrderedDict
+
+import nbformat
+
+
+class DirectoryWatcher(object):
+    """
+    Interface for pushing filesystem changes into a ListingCache.
+
+    A watcher (say inotify based) calls `callback(path)` whenever the
+    directory at `path` changes. When a ListingCache has a watcher it stops
+    stat'ing directories and trusts the watcher to invalidate.
+    """
+    def watch(self, path, callback):
+        raise NotImplementedError()
+
+    def unwatch(self, path):
+        raise NotImplementedError()
+
+
+class ListingCache(object):
+    """
+    Per-directory cache of listing results.
+
+    Without a watcher, entries are keyed on the directory mtime. Note that a
+    directory mtime only changes when entries are added, removed or renamed.
+    Writes that go through the manager invalidate explicitly, but an
+    in-place edit done outside of the server won't be seen until `max_age`
+    seconds have passed.
+
+    Parameters
+    ----------
+    watcher : DirectoryWatcher, optional
+    max_age : float, optional
+        Max seconds an entry is served without reloading. None for no limit.
+    max_entries : int
+    """
+    def __init__(self, watcher=None, max_age=None, max_entries=4096):
+        self.watcher = watcher
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._watched = set()
+        # workarea crawls list directories from several threads
+        self._lock = threading.Lock()
+
+    def _stamp(self, os_path):
+        if self.watcher is not None:
+            return None
+        return os.stat(os_path).st_mtime_ns
+
+    def get(self, os_path, kind, loader):
+        """
+        Return the cached `kind` listing for os_path, calling `loader()` on
+        a miss.
+        """
+        try:
+            stamp = self._stamp(os_path)
+        except OSError:
+            # let the loader raise/handle missing dirs
+            self.misses += 1
+            return loader()
+
+        with self._lock:
+            kinds = self._entries.get(os_path)
+            if kinds is not None and kind in kinds:
+                entry_stamp, loaded_at, value = kinds[kind]
+                fresh = (self.max_age is None or
+                         time.monotonic() - loaded_at < self.max_age)
+                if entry_stamp == stamp and fresh:
+                    self._entries.move_to_end(os_path)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+
+        value = loader()
+        with self._lock:
+            kinds = self._entries.get(os_path)
+            if kinds is None:
+                kinds = self._entries[os_path] = {}
+            kinds[kind] = (stamp, time.monotonic(), value)
+            self._entries.move_to_end(os_path)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        if self.watcher is not None and os_path not in self._watched:
+            self.watcher.watch(os_path, self.invalidate)
+            self._watched.add(os_path)
+        return value
+
+    def invalidate(self, os_path):
+        with self._lock:
+            if self._entries.pop(os_path, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'size': len(self._entries),
+        }
+
+
+class NotebookCache(object):
+    """
+    Bounded cache of parsed notebooks keyed on (path, mtime_ns, size).
+
+    Parsing and validating a large notebook with outputs is the most
+    expensive part of serving it. Entries are weighed by their file size and
+    the least recently used ones are dropped once `max_bytes` is exceeded.
+
+    Callers always get their own copy of the notebook since the contents
+    machinery mutates them (signing, trust marks, metadata).
+    """
+    def __init__(self, max_bytes=128 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def read(self, path):
+        """
+        Return the notebook at path as v4. Reads through the cache.
+        """
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == key:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return nbformat.from_dict(entry[1])
+            self.misses += 1
+
+        with io.open(path, 'r', encoding='utf-8') as f:
+            nb = nbformat.read(f, as_version=4)
+        self._put(path, key, nb)
+        return nbformat.from_dict(nb)
+
+    def store(self, path, nb):
+        """
+        Prime the cache with a notebook that was just written to path.
+        """
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        self._put(path, key, nbformat.from_dict(nb))
+
+    def _put(self, path, key, nb):
+        size = key[1]
+        with self._lock:
+            self._discard(path)
+            if size > self.max_bytes:
+                return
+            self._entries[path] = (key, nb)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (evicted_key, _) = self._entries.popitem(last=False)
+                self.bytes -= evicted_key[1]
+                self.evictions += 1
+
+    def _discard(self, path):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self.bytes -= entry[0][1]
+
+    def invalidate(self, path):
+        with self._lock:
+            self._discard(path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+        }
+
+
+# shared by every bundle manager in the process
+notebook_cache = NotebookCache()
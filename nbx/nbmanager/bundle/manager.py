@@ -3,6 +3,7 @@ import io
 import shutil
 
 from .bundle import NotebookBundle
+from .cache import notebook_cache as default_notebook_cache
 
 import nbformat
 from nbformat import sign
@@ -20,20 +21,71 @@ def is_notebook(path):
     return has_file
 
 
-def _list_bundles(path):
-    root, dirs, files = next(os.walk(path))
-    bundles = (os.path.join(root, d) for d in dirs)
-    bundles = filter(lambda path: is_notebook(path), bundles)
-    bundles = list(bundles)
-    return bundles
+class DirectoryListing(object):
+    """
+    Result of a single scandir pass over a directory. Children are
+    classified as bundles, plain dirs, notebook files and other files.
+
+    The entries are os.DirEntry objects so their stat results are cached.
+    """
+    def __init__(self, path, bundles, dirs, notebooks, files):
+        self.path = path
+        self.bundles = bundles
+        self.dirs = dirs
+        self.notebooks = notebooks
+        self.files = files
+
+    def __repr__(self):
+        return ("DirectoryListing(path={path}, bundles={bundles}, dirs={dirs},"
+                " notebooks={notebooks}, files={files})").format(
+                    path=self.path,
+                    bundles=len(self.bundles),
+                    dirs=len(self.dirs),
+                    notebooks=len(self.notebooks),
+                    files=len(self.files),
+                )
+
+
+def scan_directory(path):
+    bundles = []
+    dirs = []
+    notebooks = []
+    files = []
+    with os.scandir(path) as it:
+        for entry in it:
+            name = entry.name
+            is_ipynb = name.endswith('.ipynb')
+            if entry.is_dir():
+                # same check as is_notebook, minus re-testing the suffix
+                if is_ipynb and os.path.isfile(os.path.join(entry.path, name)):
+                    bundles.append(entry)
+                else:
+                    dirs.append(entry)
+            elif is_ipynb:
+                notebooks.append(entry)
+            else:
+                files.append(entry)
+    return DirectoryListing(path, bundles, dirs, notebooks, files)
+
+
+def _list_bundles(path, listing=None):
+    if listing is None:
+        listing = scan_directory(path)
+    return [entry.path for entry in listing.bundles]
 
 
 class BundleManager(object):
     bundle_class = NotebookBundle
 
-    def __init__(self, bundle_class=None):
+    def __init__(self, bundle_class=None, notebook_cache=None):
         if bundle_class:
             self.bundle_class = bundle_class
+        if notebook_cache is None:
+            notebook_cache = default_notebook_cache
+        self.notebook_cache = notebook_cache
+
+    def _bundle(self, path):
+        return self.bundle_class(path, notebook_cache=self.notebook_cache)
 
     def _new_notebook(self):
         model = {}
@@ -83,7 +135,22 @@ class BundleManager(object):
             with io.open(nb_path, 'w', encoding='utf-8') as f:
                 nbformat.write(nb, f, version=nbformat.NO_CONVERT)
         except Exception as e:
+            self.notebook_cache.invalidate(nb_path)
             raise Exception(u'Unexpected error while autosaving notebook: %s %s' % (nb_path, e))
+        self._prime_cache(nb_path, nb)
+
+    def _prime_cache(self, nb_path, nb):
+        """
+        Seed the notebook cache with what we just wrote so the reads right
+        after a save (post save middleware, the returned model) don't
+        re-parse the file.
+        """
+        if nb.get('nbformat') != 4:
+            self.notebook_cache.invalidate(nb_path)
+            return
+        # go through the same transient stripping as the writer
+        nb = current.nbjson.strip_transient(nbformat.from_dict(nb))
+        self.notebook_cache.store(nb_path, nb)
 
     def write_files(self, bundle_path, model):
         # write files
@@ -132,16 +199,18 @@ class BundleManager(object):
             )
 
     def get_notebook(self, path):
-        bundle = self.bundle_class(path)
+        bundle = self._bundle(path)
         return bundle
 
-    def list_bundles(self, path):
+    def scan(self, path):
+        return scan_directory(path)
+
+    def list_bundles(self, path, listing=None):
         """
         Get list of bundles in a certain path
         """
-        cls = self.bundle_class
-        bundles = _list_bundles(path)
-        bundles = dict([(path, cls(path)) for path in bundles])
+        bundles = _list_bundles(path, listing=listing)
+        bundles = dict([(path, self._bundle(path)) for path in bundles])
         return bundles
 
     def list_bundles_by_name(self, path):
@@ -151,19 +220,16 @@ class BundleManager(object):
         bundles = self.list_bundles(path)
         return {bundle.name: bundle for bundle in bundles.values()}
 
-    def list_dirs(self, path):
+    def list_dirs(self, path, listing=None):
         """
         Return list of dir names
         """
-        if not os.path.isdir(path):
-            raise Exception("{path} is not a directory".format(path=path))
-        root, dirs, files = next(os.walk(path))
-        # remove dirs that are notebooks
-        bundles = filter(
-            lambda d: not is_notebook(os.path.join(root, d)),
-            dirs
-        )
-        return bundles
+        if listing is None:
+            if not os.path.isdir(path):
+                raise Exception("{path} is not a directory".format(path=path))
+            listing = scan_directory(path)
+        # bundles are already split out from the plain dirs
+        return [entry.name for entry in listing.dirs]
 
     def copy_notebook_file(self, path, cp_path=None):
         nb_path = self._get_nb_path(path)
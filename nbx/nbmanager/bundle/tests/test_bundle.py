@@ -1,5 +1,7 @@
 import os.path
 
+import mock
+
 from .. import bundle as bmod
 from .common import fake_file_system
 
@@ -55,3 +57,24 @@ class TestNotebookBundle:
             for name, b in bundles.items():
                 test = b.notebook_content['metadata']['filename']
                 assert test == b.name
+
+    def test_get_model_metadata_only(self):
+        """
+        get_model(file_content=False) should not open the bundle files
+        """
+        with fake_file_system() as td:
+            bundles = wrap_bundles(td, bmod.NotebookBundle)
+            second = bundles['second.ipynb']
+            with mock.patch('builtins.open') as mopen:
+                model = second.get_model(content=False, file_content=False,
+                                         manifest=True)
+                assert mopen.call_count == 0
+            assert model['__files'] == {'data.py': None}
+            manifest = model['__manifest']
+            assert_items_equal(manifest, ['data.py'])
+            assert manifest['data.py']['size'] == len('# data.py')
+            assert 'last_modified' in manifest['data.py']
+
+            # manifest is opt in
+            model = second.get_model(content=False, file_content=False)
+            assert '__manifest' not in model
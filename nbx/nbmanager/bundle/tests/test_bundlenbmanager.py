@@ -1,4 +1,5 @@
 import os
+import threading
 from contextlib import contextmanager
 
 from nbx.tools import assert_items_equal
@@ -45,6 +46,55 @@ class TestBundleNotebookManager:
         for notebook in notebooks:
             assert notebook['path'] == notebook['name']
 
+    def test_listing_cache(self):
+        with fake_file_system() as td:
+            mgr = BundleNotebookManager(root_dir=td)
+            notebooks = mgr.list_notebooks('')
+            # callers are free to modify the returned models
+            notebooks[0]['path'] = 'changed'
+            test = mgr.list_notebooks('')
+            assert_items_equal([model['path'] for model in test],
+                               ['bob.ipynb', 'second.ipynb', 'test.ipynb'])
+            stats = mgr.listing_cache.stats()
+            assert stats['hits'] >= 1
+
+            # saving invalidates the listing for the parent dir
+            model = mgr.get_notebook('testing/subtest.ipynb')
+            before = mgr.list_notebooks('testing')
+            mgr.save_notebook(model, 'testing/new.ipynb')
+            after = mgr.list_notebooks('testing')
+            assert len(after) == len(before) + 1
+
+    def test_get_dir_paging(self):
+        with fake_file_system() as td:
+            mgr = BundleNotebookManager(root_dir=td)
+            full = mgr.get('', type='directory')['content']
+            names = sorted(model['name'] for model in full)
+
+            page = mgr.get('', type='directory', limit=2,
+                           sort='name')['content']
+            assert [model['name'] for model in page] == names[:2]
+            page = mgr.get('', type='directory', limit=2, offset=2,
+                           sort='name')['content']
+            assert [model['name'] for model in page] == names[2:4]
+
+            # pushed down into list_notebooks
+            notebooks = mgr.list_notebooks('', limit=1, sort='-name')
+            assert [model['name'] for model in notebooks] == ['test.ipynb']
+            notebooks[0]['name'] = 'changed'
+            test_names = [model['name'] for model in mgr.list_notebooks('')]
+            assert 'changed' not in test_names
+
+    def test_dangling_symlink(self):
+        with fake_file_system() as td:
+            os.symlink(os.path.join(td, 'missing.txt'),
+                       os.path.join(td, 'dangling.txt'))
+            mgr = BundleNotebookManager(root_dir=td)
+            names = [model['name'] for model in mgr.list_files('')]
+            assert 'dangling.txt' in names
+            content = mgr.get('', type='directory')['content']
+            assert 'dangling.txt' in [model['name'] for model in content]
+
     @bundletest
     def test_save_notebook(self, mgr):
         model = mgr.new_untitled(type='notebook')
@@ -74,6 +124,58 @@ class TestBundleNotebookManager:
         assert new_model['name'] == model['name']
         assert_items_equal(new_model['__files'], ['file1.txt'])
 
+    @bundletest
+    def test_notebook_type_memo(self, mgr):
+        probes = []
+        notebook_exists = mgr.bundler.notebook_exists
+        def counting(os_path):
+            probes.append(os_path)
+            return notebook_exists(os_path)
+        mgr.bundler.notebook_exists = counting
+
+        model = mgr.get_notebook('testing/subtest.ipynb')
+        assert len(probes) == 1
+        del probes[:]
+
+        mgr.save_notebook(model, 'testing/subtest.ipynb')
+        # the checks before the write are memo hits. the save forgets the
+        # path, so get_notebook at the end probes once
+        assert len(probes) == 1
+        assert mgr.notebook_type('testing/subtest.ipynb') == 'bundle'
+        assert len(probes) == 1
+
+        # saving a new notebook forgets that it didn't exist
+        assert mgr.notebook_type('testing/memo.ipynb') is None
+        mgr.save_notebook(model, 'testing/memo.ipynb')
+        assert mgr.notebook_type('testing/memo.ipynb') == 'bundle'
+
+        # entries expire
+        mgr.notebook_type_max_age = 0
+        del probes[:]
+        mgr.notebook_type('testing/memo.ipynb')
+        assert len(probes) == 1
+
+    @bundletest
+    def test_notebook_type_eviction(self, mgr):
+        mgr.notebook_type_max_entries = 8
+        mgr._notebook_type = lambda path: None
+
+        def check(n):
+            for i in range(500):
+                mgr.notebook_type('nb{0}-{1}.ipynb'.format(n, i))
+                mgr._forget_type('nb{0}-{1}.ipynb'.format(n, i - 1))
+
+        threads = [threading.Thread(target=check, args=(n,))
+                   for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        assert len(mgr._notebook_types) <= 8
+        # the newest check of a path is what's kept
+        mgr.notebook_type('nb0-0.ipynb')
+        assert list(mgr._notebook_types)[-1] == 'nb0-0.ipynb'
+
     @bundletest
     def test_get_notebook(self, mgr):
         # test subdirectory get_notebook
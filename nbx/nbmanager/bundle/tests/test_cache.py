@@ -0,0 +1,169 @@
+import os
+
+from IPython.utils.tempdir import TemporaryDirectory
+
+import nbformat
+
+from ..cache import ListingCache, DirectoryWatcher, NotebookCache
+from ..manager import BundleManager
+
+
+class FakeWatcher(DirectoryWatcher):
+    def __init__(self):
+        self.callbacks = {}
+
+    def watch(self, path, callback):
+        self.callbacks[path] = callback
+
+    def fire(self, path):
+        self.callbacks[path](path)
+
+
+class Loader(object):
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return [self.calls]
+
+
+class TestListingCache:
+
+    def test_mtime(self):
+        with TemporaryDirectory() as td:
+            cache = ListingCache()
+            loader = Loader()
+            assert cache.get(td, 'dirs', loader) == [1]
+            assert cache.get(td, 'dirs', loader) == [1]
+            assert loader.calls == 1
+            assert cache.stats()['hits'] == 1
+            assert cache.stats()['misses'] == 1
+
+            # kinds are cached separately
+            assert cache.get(td, 'files', loader) == [2]
+
+            # adding an entry bumps the dir mtime
+            st = os.stat(td)
+            os.mkdir(os.path.join(td, 'new'))
+            os.utime(td, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+            assert cache.get(td, 'dirs', loader) == [3]
+
+    def test_invalidate(self):
+        with TemporaryDirectory() as td:
+            cache = ListingCache()
+            loader = Loader()
+            cache.get(td, 'dirs', loader)
+            cache.invalidate(td)
+            assert cache.get(td, 'dirs', loader) == [2]
+            assert cache.stats()['invalidations'] == 1
+
+    def test_max_age(self):
+        with TemporaryDirectory() as td:
+            cache = ListingCache(max_age=0)
+            loader = Loader()
+            cache.get(td, 'dirs', loader)
+            cache.get(td, 'dirs', loader)
+            assert loader.calls == 2
+
+    def test_missing_dir(self):
+        cache = ListingCache()
+        loader = Loader()
+        cache.get('/does/not/exist', 'dirs', loader)
+        cache.get('/does/not/exist', 'dirs', loader)
+        assert loader.calls == 2
+        assert cache.stats()['size'] == 0
+
+    def test_watcher(self):
+        with TemporaryDirectory() as td:
+            watcher = FakeWatcher()
+            cache = ListingCache(watcher=watcher)
+            loader = Loader()
+            cache.get(td, 'dirs', loader)
+            assert td in watcher.callbacks
+
+            # watcher mode ignores mtime
+            os.mkdir(os.path.join(td, 'new'))
+            assert cache.get(td, 'dirs', loader) == [1]
+
+            watcher.fire(td)
+            assert cache.get(td, 'dirs', loader) == [2]
+
+
+def write_nb(path, source='1+1'):
+    nb = nbformat.v4.new_notebook()
+    nb.cells.append(nbformat.v4.new_code_cell(source))
+    with open(path, 'w') as f:
+        nbformat.write(nb, f)
+    return nb
+
+
+class TestNotebookCache:
+
+    def test_read(self):
+        with TemporaryDirectory() as td:
+            path = os.path.join(td, 'test.ipynb')
+            write_nb(path)
+
+            cache = NotebookCache()
+            nb = cache.read(path)
+            assert nb.cells[0].source == '1+1'
+            assert cache.stats()['misses'] == 1
+
+            nb2 = cache.read(path)
+            assert nb2 == nb
+            assert cache.stats()['hits'] == 1
+
+            # callers get their own copy
+            nb2.cells[0].source = 'changed'
+            assert cache.read(path).cells[0].source == '1+1'
+
+    def test_stale(self):
+        with TemporaryDirectory() as td:
+            path = os.path.join(td, 'test.ipynb')
+            write_nb(path)
+
+            cache = NotebookCache()
+            cache.read(path)
+            write_nb(path, source='2+2')
+            st = os.stat(path)
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+            nb = cache.read(path)
+            assert nb.cells[0].source == '2+2'
+            assert cache.stats()['misses'] == 2
+
+    def test_eviction(self):
+        with TemporaryDirectory() as td:
+            paths = []
+            for i in range(3):
+                path = os.path.join(td, 'test{0}.ipynb'.format(i))
+                write_nb(path)
+                paths.append(path)
+
+            size = os.stat(paths[0]).st_size
+            cache = NotebookCache(max_bytes=size * 2)
+            for path in paths:
+                cache.read(path)
+
+            stats = cache.stats()
+            assert stats['evictions'] == 1
+            assert stats['size'] == 2
+            assert stats['bytes'] <= size * 2
+
+            # first one was evicted
+            cache.read(paths[0])
+            assert cache.stats()['misses'] == 4
+
+    def test_write_primes(self):
+        with TemporaryDirectory() as td:
+            cache = NotebookCache()
+            bm = BundleManager(notebook_cache=cache)
+            model = {'content': write_nb(os.path.join(td, 'tmp.ipynb'))}
+            bm.save_notebook(model, os.path.join(td, 'test.ipynb'))
+
+            bundle = bm.get_notebook(os.path.join(td, 'test.ipynb'))
+            nb = bundle.notebook_content
+            assert nb.cells[0].source == '1+1'
+            assert cache.stats()['hits'] == 1
+            assert cache.stats()['misses'] == 0
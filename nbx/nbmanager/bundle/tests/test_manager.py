@@ -18,6 +18,25 @@ class TestManager:
             correct = (os.path.join(td, name) for name in correct)
             assert_items_equal(correct, mmod._list_bundles(td))
 
+    def test_scan_directory(self):
+        with fake_file_system() as td:
+            listing = mmod.scan_directory(td)
+            names = lambda entries: [entry.name for entry in entries]
+            assert_items_equal(names(listing.bundles),
+                               ['test.ipynb', 'second.ipynb'])
+            # empty.ipynb has no notebook file so it is a plain dir
+            assert_items_equal(names(listing.dirs),
+                               ['empty.ipynb', 'not_notebook', 'testing'])
+            assert_items_equal(names(listing.notebooks), ['bob.ipynb'])
+            assert_items_equal(names(listing.files), [])
+
+            # listing can be reused
+            bm = mmod.BundleManager()
+            assert_items_equal(bm.list_dirs(td, listing=listing),
+                               ['empty.ipynb', 'not_notebook', 'testing'])
+            bundles = bm.list_bundles(td, listing=listing)
+            assert_items_equal(bundles, mmod._list_bundles(td))
+
 
 class TestBundleManager:
 
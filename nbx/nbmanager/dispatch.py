@@ -9,6 +9,13 @@ logic can be used easily in the Middleware object.
 
 Not 100% on this.
 """
+# Contents API model types to the suffix of the dispatched methods
+API_TYPES = {
+    'directory': 'dir',
+    'notebook': 'notebook',
+    'file': 'file',
+}
+
 def _model_type_from_path(self, path):
     if self.is_dir(path):
         model_type = 'dir'
@@ -18,30 +25,59 @@ def _model_type_from_path(self, path):
         model_type = 'file'
     return model_type
 
-def dispatch_method(self, hook, model_type, *args, **kwargs):
-    # call type specific hook
-    method_name = "{hook}_{type}".format(hook=hook, type=model_type)
-    method = getattr(self, method_name, None)
-    if method:
-        return method(*args, **kwargs)
+# cls -> {(hook, model_type): method name or None}
+_dispatch_tables = {}
 
-    # try default
-    default_name = '{hook}_default'.format(hook=hook)
+def _dispatch_name(cls, hook, model_type):
+    """
+    Name of the method that handles hook for model_type on cls. Resolved
+    once per class.
+    """
+    table = _dispatch_tables.get(cls)
+    if table is None:
+        table = _dispatch_tables.setdefault(cls, {})
+    key = (hook, model_type)
     try:
-        default_method = getattr(self, default_name)
-    except:
-        raise AttributeError("Could not find method for {0} {1}".format(hook, model_type))
-    return default_method(*args, **kwargs)
+        return table[key]
+    except KeyError:
+        pass
+
+    method_name = "{hook}_{type}".format(hook=hook, type=model_type)
+    if not getattr(cls, method_name, None):
+        # try default
+        method_name = '{hook}_default'.format(hook=hook)
+        if not getattr(cls, method_name, None):
+            method_name = None
+    table[key] = method_name
+    return method_name
+
+def dispatch_method(self, hook, model_type, *args, **kwargs):
+    method_name = _dispatch_name(type(self), hook, model_type)
+    if method_name is None:
+        # could still be set on the instance
+        method = (getattr(self, "{0}_{1}".format(hook, model_type), None) or
+                  getattr(self, "{0}_default".format(hook), None))
+        if not method:
+            raise AttributeError("Could not find method for {0} {1}".format(hook, model_type))
+        return method(*args, **kwargs)
+    return getattr(self, method_name)(*args, **kwargs)
 
 def get(self, path='', content=True, dispatcher=dispatch_method, **kwargs):
     """
     Relies on:
         is_dir
         is_notebook
+
+    nbx code that already knows the model type can pass it as
+    model_type='directory' etc to skip probing the filesystem. The client
+    supplied `type` isn't trusted: the notebook editor asks for type=file
+    for bundle notebooks, which are directories on disk.
     """
     path = path.strip('/')
 
-    model_type = _model_type_from_path(self, path)
+    model_type = API_TYPES.get(kwargs.pop('model_type', None))
+    if model_type is None:
+        model_type = _model_type_from_path(self, path)
     return dispatcher(self, 'get', model_type,
                             path=path, content=content, **kwargs)
 
@@ -56,8 +92,11 @@ def update(self, model, path='', dispatcher=dispatch_method):
     model_type = 'notebook'
     return dispatcher(self, 'update', model_type, model, path=path)
 
-def delete(self, path='', dispatcher=dispatch_method):
-    model_type = _model_type_from_path(self, path)
+def delete(self, path='', dispatcher=dispatch_method, model_type=None):
+    """ model_type skips the probes, same as get """
+    model_type = API_TYPES.get(model_type)
+    if model_type is None:
+        model_type = _model_type_from_path(self, path)
     return dispatcher(self, 'delete', model_type, path=path)
 
 class DispatcherMixin(object):
@@ -76,9 +115,9 @@ class DispatcherMixin(object):
         return update(self, model, path,
                              dispatcher=self.dispatch_method.__func__)
 
-    def delete(self, path=''):
-        return delete(self, path,
-                             dispatcher=self.dispatch_method.__func__)
+    def delete(self, path='', model_type=None):
+        return delete(self, path, dispatcher=self.dispatch_method.__func__,
+                      model_type=model_type)
 
     def get(self, path='', content=True, **kwargs):
         return get(self, path, content,
@@ -1,12 +1,15 @@
+import atexit
+
 from traitlets.config.configurable import LoggingConfigurable
 from traitlets import (
-    Dict, Unicode, Integer, List, Bool, Bytes,
+    Dict, Unicode, Integer, List, Bool, Bytes, Float,
     DottedObjectName, TraitError, Tuple,
 )
 
 from notebook.services.contents.filemanager import FileContentsManager
 
 from .gist import GistService, model_to_files
+from .gistsync import GistSyncQueue
 from .bundle.bundlenbmanager import BundleNotebookManager
 from .dispatch import dispatch_method
 from .util import _path_split
@@ -25,6 +28,17 @@ class GistMiddleware(LoggingConfigurable):
 
     oauth_token = Unicode(config=True)
 
+    sync_async = Bool(True, config=True,
+                      help="Upload to github on a background thread instead "
+                           "of within the save request")
+    sync_max_retries = Integer(3, config=True)
+    sync_backoff = Float(1.0, config=True,
+                         help="Seconds before the first retry of a failed "
+                              "upload. Doubles on each retry.")
+    sync_shutdown_timeout = Float(10.0, config=True,
+                                  help="Seconds to wait at exit for queued "
+                                       "uploads to finish")
+
     def __init__(self, *args, **kwargs):
         super(GistMiddleware, self).__init__(*args, **kwargs)
 
@@ -35,6 +49,17 @@ class GistMiddleware(LoggingConfigurable):
         for user, pw in self.github_accounts:
             self.service.login(user, pw)
 
+        self.sync_queue = GistSyncQueue(
+            self.sync_gist,
+            max_retries=self.sync_max_retries,
+            backoff=self.sync_backoff,
+            log=self.log,
+        )
+        atexit.register(self.sync_queue.shutdown, self.sync_shutdown_timeout)
+
+    def sync_status(self, gist_id=None):
+        return self.sync_queue.status(gist_id)
+
 
     def post_save(self, nbm, local_path, model, path):
         if 'type' not in model:
@@ -62,12 +87,11 @@ class GistMiddleware(LoggingConfigurable):
         gist_id = model['content']['metadata'].get('gist_id', None)
         if gist_id is None:
             return
-        gist = self.service.get_gist(gist_id)
-        if not self.service.is_owned(gist):
-            return
 
         name = path.rsplit('/', 1)[-1]
 
+        # grab the files while still in the request so the upload reflects
+        # this save even if the notebook changes before the worker runs.
         try:
             # this is only applicable to bundles
             model = nbm.get(local_path, content=True, file_content=True)
@@ -75,10 +99,22 @@ class GistMiddleware(LoggingConfigurable):
             model = nbm.get(local_path, content=True)
 
         files = model_to_files(model)
+        if not self.sync_async:
+            self.sync_gist(gist_id, name, local_path, files)
+            return
+        self.sync_queue.submit(gist_id, gist_id, name, local_path, files,
+                               path=local_path)
+
+    def sync_gist(self, gist_id, name, local_path, files):
+        gist = self.service.get_gist(gist_id)
+        if not self.service.is_owned(gist):
+            return
+
         try:
             gist.save(description=name, files=files)
-        except:
-            print(files)
+        except Exception:
+            self.log.exception("Error saving %s to gist %s", local_path,
+                               gist_id)
             raise Exception('Error saving gist')
         else:
             msg = "Saved notebook {path} {name} to gist {gist_id}".format(name=name,
@@ -0,0 +1,197 @@
+"""
+Background syncing of notebooks to github gists.
+
+Uploading to github from within a save request blocks the server for as long
+as the api call takes. GistSyncQueue moves that work onto a worker thread.
+Jobs are keyed (normally on gist_id) and a key only ever has one pending job,
+so a burst of autosaves of the same notebook turns into a single upload of
+the latest content.
+"""
+import threading
+import time
+import logging
+from collections import deque
+
+
+class SyncStatus(object):
+    """
+    Sync bookkeeping for a single key.
+    """
+    def __init__(self, key):
+        self.key = key
+        self.path = None
+        self.pending = False
+        self.running = False
+        self.submitted = 0
+        self.synced = 0
+        self.attempts = 0
+        self.last_sync = None
+        self.last_error = None
+
+    def to_dict(self):
+        return {
+            'key': self.key,
+            'path': self.path,
+            'pending': self.pending,
+            'running': self.running,
+            'submitted': self.submitted,
+            'synced': self.synced,
+            'attempts': self.attempts,
+            'last_sync': self.last_sync,
+            'last_error': self.last_error,
+        }
+
+
+class GistSyncQueue(object):
+    """
+    Parameters
+    ----------
+    sync : callable
+        Called as `sync(*args)` on the worker thread.
+    max_retries : int
+        Number of retries after a failed sync before the job is dropped.
+    backoff : float
+        Seconds to wait before the first retry. Doubles on each retry.
+    log : logging.Logger, optional
+    """
+    def __init__(self, sync, max_retries=3, backoff=1.0, log=None):
+        self.sync = sync
+        self.max_retries = max_retries
+        self.backoff = backoff
+        if log is None:
+            log = logging.getLogger(__name__)
+        self.log = log
+
+        self._order = deque()
+        self._jobs = {}
+        self._status = {}
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run,
+                                        name='nbx-gist-sync')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, key, *args, path=None):
+        """
+        Queue a sync for key. If key already has a pending job, the pending
+        job is replaced with this one.
+        """
+        with self._cond:
+            status = self._status.get(key)
+            if status is None:
+                status = self._status[key] = SyncStatus(key)
+            status.submitted += 1
+            if path is not None:
+                status.path = path
+
+            if key not in self._jobs:
+                self._order.append(key)
+            self._jobs[key] = args
+            status.pending = True
+            self._start()
+            self._cond.notify_all()
+
+    @property
+    def depth(self):
+        """ Number of keys waiting to be synced """
+        with self._cond:
+            return len(self._jobs)
+
+    def status(self, key=None):
+        with self._cond:
+            if key is not None:
+                status = self._status.get(key)
+                return status and status.to_dict()
+            return dict((k, s.to_dict()) for k, s in self._status.items())
+
+    def _next(self):
+        with self._cond:
+            while not self._order and not self._stopped:
+                self._cond.wait()
+            if self._stopped:
+                return None, None
+            key = self._order.popleft()
+            args = self._jobs.pop(key)
+            status = self._status[key]
+            status.pending = False
+            status.running = True
+            return key, args
+
+    def _run(self):
+        while True:
+            key, args = self._next()
+            if key is None:
+                return
+            self._sync(key, args)
+
+    def _sync(self, key, args):
+        status = self._status[key]
+        delay = self.backoff
+        attempt = 0
+        while True:
+            attempt += 1
+            status.attempts += 1
+            try:
+                self.sync(*args)
+            except Exception as e:
+                status.last_error = repr(e)
+                # a newer save superseded this one, let it retry instead
+                superseded = key in self._jobs
+                if attempt > self.max_retries or superseded or self._stopped:
+                    self.log.error("Gist sync failed for %s: %r", key, e)
+                    break
+                self.log.warning("Gist sync failed for %s: %r. Retrying in "
+                                 "%s seconds", key, e, delay)
+                with self._cond:
+                    self._cond.wait_for(lambda: self._stopped, timeout=delay)
+                delay *= 2
+            else:
+                status.last_error = None
+                status.last_sync = time.time()
+                status.synced += 1
+                break
+
+        with self._cond:
+            status.running = False
+            self._cond.notify_all()
+
+    def join(self, timeout=None):
+        """
+        Block until every queued job has been processed. Returns False on
+        timeout.
+        """
+        def idle():
+            return not self._jobs and not any(s.running for s in
+                                              self._status.values())
+        with self._cond:
+            return self._cond.wait_for(idle, timeout=timeout)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def shutdown(self, timeout=None):
+        """
+        Give queued jobs up to timeout seconds to finish, then stop. The
+        worker is a daemon thread, so anything still queued when the
+        process exits is lost. Returns the keys that didn't finish, after
+        logging them.
+        """
+        if not self.join(timeout):
+            with self._cond:
+                unfinished = [s for s in self._status.values()
+                              if s.pending or s.running]
+            for status in unfinished:
+                self.log.warning("Gist sync for %s (%s) did not finish "
+                                 "before shutdown", status.key, status.path)
+        else:
+            unfinished = []
+        self.stop()
+        return [status.key for status in unfinished]
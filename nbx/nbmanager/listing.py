@@ -0,0 +1,67 @@
+"""
+Paging for directory listings.
+
+The Contents API returns every entry of a directory. The NBX contents
+handler also accepts `limit`, `offset` and `sort` so a "recent notebooks"
+view only has to build and ship the first few models. Managers that can
+push the limit down (BundleNotebookManager, WorkareaManager) take `limit`
+and `sort` in list_notebooks; everything else is paged after the fact.
+"""
+import heapq
+
+SORT_FIELDS = ('last_modified', 'name')
+# newest first
+DEFAULT_SORT = '-last_modified'
+
+
+def parse_sort(sort):
+    """
+    'name' -> ('name', False), '-last_modified' -> ('last_modified', True)
+    """
+    if sort is None:
+        sort = DEFAULT_SORT
+    reverse = sort.startswith('-')
+    field = sort.lstrip('-')
+    if field not in SORT_FIELDS:
+        raise ValueError("Can't sort by {0!r}".format(sort))
+    return field, reverse
+
+
+def _last_modified(model):
+    last_modified = model.get('last_modified')
+    if last_modified is None:
+        # dirs often have no date. they go last when newest is first
+        return float('-inf')
+    # mixes of naive and aware datetimes don't compare. timestamps do
+    return last_modified.timestamp()
+
+
+def _name(model):
+    return model.get('name') or ''
+
+
+SORT_KEYS = {
+    'last_modified': _last_modified,
+    'name': _name,
+}
+
+
+def top_models(models, limit=None, sort=None):
+    """
+    The first `limit` models in `sort` order. With a limit this is a heap
+    select, O(N log limit), instead of a full sort.
+    """
+    field, reverse = parse_sort(sort)
+    key = SORT_KEYS[field]
+    if limit is None:
+        return sorted(models, key=key, reverse=reverse)
+    if reverse:
+        return heapq.nlargest(limit, models, key=key)
+    return heapq.nsmallest(limit, models, key=key)
+
+
+def page_models(models, limit=None, offset=0, sort=None):
+    offset = offset or 0
+    if limit is None:
+        return top_models(models, sort=sort)[offset:]
+    return top_models(models, offset + limit, sort=sort)[offset:]
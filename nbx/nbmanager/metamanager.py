@@ -1,8 +1,10 @@
 import os
+import sys
+import logging
 import datetime
 
 from traitlets import (
-    Dict, Unicode, Integer, List, Bool, Bytes,
+    Dict, Unicode, Integer, List, Bool, Bytes, Float,
     DottedObjectName, TraitError, Tuple,
 )
 from IPython.utils.importstring import import_item
@@ -16,14 +18,21 @@ from nbx.nbmanager.tagged_gist.notebook_gisthub import notebook_gisthub
 from nbx.nbmanager.bundle.bundlenbmanager import BundleNotebookManager
 from nbx.nbmanager.scratchpad import WorkareaManager
 
-from .middleware import manager_hook
+from .middleware import manager_hook, hook_table, call_hooks
+from .search import SearchIndex, SearchCrawler, SearchMiddleware
+from .routing import PathRouter, ManagerMeta
 from .root_manager import RootManager
 from ..handlers import enable_custom_handlers
 from .nbxmanager import NBXContentsManager
+from .dispatch import DispatcherMixin
 
 from .static_handler import patch_file_handler
+from ..kernel_client import client_pool
+from .. import kernel_state
+from ..handlers.standalone import render_cache
 
 from notebook.services.kernels.kernelmanager import MappingKernelManager
+from jupyter_client import kernelspec
 
 def cwd_for_path(self, path):
     """Turn API path into absolute OS path."""
@@ -39,54 +48,82 @@ def cwd_for_path(self, path):
 
 MappingKernelManager.cwd_for_path = cwd_for_path
 
-patch_file_handler()
+TRACK_CWD_ARG = '--IPKernelApp.extra_extensions=nbx.extensions.track_cwd'
 
-ZMQStreamHandler.same_origin = lambda self: True
+# set by MetaManager.track_kernel_cwd
+MappingKernelManager.nbx_track_cwd = True
+
+def _is_python_kernel(self, kernel_name):
+    ksm = self.kernel_spec_manager
+    get_kernel_spec = ksm and ksm.get_kernel_spec or kernelspec.get_kernel_spec
+    try:
+        spec = get_kernel_spec(kernel_name)
+    except Exception:
+        return False
+    return spec.language == 'python'
 
-class ManagerMeta(object):
+_start_kernel = MappingKernelManager.start_kernel
+
+async def start_kernel(self, kernel_id=None, path=None, **kwargs):
     """
-    Example of regular notebook:
-        GET /server-home/dir1/dir2/notebook.ipynb
-        IPython Vars:
-            Name: notebook.ipynb
-            Path: /server-home/dir1/dir2
-        ManagerMeta Vars:
-            request_path: /server-home/dir1/dir2/notebook.ipynb
-            name: notebook.ipynb
-            path: /dir1/dir2
-            nbm_path: server-home
-
-    Example of 1-depth sub manager selection:
-        GET /server-home
-        IPython Vars:
-            Name: server-home
-            Path:
-        ManagerMeta Vars:
-            request_path: /server-home
-            name:
-            path:
-            nbm_path: server-home
+    Record the cwd of new kernels and have python kernels report cwd
+    changes. See nbx.kernel_state.
     """
-    # the original request path
-    request_path = None
+    if kernel_id is not None:
+        return await _start_kernel(self, kernel_id=kernel_id, path=path,
+                                   **kwargs)
+
+    kernel_name = kwargs.get('kernel_name') or self.default_kernel_name
+    tracked = self.nbx_track_cwd and _is_python_kernel(self, kernel_name)
+    if tracked:
+        extra_arguments = list(kwargs.get('extra_arguments') or [])
+        extra_arguments.append(TRACK_CWD_ARG)
+        kwargs['extra_arguments'] = extra_arguments
+
+    kernel_id = await _start_kernel(self, path=path, **kwargs)
+    # an untracked kernel's cwd goes stale on the first %cd. don't record it
+    if tracked:
+        if path is not None:
+            kernel_state.tracker.started(kernel_id, self.cwd_for_path(path))
+        kernel_state.tracker.watch(kernel_id, self.get_kernel(kernel_id))
+    return kernel_id
+
+MappingKernelManager.start_kernel = start_kernel
+
+_restart_kernel = MappingKernelManager.restart_kernel
+
+async def restart_kernel(self, kernel_id, now=False):
+    kernel_state.tracker.restarted(kernel_id)
+    render_cache.invalidate_kernel(kernel_id)
+    return await _restart_kernel(self, kernel_id, now=now)
+
+MappingKernelManager.restart_kernel = restart_kernel
 
-    #nbm alias
-    nbm_path = None
+_shutdown_kernel = MappingKernelManager.shutdown_kernel
 
-    # local name and path
-    path = None
-    name = None
+def shutdown_kernel(self, kernel_id, now=False, restart=False):
+    """Stop any pooled nbx client before the kernel goes away."""
+    client_pool.remove_kernel(kernel_id)
+    kernel_state.tracker.forget(kernel_id)
+    render_cache.invalidate_kernel(kernel_id)
+    return _shutdown_kernel(self, kernel_id, now=now, restart=restart)
 
-    def __repr__(self):
-        attrs = ["{0}={1}".format(k,v) for k, v in self.__dict__.items()]
-        return "ManagerMeta({0})".format(",".join(attrs))
+MappingKernelManager.shutdown_kernel = shutdown_kernel
+
+patch_file_handler()
+
+ZMQStreamHandler.same_origin = lambda self: True
 
 class MetaManager(NBXContentsManager):
     """
         Holds NotebookManager classes and routes calls to the appropiate
         manager.
     """
-    debug = Bool(True)
+    debug = Bool(False, config=True,
+                 help="Log path routing decisions at DEBUG level")
+
+    route_cache_size = Integer(1024, config=True,
+                               help="Number of resolved request paths to cache")
 
     file_dirs = Dict(config=True,
                            help="Dict of alias, path")
@@ -99,14 +136,46 @@ class MetaManager(NBXContentsManager):
     github_accounts = List(Tuple, config=True,
                            help="List of Tuple(github_account, github_password)")
 
+    gist_mirror_dir = Unicode(config=True,
+                              help="Directory to keep local mirrors of the "
+                                   "github gist lists in")
+
+    gist_max_age = Float(10, config=True,
+                         help="Seconds a fetched gist is reused before "
+                              "checking github for changes")
+
     manager_middleware = Dict(config=True,
                            help="Dict of Middleware")
 
+    middleware_slow_threshold = Float(0.5, config=True,
+                                      help="Log a warning when a middleware "
+                                           "hook takes longer than this many "
+                                           "seconds")
+
+    enable_search = Bool(False, config=True,
+                         help="Keep a full text index of every manager's "
+                              "notebooks for /api/nbx/search")
+
+    search_index_path = Unicode(config=True,
+                                help="sqlite file for the search index. Empty "
+                                     "keeps it in memory and rebuilds it on "
+                                     "start")
+
+    search_crawl_interval = Float(300, config=True, allow_none=True,
+                                  help="Seconds between background crawls "
+                                       "that bring the search index up to "
+                                       "date. None to only crawl on start")
+
     # Not sure if this should be optional. For now, make it configurable
     enable_custom_handlers = Bool(True, config=True, help="Enable Custom Handlers")
 
     enable_default_manager = Bool(True, config=True, help="Enable server-home manager")
 
+    track_kernel_cwd = Bool(True, config=True,
+                            help="Load the nbx.extensions.track_cwd extension "
+                                 "into python kernels so kernel-info can "
+                                 "answer without running code")
+
     root_dir = Unicode(os.getcwd())
     trash_dir = Unicode(config=True)
 
@@ -119,16 +188,24 @@ class MetaManager(NBXContentsManager):
         if self.enable_custom_handlers:
             enable_custom_handlers()
 
+        MappingKernelManager.nbx_track_cwd = self.track_kernel_cwd
+
         for alias, path in self.bundle_dirs.items():
             fb = BundleNotebookManager(root_dir=path, trash_dir=self.trash_dir)
             self.managers[alias] = fb
 
         for alias, workarea_paths in self.workarea_dirs.items():
-            fb = WorkareaManager(workarea_paths=workarea_paths)
+            fb = WorkareaManager(workarea_paths=workarea_paths,
+                                 config=self.config)
             self.managers[alias] = fb
 
         for user, pw in self.github_accounts:
-            gh = notebook_gisthub(user, pw)
+            mirror_path = None
+            if self.gist_mirror_dir:
+                mirror_path = os.path.join(self.gist_mirror_dir,
+                                           'gists-{0}.sqlite'.format(user))
+            gh = notebook_gisthub(user, pw, mirror_path=mirror_path,
+                                  max_age=self.gist_max_age)
             gbm = GistNotebookManager(gisthub=gh)
             self.managers['gist:'+user] = gbm
 
@@ -137,16 +214,52 @@ class MetaManager(NBXContentsManager):
             cls = import_item(middleware)
             self.middleware[name] = cls(parent=self, log=self.log)
 
+        self.search_index = None
+        self.search_crawler = None
+        if self.enable_search:
+            index_path = ':memory:'
+            if self.search_index_path:
+                index_path = os.path.expanduser(self.search_index_path)
+            self.search_index = SearchIndex(index_path, log=self.log)
+            self.middleware.setdefault(
+                'search', SearchMiddleware(parent=self, log=self.log))
+
+        self.middleware_hooks = hook_table(self.middleware)
+        # (middleware name, hook name) -> [calls, total seconds, max seconds]
+        self.middleware_timings = {}
+
         self.root = RootManager(meta_manager=self)
+        self.router = PathRouter(self.managers, root=self.root,
+                                 cache_size=self.route_cache_size)
+
+        if self.search_index is not None:
+            self.search_crawler = SearchCrawler(
+                self.search_index, self.managers,
+                interval=self.search_crawl_interval, log=self.log)
+            self.search_crawler.start()
 
     def dispatch_middleware(self, hook_name, *args, **kwargs):
         """
         dispatch hook calls to middleware
         """
-        for name, middleware in self.middleware.items():
-            method = getattr(middleware, hook_name, None)
-            if method is not None:
-                method(*args, **kwargs)
+        listeners = self.middleware_hooks.get(hook_name)
+        if listeners:
+            call_hooks(self, hook_name, listeners, args, kwargs)
+
+    def record_middleware_timing(self, name, hook_name, elapsed):
+        """
+        Called after every middleware hook. Override to send timings
+        elsewhere.
+        """
+        stats = self.middleware_timings.get((name, hook_name))
+        if stats is None:
+            stats = self.middleware_timings[(name, hook_name)] = [0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] = max(stats[2], elapsed)
+        if elapsed > self.middleware_slow_threshold:
+            self.log.warning("Slow middleware: %s.%s took %.3fs",
+                             name, hook_name, elapsed)
 
     def _nbm_from_path(self, path):
         """
@@ -157,33 +270,20 @@ class MetaManager(NBXContentsManager):
         IPython is odd in its handling of this. So I have to accept a name
         param. Sometimes the name is really a path. blah
         """
-        if self.debug:
-            print('nbm_from_path(path={0})'.format(path))
-            import inspect
-            print(inspect.stack()[1][3])
-
-        path = path.strip('/')
-
-        meta = ManagerMeta()
-        # we are on root
-        if not path:
-            meta.request_path = path
-            meta.path = ''
-            meta.nbm_path = ''
-            return self.root, meta
-
-        bits = path.split(os.sep)
-        manager_path = bits.pop(0)
-        local_path = os.sep.join(bits)
-
-        meta.request_path = path
-        meta.path = local_path
-        meta.nbm_path = manager_path
-
-        nbm = self.managers.get(manager_path)
-
-        if self.debug:
-            print(nbm, meta)
+        nbm, meta = self.router.resolve(path)
+        if self.debug and self.log.isEnabledFor(logging.DEBUG):
+            caller = sys._getframe(1).f_code.co_name
+            self.log.debug(
+                "nbm_from_path path=%r caller=%s nbm=%s nbm_path=%r path=%r",
+                path, caller, type(nbm).__name__, meta.nbm_path, meta.path,
+                extra={'nbx_route': {
+                    'request_path': path,
+                    'caller': caller,
+                    'manager': type(nbm).__name__,
+                    'nbm_path': meta.nbm_path,
+                    'local_path': meta.path,
+                }}
+            )
         return nbm, meta
 
     def list_dirs(self, path):
@@ -213,6 +313,9 @@ class MetaManager(NBXContentsManager):
 
     def get(self, path, content=True, **kwargs):
         nbm, meta = self._nbm_from_path(path)
+        model_type = kwargs.pop('model_type', None)
+        if model_type is not None and isinstance(nbm, DispatcherMixin):
+            kwargs['model_type'] = model_type
         model = nbm.get(meta.path, content=content, **kwargs)
 
         # while the local manager doesn't know its nbm_path,
@@ -280,10 +383,16 @@ class MetaManager(NBXContentsManager):
             model['path'] = os.path.join(meta.nbm_path, model['path'])
         return model
 
-    def delete(self, path):
-        """Delete notebook by name and path."""
+    def delete(self, path, model_type=None):
+        """
+        Delete notebook by name and path. Pass model_type if it's already
+        known to skip the manager's filesystem checks. Only our dispatching
+        managers take it; it's dropped for the others.
+        """
         nbm, meta = self._nbm_from_path(path)
-        return nbm.delete(meta.path)
+        if model_type is None or not isinstance(nbm, DispatcherMixin):
+            return nbm.delete(meta.path)
+        return nbm.delete(meta.path, model_type=model_type)
 
     def create_checkpoint(self, path):
         nbm, meta = self._nbm_from_path(path)
@@ -1,6 +1,53 @@
+import time
 import inspect
 import functools
 
+HOOK_PREFIXES = ('pre_', 'post_')
+
+def _takes_result(method):
+    try:
+        params = inspect.signature(method).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    for param in params:
+        if param.name == 'result' or param.kind == param.VAR_KEYWORD:
+            return True
+    return False
+
+def hook_table(middleware):
+    """
+    Build the dispatch table for a dict of middleware.
+
+    Returns {hook_name: [(middleware_name, method, takes_result)]} with an
+    entry only for hooks that some middleware implements. takes_result is
+    True for post hooks that accept a `result` keyword.
+    """
+    table = {}
+    for name, mw in middleware.items():
+        for attr in dir(mw):
+            if not attr.startswith(HOOK_PREFIXES):
+                continue
+            method = getattr(mw, attr, None)
+            if not callable(method):
+                continue
+            takes_result = attr.startswith('post_') and _takes_result(method)
+            table.setdefault(attr, []).append((name, method, takes_result))
+    return table
+
+def call_hooks(manager, hook_name, listeners, args, kwargs, result=None):
+    """
+    Call each listener and report how long it took to
+    manager.record_middleware_timing.
+    """
+    for name, method, takes_result in listeners:
+        start = time.perf_counter()
+        if takes_result:
+            method(*args, result=result, **kwargs)
+        else:
+            method(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        manager.record_middleware_timing(name, hook_name, elapsed)
+
 def manager_hook(func):
     """
     decorator to route manager method calls to middleware.
@@ -16,28 +63,39 @@ def manager_hook(func):
         def pre_save_notebook(self, nbm, local_path, model, name, path):
             pass
 
-        def post_save_notebook(self, nbm, local_path, model, name, path):
+        def post_save_notebook(self, nbm, local_path, model, name, path,
+                               result=None):
             pass
+
+    Post hooks that take a `result` keyword get the return value of the
+    wrapped call. When no middleware implements either hook, the call goes
+    straight through without resolving the path.
     """
     func_name = func.__name__
+    pre_name = 'pre_' + func_name
+    post_name = 'post_' + func_name
     sig = inspect.signature(func)
     path_index = list(sig.parameters).index('path') 
     path_index -= 1 # skip self
     @functools.wraps(func)
     def _wrapped(self, *args, **kwargs):
+        hooks = self.middleware_hooks
+        pre = hooks.get(pre_name)
+        post = hooks.get(post_name)
+        if not (pre or post):
+            return func(self, *args, **kwargs)
+
         # grab path based on argspec
         if len(args) > path_index:
             path = args[path_index]
         else:
             path = kwargs.get('path')
         nbm, meta = self._nbm_from_path(path)
-        local_path = meta.path
-        # call pre hook
-        self.dispatch_middleware('pre_'+func_name, nbm, local_path, *args, **kwargs)
+        hook_args = (nbm, meta.path) + args
+        if pre:
+            call_hooks(self, pre_name, pre, hook_args, kwargs)
         res = func(self, *args, **kwargs)
-        # call post hook
-        # TODO: I should pass in res to post hook?
-        self.dispatch_middleware('post_'+func_name, nbm, local_path, *args, **kwargs)
+        if post:
+            call_hooks(self, post_name, post, hook_args, kwargs, result=res)
         return res
     return _wrapped
-
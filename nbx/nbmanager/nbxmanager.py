@@ -5,6 +5,7 @@ from notebook.services.contents.manager import ContentsManager
 from notebook.utils import url_path_join
 
 from .dispatch import DispatcherMixin
+from .listing import page_models
 
 def _fullpath(name, path):
     fullpath = url_path_join(path, name)
@@ -19,6 +20,9 @@ def _path_split(path):
     return name, path
 
 class NBXContentsManager(DispatcherMixin, ContentsManager):
+    # list_notebooks takes limit and sort
+    paged_listing = False
+
     def __init__(self, *args, **kwargs):
         super(NBXContentsManager, self).__init__(*args, **kwargs)
 
@@ -50,23 +54,35 @@ class NBXContentsManager(DispatcherMixin, ContentsManager):
         return super().get(path=path, content=content, **kwargs)
 
     # shims to bridge Content service and older notebook apis
-    def get_dir(self, path='', content=True, **kwargs):
+    def get_dir(self, path='', content=True, limit=None, offset=0,
+                sort=None, **kwargs):
         """
         retrofit to use old list_dirs. No notebooks
         note that this requires the dispatcher mixin
+
+        limit/offset/sort page the listing. See nbx.nbmanager.listing
         """
         model = self._base_model(path)
         fullpath = path
+        paged = limit is not None or sort is not None or offset
 
         model['type'] = 'directory'
         model['format'] = 'json'
         dirs = self.list_dirs(fullpath)
-        notebooks = self.list_notebooks(fullpath)
+        if paged and self.paged_listing:
+            top = None
+            if limit is not None:
+                top = (offset or 0) + limit
+            notebooks = self.list_notebooks(fullpath, limit=top, sort=sort)
+        else:
+            notebooks = self.list_notebooks(fullpath)
 
         files = []
         if hasattr(self, 'list_files'):
             files = self.list_files(fullpath)
 
         entries = list(dirs) + list(notebooks) + list(files)
+        if paged:
+            entries = page_models(entries, limit, offset, sort)
         model['content'] = entries
         return model
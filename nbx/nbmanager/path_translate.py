@@ -1,7 +1,7 @@
 from notebook.services.contents.manager import ContentsManager
 
 from .shim import ShimManager
-from .util import get_invoked_arg, set_invoked_arg, _path_split
+from .util import arg_map, _path_split
 
 class PathTranslateShim(ShimManager):
     """
@@ -19,36 +19,41 @@ class PathTranslateShim(ShimManager):
             return True
         return False
 
+    @classmethod
+    def _build_shim_specs(cls, target):
+        legacy = getattr(target, 'get_notebook', None)
+        if legacy is None:
+            return {}
+        return {'get_notebook': arg_map(legacy)}
+
     def _shim(self, name):
         legacy = getattr(self._manager, name)
-        def method(self, *args, **kwargs):
+        legacy_args = self._shim_specs.get(name) or arg_map(legacy)
+        has_model = 'model' in legacy_args
+
+        def method(*args, **kwargs):
             args = list(args) # make mutable
-            old_name = name = get_invoked_arg(legacy, 'name', args, kwargs)
+            name = legacy_args.get('name', args, kwargs)
             name = self.translate_path(name)
             name, path = _path_split(name)
-            set_invoked_arg(legacy, 'name', name, args, kwargs)
-            set_invoked_arg(legacy, 'path', path, args, kwargs)
+            legacy_args.set('name', name, args, kwargs)
+            legacy_args.set('path', path, args, kwargs)
 
             # see if we're getting a model. update the name and name
             # in model to represent the old way
-            try:
-                model = get_invoked_arg(legacy, 'model', args, kwargs)
-                model_name = model.get('name', '')
-                model_name = self.translate_path(model_name)
-                model_name, model_path = _path_split(model_name)
-                model['name'] = model_name
-                model['path'] = model_path
-                set_invoked_arg(legacy, 'model', model, args, kwargs)
-            except:
-                pass
+            if has_model:
+                try:
+                    model = legacy_args.get('model', args, kwargs)
+                    model_name = model.get('name', '')
+                    model_name = self.translate_path(model_name)
+                    model_name, model_path = _path_split(model_name)
+                    model['name'] = model_name
+                    model['path'] = model_path
+                    legacy_args.set('model', model, args, kwargs)
+                except:
+                    pass
 
-            try:
-                ret = legacy(*args, **kwargs)
-                return ret
-            except Exception as e:
-                # TODO add debugging prints here
-                raise e
-        method = method.__get__(self)
+            return legacy(*args, **kwargs)
         return method
 
     def translate_path(self, path):
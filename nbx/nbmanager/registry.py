@@ -0,0 +1,195 @@
+"""
+Durable notebook key registry for WorkareaManager.
+
+The workarea listing names every notebook `[KEY].ipynb` and the notebook
+handler redirects those names back to the real notebook. Keys used to be
+random and only kept in memory, so links broke on restart. Here keys are
+derived from the notebook's path (`alias/path/name`) and stored in a sqlite
+file so a key resolves without listing the workarea first.
+
+Keys are 6 characters from A-Z0-9. On the rare hash collision the path is
+rehashed with a counter until a free key turns up. Once assigned, a key
+never changes while its notebook exists.
+"""
+import hashlib
+import logging
+import sqlite3
+import string
+import threading
+
+KEY_LENGTH = 6
+KEY_CHARS = string.ascii_uppercase + string.digits
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    path_key TEXT UNIQUE,
+    manager_path TEXT,
+    path TEXT,
+    name TEXT
+);
+"""
+
+
+def path_key_hash(path_key, attempt=0):
+    data = path_key
+    if attempt:
+        data = '{0}#{1}'.format(path_key, attempt)
+    digest = hashlib.sha1(data.encode('utf-8')).digest()
+    n = int.from_bytes(digest[:8], 'big')
+    chars = []
+    for i in range(KEY_LENGTH):
+        n, r = divmod(n, len(KEY_CHARS))
+        chars.append(KEY_CHARS[r])
+    return ''.join(chars)
+
+
+class NotebookRegistry(object):
+    """
+    Parameters
+    ----------
+    path : str
+        sqlite file. ':memory:' keeps the registry for the life of the
+        process only.
+    log : logging.Logger, optional
+    """
+    def __init__(self, path=':memory:', log=None):
+        self.path = path
+        self.log = log or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._by_key = {}
+        self._by_path_key = {}
+        self._pruner = None
+        self._stop = threading.Event()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        self._load()
+
+    def _load(self):
+        rows = self.conn.execute(
+            "SELECT key, path_key, manager_path, path, name FROM entries"
+        ).fetchall()
+        for row in rows:
+            self._remember(self._row_dict(row))
+
+    def _row_dict(self, row):
+        key, path_key, manager_path, path, name = row
+        return {
+            'key': key,
+            'path_key': path_key,
+            'manager_path': manager_path,
+            'path': path,
+            'name': name,
+        }
+
+    def _remember(self, entry):
+        self._by_key[entry['key']] = entry
+        self._by_path_key[entry['path_key']] = entry
+
+    def __len__(self):
+        return len(self._by_key)
+
+    def __contains__(self, key):
+        return key in self._by_key
+
+    def __getitem__(self, key):
+        entry = self.get(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry
+
+    def get(self, key, default=None):
+        """ Entry for a key or path_key. """
+        entry = self._by_key.get(key)
+        if entry is None:
+            entry = self._by_path_key.get(key, default)
+        return entry
+
+    def assign(self, manager_path, path, name):
+        """ Return the entry for a notebook, creating it if needed. """
+        return self.assign_many([(manager_path, path, name)])[0]
+
+    def assign_many(self, notebooks):
+        """
+        Entries for an iterable of (manager_path, path, name). New entries
+        are written in one transaction.
+        """
+        entries = []
+        new = []
+        with self._lock:
+            for manager_path, path, name in notebooks:
+                path_key = manager_path + '/' + '/'.join(
+                    bit for bit in (path, name) if bit)
+                entry = self._by_path_key.get(path_key)
+                if entry is None:
+                    entry = {
+                        'key': self._free_key(path_key),
+                        'path_key': path_key,
+                        'manager_path': manager_path,
+                        'path': path,
+                        'name': name,
+                    }
+                    self._remember(entry)
+                    new.append(entry)
+                entries.append(entry)
+
+            if new:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                    [(e['key'], e['path_key'], e['manager_path'], e['path'],
+                      e['name']) for e in new])
+                self.conn.commit()
+        return entries
+
+    def _free_key(self, path_key):
+        attempt = 0
+        while True:
+            key = path_key_hash(path_key, attempt)
+            if key not in self._by_key:
+                return key
+            attempt += 1
+
+    def remove(self, keys):
+        with self._lock:
+            for key in keys:
+                entry = self._by_key.pop(key, None)
+                if entry is not None:
+                    self._by_path_key.pop(entry['path_key'], None)
+            self.conn.executemany("DELETE FROM entries WHERE key = ?",
+                                  [(key,) for key in keys])
+            self.conn.commit()
+
+    def prune(self, exists):
+        """
+        Remove entries for notebooks that are gone. `exists(entry)` says
+        whether an entry's notebook still exists. Returns the removed keys.
+        """
+        entries = list(self._by_key.values())
+        gone = [entry['key'] for entry in entries if not exists(entry)]
+        if gone:
+            self.remove(gone)
+        return gone
+
+    def start_pruning(self, exists, interval):
+        """ prune() every `interval` seconds on a daemon thread. """
+        if self._pruner is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    gone = self.prune(exists)
+                    if gone:
+                        self.log.debug("Pruned %d workarea registry entries",
+                                       len(gone))
+                except Exception:
+                    self.log.exception("Workarea registry prune failed")
+
+        self._pruner = threading.Thread(target=run, name='nbx-registry-prune',
+                                        daemon=True)
+        self._pruner.start()
+
+    def close(self):
+        self._stop.set()
+        self.conn.close()
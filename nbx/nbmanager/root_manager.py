@@ -2,6 +2,8 @@ import datetime
 
 from notebook.services.contents.manager import ContentsManager
 
+from .listing import page_models
+
 class RootManager(ContentsManager):
     """
     Handle the root path "/"
@@ -26,9 +28,9 @@ class RootManager(ContentsManager):
             dirs.append(model)
         return dirs
 
-    def get(self, path, content=True, type=None, format=None):
+    def get(self, path, content=True, type=None, format=None, **kwargs):
         if type == 'directory':
-            return self.get_dir(path)
+            return self.get_dir(path, **kwargs)
 
     def _get_dir_model(self, name):
         model ={}
@@ -67,11 +69,14 @@ class RootManager(ContentsManager):
         model['mimetype'] = None
         return model
 
-    def get_dir(self, path='', content=True, **kwargs):
+    def get_dir(self, path='', content=True, limit=None, offset=0,
+                sort=None, **kwargs):
         """ retrofit to use old list_dirs. No notebooks """
         model = self._base_model(path)
         model['type'] = 'directory'
         dirs = self.list_dirs(path)
+        if limit is not None or sort is not None or offset:
+            dirs = page_models(dirs, limit, offset, sort)
         model['content'] = dirs
         model['format'] = 'json'
         return model
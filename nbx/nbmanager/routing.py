@@ -0,0 +1,163 @@
+"""
+Path routing for the MetaManager.
+
+Every Contents API call into the MetaManager has to figure out which sub
+manager owns the request path. The configured aliases don't change after
+startup, so we compile them once into a prefix trie keyed on path segments
+and keep a bounded LRU of resolved paths. The tree listing endpoints tend to
+hit the same handful of paths over and over.
+"""
+from collections import OrderedDict
+
+
+class ManagerMeta(object):
+    """
+    Example of regular notebook:
+        GET /server-home/dir1/dir2/notebook.ipynb
+        IPython Vars:
+            Name: notebook.ipynb
+            Path: /server-home/dir1/dir2
+        ManagerMeta Vars:
+            request_path: /server-home/dir1/dir2/notebook.ipynb
+            name: notebook.ipynb
+            path: /dir1/dir2
+            nbm_path: server-home
+
+    Example of 1-depth sub manager selection:
+        GET /server-home
+        IPython Vars:
+            Name: server-home
+            Path:
+        ManagerMeta Vars:
+            request_path: /server-home
+            name:
+            path:
+            nbm_path: server-home
+    """
+    # the original request path
+    request_path = None
+
+    #nbm alias
+    nbm_path = None
+
+    # local name and path
+    path = None
+    name = None
+
+    def __repr__(self):
+        attrs = ["{0}={1}".format(k,v) for k, v in self.__dict__.items()]
+        return "ManagerMeta({0})".format(",".join(attrs))
+
+
+class _TrieNode(object):
+    __slots__ = ('children', 'alias', 'manager')
+
+    def __init__(self):
+        self.children = {}
+        self.alias = None
+        self.manager = None
+
+
+class PathRouter(object):
+    """
+    Resolve request paths to (manager, ManagerMeta).
+
+    Parameters
+    ----------
+    managers : dict
+        {alias: manager}. An alias is normally a single path segment but
+        nested aliases like `work/reports` are supported. The longest
+        matching alias wins.
+    root : manager
+        Manager for the empty path.
+    cache_size : int
+        Max number of resolved paths to keep around.
+
+    Note: The returned ManagerMeta objects are shared between callers and
+    should be treated as read only.
+    """
+    def __init__(self, managers, root=None, cache_size=1024):
+        self.root = root
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._trie = _TrieNode()
+        for alias, manager in managers.items():
+            self.add(alias, manager)
+
+    def add(self, alias, manager):
+        node = self._trie
+        for bit in alias.strip('/').split('/'):
+            node = node.children.setdefault(bit, _TrieNode())
+        node.alias = alias.strip('/')
+        node.manager = manager
+        self.clear()
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._cache),
+            'cache_size': self.cache_size,
+        }
+
+    def resolve(self, path):
+        if path is None:
+            path = ''
+        cache = self._cache
+        try:
+            res = cache[path]
+        except KeyError:
+            pass
+        else:
+            cache.move_to_end(path)
+            self.hits += 1
+            return res
+
+        self.misses += 1
+        res = self._resolve(path)
+        cache[path] = res
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return res
+
+    def _resolve(self, path):
+        path = path.strip('/')
+
+        meta = ManagerMeta()
+        # we are on root
+        if not path:
+            meta.request_path = path
+            meta.path = ''
+            meta.nbm_path = ''
+            return self.root, meta
+
+        bits = path.split('/')
+
+        # walk down the trie and keep the deepest alias we pass through
+        node = self._trie
+        match = None
+        depth = 0
+        for i, bit in enumerate(bits, 1):
+            node = node.children.get(bit)
+            if node is None:
+                break
+            if node.manager is not None:
+                match = node
+                depth = i
+
+        meta.request_path = path
+        if match is None:
+            # unknown manager. mirror the old behavior of returning None
+            # along with the first segment as the nbm_path.
+            meta.nbm_path = bits[0]
+            meta.path = '/'.join(bits[1:])
+            return None, meta
+
+        meta.nbm_path = match.alias
+        meta.path = '/'.join(bits[depth:])
+        return match.manager, meta
@@ -1,10 +1,21 @@
+import os
 import os.path
+import math
+import time
+import heapq
+import itertools
+import bisect
 import datetime
+import threading
+import concurrent.futures
 
 from tornado import web
+from traitlets import Float, Integer, Unicode
 from notebook.notebook.handlers import NotebookHandler
 
 from .bundle.bundlenbmanager import BundleNotebookManager
+from .listing import parse_sort, top_models
+from .registry import NotebookRegistry
 from .path_translate import translate_path_shim
 
 
@@ -31,11 +42,6 @@ def get(self, path):
 NotebookHandler._old_get = NotebookHandler.get
 NotebookHandler.get = get
 
-import string
-import random
-def id_generator(size=6, chars=string.ascii_uppercase + string.digits):
-    return ''.join(random.choice(chars) for _ in range(size))
-
 def notebook_walk_step(self, path):
     notebooks = self.list_notebooks(path)
     dirs = self.list_dirs(path)
@@ -55,23 +61,326 @@ def notebook_walk(self, path):
     for dir in subdirs:
         yield from notebook_walk(self, dir)
 
+# _load_dir result for a directory that hasn't changed
+UNCHANGED = object()
+# _load_dir result for a directory that couldn't be listed this time
+FAILED = object()
+
+def _sort_key(model):
+    # newest first, ties broken by path
+    return (-model['last_modified'].timestamp(), model['path'])
+
+class WorkareaIndex(object):
+    """
+    In memory index of the notebooks under one workarea root.
+
+    Each directory is remembered along with its mtime, the notebooks in it
+    and its subdirectories. `refresh` walks the known tree and only lists
+    directories whose mtime changed, so a refresh of an unchanged workarea
+    is one stat per directory. With a DirectoryWatcher, it doesn't stat at
+    all and relists whatever the watcher reports.
+
+    As with ListingCache, a directory mtime doesn't change when a notebook
+    inside it is edited in place. Directories are relisted after `max_age`
+    seconds to pick those up.
+
+    `notebooks` is kept sorted newest first.
+    """
+    # more changes than this in one refresh and we re-sort instead of
+    # inserting one at a time
+    resort_threshold = 64
+
+    def __init__(self, manager, watcher=None, max_age=30):
+        self.manager = manager
+        self.watcher = watcher
+        self.max_age = max_age
+        self.version = 0
+        self.notebooks = []
+        # _sort_key of each entry in notebooks
+        self.sort_keys = []
+        # path -> (stamp, loaded_at, notebooks, subdirs)
+        self._dirs = {}
+        self._dirty = set()
+        self._watched = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.notebooks)
+
+    def _stamp(self, os_path):
+        if self.watcher is not None:
+            return None
+        return os.stat(os_path).st_mtime_ns
+
+    def _on_change(self, os_path):
+        path = self._watched.get(os_path)
+        if path is not None:
+            self._dirty.add(path)
+
+    def invalidate(self, path=''):
+        """ Relist path on the next refresh. """
+        self._dirty.add(path.strip('/'))
+
+    def refresh(self):
+        """
+        Bring the index up to date. Returns True if anything changed.
+        """
+        with self._lock:
+            added = []
+            removed = []
+            seen = set()
+            stack = ['']
+            while stack:
+                path = stack.pop()
+                seen.add(path)
+                loaded = self._load_dir(path)
+                subdirs = self._store_dir(path, loaded, added, removed)
+                stack.extend(subdirs)
+            return self._finish(seen, added, removed)
+
+    def _load_dir(self, path):
+        """
+        The filesystem half of refreshing path. Only reads index state, so
+        crawl() runs it on worker threads.
+
+        Returns UNCHANGED, None if the directory is gone, FAILED if it
+        couldn't be listed, or the new (stamp, loaded_at, notebooks,
+        subdirs) entry.
+        """
+        os_path = self.manager._get_os_path(path=path)
+        try:
+            stamp = self._stamp(os_path)
+        except FileNotFoundError:
+            return None
+        except OSError:
+            self.manager.log.warning("Can't stat workarea dir %s", os_path,
+                                     exc_info=True)
+            return FAILED
+
+        entry = self._dirs.get(path)
+        if entry is not None and path not in self._dirty:
+            old_stamp, loaded_at, notebooks, subdirs = entry
+            fresh = (self.max_age is None or
+                     time.monotonic() - loaded_at < self.max_age)
+            if old_stamp == stamp and fresh:
+                return UNCHANGED
+
+        # the manager's own cache would hand back the same stale listing
+        self.manager.listing_cache.invalidate(os_path)
+        loaded_at = time.monotonic()
+        try:
+            notebooks, subdirs = notebook_walk_step(self.manager, path)
+        except Exception:
+            self.manager.log.warning("Can't list workarea dir %s", os_path,
+                                     exc_info=True)
+            return FAILED
+        return (stamp, loaded_at, notebooks, subdirs)
+
+    def _store_dir(self, path, loaded, added, removed):
+        """
+        Record the result of _load_dir. Returns the subdirs to visit.
+        """
+        entry = self._dirs.get(path)
+        if loaded is UNCHANGED:
+            return entry[3]
+        if loaded is None:
+            # gone. dropped by _finish since it isn't seen
+            return []
+        if loaded is FAILED:
+            # keep what we had, including the subtree, and retry next time
+            self._dirty.add(path)
+            if entry is None:
+                return []
+            return entry[3]
+
+        self._dirty.discard(path)
+        if entry is not None:
+            removed.extend(entry[2])
+        added.extend(loaded[2])
+        self._dirs[path] = loaded
+
+        os_path = self.manager._get_os_path(path=path)
+        if self.watcher is not None and os_path not in self._watched:
+            self.watcher.watch(os_path, self._on_change)
+            self._watched[os_path] = path
+        return loaded[3]
+
+    def _finish(self, seen, added, removed, complete=True):
+        """
+        Drop directories that weren't seen and apply the changes. An
+        incomplete crawl didn't see everything, so nothing is dropped.
+        """
+        if complete:
+            for path in set(self._dirs) - seen:
+                removed.extend(self._drop_dir(path))
+
+        if not (added or removed):
+            return False
+        self._apply(added, removed)
+        self.version += 1
+        return True
+
+    def _drop_dir(self, path):
+        stamp, loaded_at, notebooks, subdirs = self._dirs.pop(path)
+        os_path = self.manager._get_os_path(path=path)
+        if self._watched.pop(os_path, None) is not None:
+            self.watcher.unwatch(os_path)
+        return notebooks
+
+    def _apply(self, added, removed):
+        if len(added) + len(removed) > self.resort_threshold:
+            notebooks = [nb for entry in self._dirs.values()
+                         for nb in entry[2]]
+            notebooks.sort(key=_sort_key)
+            self.notebooks = notebooks
+            self.sort_keys = [_sort_key(nb) for nb in notebooks]
+            return
+
+        keys = self.sort_keys
+        notebooks = self.notebooks
+        for nb in removed:
+            key = _sort_key(nb)
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+                del notebooks[i]
+        for nb in added:
+            key = _sort_key(nb)
+            i = bisect.bisect_left(keys, key)
+            keys.insert(i, key)
+            notebooks.insert(i, nb)
+
+def crawl(indexes, executor, timeout=None, log=None):
+    """
+    Refresh several WorkareaIndexes at once on executor.
+
+    Every root and every directory level fans out onto the pool, so a
+    refresh takes as long as the slowest root instead of the sum of all of
+    them. Roots that haven't finished within `timeout` seconds keep what
+    was crawled so far plus their previous entries for the rest, and are
+    picked up again on the next crawl.
+
+    Returns the set of aliases that timed out.
+    """
+    deadline = None
+    if timeout is not None:
+        deadline = time.monotonic() + timeout
+
+    states = {}
+    futures = {}
+
+    def submit(alias, path):
+        index = indexes[alias]
+        future = executor.submit(index._load_dir, path)
+        futures[future] = (alias, path)
+
+    for alias, index in sorted(indexes.items()):
+        index._lock.acquire()
+        # seen, added, removed
+        states[alias] = (set(), [], [])
+        submit(alias, '')
+
+    try:
+        while futures:
+            remaining = None
+            if deadline is not None:
+                remaining = max(deadline - time.monotonic(), 0)
+            done, _ = concurrent.futures.wait(
+                futures, timeout=remaining,
+                return_when=concurrent.futures.FIRST_COMPLETED)
+            if not done:
+                break
+
+            for future in done:
+                alias, path = futures.pop(future)
+                seen, added, removed = states[alias]
+                seen.add(path)
+                try:
+                    loaded = future.result()
+                except Exception:
+                    if log is not None:
+                        log.warning("Workarea %s crawl of %r failed", alias,
+                                    path, exc_info=True)
+                    loaded = FAILED
+                subdirs = indexes[alias]._store_dir(path, loaded, added,
+                                                    removed)
+                for subdir in subdirs:
+                    submit(alias, subdir)
+
+        timed_out = set(alias for alias, path in futures.values())
+        for future in futures:
+            future.cancel()
+
+        for alias, (seen, added, removed) in states.items():
+            complete = alias not in timed_out
+            indexes[alias]._finish(seen, added, removed, complete=complete)
+            if not complete and log is not None:
+                log.warning("Workarea %s crawl timed out after %ss. "
+                            "Serving partial results", alias, timeout)
+    finally:
+        for alias in states:
+            indexes[alias]._lock.release()
+    return timed_out
+
 class WorkareaManager(BundleNotebookManager):
+    index_max_age = Float(30, config=True, allow_none=True,
+        help="Seconds before a workarea directory is relisted even if its "
+             "mtime hasn't changed. None for no limit")
+
+    crawl_workers = Integer(8, config=True,
+        help="Threads used to crawl the workareas. 1 crawls serially")
+
+    crawl_timeout = Float(10, config=True, allow_none=True,
+        help="Seconds to wait on a workarea crawl before listing what was "
+             "found so far. None to always wait")
+
+    registry_path = Unicode(config=True,
+        help="sqlite file to keep notebook keys in so [KEY].ipynb links "
+             "survive restarts. Empty keeps them in memory")
+
+    registry_prune_interval = Float(3600, config=True, allow_none=True,
+        help="Seconds between removing keys of deleted notebooks. None to "
+             "never prune")
+
     def __init__(self, *args, **kwargs):
         workarea_paths = kwargs.pop('workarea_paths')
+        watcher = kwargs.get('watcher')
         self.managers = {}
         for alias, path in workarea_paths.items():
             self.managers[alias] = BundleNotebookManager(root_dir=path)
 
-        # simple notebook full path => random uuid
-        self.notebook_registry = {}
         super().__init__(*args, **kwargs)
 
+        # key or notebook full path => entry
+        self.notebook_registry = NotebookRegistry(
+            self.registry_path or ':memory:', log=self.log)
+        if self.registry_prune_interval:
+            self.notebook_registry.start_pruning(
+                self._entry_exists, self.registry_prune_interval)
+
+        self.indexes = {}
+        for alias, manager in self.managers.items():
+            self.indexes[alias] = WorkareaIndex(manager, watcher=watcher,
+                                                max_age=self.index_max_age)
+        # (index versions, date) -> formatted listing
+        self._listing = (None, None)
+        # same, plus the limit, for listings of only the newest notebooks
+        self._top_listing = (None, None)
+        self._executor = None
+
     def get_entry(self, path):
         key_length = 6
         key = path[-(key_length+7):-7]
         entry = self.notebook_registry.get(key)
         return entry
 
+    def _entry_exists(self, entry):
+        manager = self.managers.get(entry['manager_path'])
+        if manager is None:
+            return False
+        # listing models carry the notebook's full path
+        return os.path.exists(manager._get_os_path(path=entry['path']))
+
     def is_notebook(self, path):
         if path:
             return True
@@ -85,42 +394,96 @@ class WorkareaManager(BundleNotebookManager):
             return False
         return True
 
-    def list_notebooks(self, path):
-        all_notebooks = []
-
+    def refresh_indexes(self):
+        if self.crawl_workers <= 1:
+            for index in self.indexes.values():
+                index.refresh()
+            return set()
+
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.crawl_workers,
+                thread_name_prefix='nbx-crawl')
+        return crawl(self.indexes, self._executor,
+                     timeout=self.crawl_timeout, log=self.log)
+
+    def list_notebooks(self, path, limit=None, sort=None):
+        """
+        Every notebook in every workarea, newest first, served from the
+        WorkareaIndexes. The formatted listing is rebuilt only when an
+        index changed (or the date did, for Today/Yesterday).
+
+        With a limit, only the newest `limit` notebooks are merged and
+        formatted unless the full listing is already built.
+        """
+        self.refresh_indexes()
+        path = path.strip('/')
+
+        versions = tuple((alias, index.version)
+                         for alias, index in sorted(self.indexes.items()))
+        today = datetime.datetime.now().date()
+        cache_key = (versions, today, path)
+
+        if sort is not None and parse_sort(sort) != parse_sort(None):
+            listing = self._full_listing(cache_key, path, today)
+            return [dict(model) for model in top_models(listing, limit, sort)]
+
+        key, listing = self._listing
+        if limit is not None and key != cache_key:
+            top_key, listing = self._top_listing
+            if top_key != cache_key + (limit,):
+                listing = self._build_listing(path, today, limit=limit)
+                self._top_listing = (cache_key + (limit,), listing)
+            return [dict(model) for model in listing]
+
+        listing = self._full_listing(cache_key, path, today)
+        return [dict(model) for model in listing[:limit]]
+
+    def _full_listing(self, cache_key, path, today):
+        key, listing = self._listing
+        if key != cache_key:
+            listing = self._build_listing(path, today)
+            self._listing = (cache_key, listing)
+        return listing
+
+    def _build_listing(self, path, today, limit=None):
         registry = self.notebook_registry
-        for k, manager in self.managers.items():
-            manager_notebooks = []
-            for p, notebooks, subdirs in notebook_walk(manager, path):
-                manager_notebooks.extend(notebooks)
-
-            for nb in manager_notebooks:
-                path_key = k + '/' + os.path.join(nb['path'], nb['name'])
-                if path_key not in registry:
-                    key = id_generator()
-                    entry = {'key':key, 
-                             'path_key':path_key, 
-                             'path': nb['path'], 
-                             'name': nb['name'],
-                             'manager_path':k
-                             }
-                    registry[path_key] = entry
-                    registry[key] = entry
-                nb['key'] = registry[path_key]['key']
-
-            all_notebooks.extend(manager_notebooks)
-
+        streams = []
+        prefix = path + '/'
+        for k, index in sorted(self.indexes.items()):
+            # indexes are already sorted. merge instead of sorting again
+            stream = [(sort_key, k, nb) for sort_key, nb
+                      in zip(index.sort_keys, index.notebooks)
+                      if not path or nb['path'] == path or
+                      nb['path'].startswith(prefix)]
+            streams.append(stream)
+
+        total = sum(map(len, streams))
+        merged = list(itertools.islice(heapq.merge(*streams), limit))
+        entries = registry.assign_many((k, nb['path'], nb['name'])
+                                       for sort_key, k, nb in merged)
+        all_notebooks = []
+        for (sort_key, k, index_nb), entry in zip(merged, entries):
+            nb = dict(index_nb)
+            nb['key'] = entry['key']
+            all_notebooks.append(nb)
+
+        return self._format_listing(all_notebooks, today, total=total)
+
+    def _format_listing(self, all_notebooks, today, total=None):
+        """
+        Number the sorted notebooks and add the date and key to their
+        names. `total` is the length of the whole listing when
+        all_notebooks is only the start of it.
+        """
         if len(all_notebooks) == 0:
             return []
 
         assert all(map(lambda x: isinstance(x['last_modified'], datetime.datetime), all_notebooks))
 
-        all_notebooks.sort(key=lambda x: x['last_modified'], reverse=True)
-
-        import math
-        digits = 0
-        if all_notebooks:
-            digits = int(math.log10(len(all_notebooks)))+1
+        if total is None:
+            total = len(all_notebooks)
+        digits = int(math.log10(total))+1
         for i, notebook in enumerate(all_notebooks, 1):
             dir_prefix = notebook['path'].rsplit('/')[-1] 
             name = notebook['name']
@@ -131,16 +494,20 @@ class WorkareaManager(BundleNotebookManager):
             name = "{i}. {name}".format(i=i, name=name)
             notebook['name'] = name
 
+        special_dates = {
+            today: 'Today',
+            today - datetime.timedelta(1): 'Yesterday',
+        }
+        date_strings = {}
         longest_name = max(map(lambda x: len(x['name']), all_notebooks))
         for notebook in all_notebooks:
             last_modified = notebook['last_modified']
-            date_string = last_modified.strftime('%Y-%m-%d')
-            today = datetime.datetime.now().date()
-            if last_modified.date() == today:
-                date_string = 'Today'
-            if last_modified.date() == today - datetime.timedelta(1):
-                date_string = 'Yesterday'
-            time_string = last_modified.strftime('%H:%M')
+            date = last_modified.date()
+            date_string = date_strings.get(date)
+            if date_string is None:
+                date_string = special_dates.get(date) or date.strftime('%Y-%m-%d')
+                date_strings[date] = date_string
+            time_string = '%02d:%02d' % (last_modified.hour, last_modified.minute)
             datetime_string = "{date_string} {time_string}".format(date_string=date_string,
                                                                    time_string=time_string)
             name = notebook['name'].ljust(longest_name)
@@ -0,0 +1,341 @@
+"""
+Full text search over the notebooks of every manager.
+
+SearchIndex keeps one row per notebook in a sqlite FTS5 table: its name,
+tags, markdown and code. Rows are keyed on the MetaManager path of the
+notebook and remember the notebook's last_modified, so SearchCrawler only
+loads notebooks that changed since they were indexed. SearchMiddleware
+indexes notebooks as they are saved.
+
+Workarea notebooks are indexed as `alias/[KEY].ipynb`, which the notebook
+handler redirects to the real notebook. Gist contents live on github, so
+gists are indexed by name and tags only.
+"""
+import re
+import logging
+import sqlite3
+import functools
+import threading
+import collections
+
+from traitlets.config.configurable import LoggingConfigurable
+
+from .bundle.bundlenbmanager import BundleNotebookManager
+from .scratchpad import WorkareaManager, notebook_walk
+from .tagged_gist.gistnbmanager import GistNotebookManager
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS notebooks USING fts5(
+    path UNINDEXED,
+    name,
+    tags,
+    markdown,
+    code,
+    -- faster prefix queries for what's typed so far
+    prefix='2 3'
+);
+CREATE TABLE IF NOT EXISTS indexed (
+    path TEXT PRIMARY KEY,
+    docid INTEGER,
+    stamp REAL
+);
+"""
+
+# bm25 weight of each column: path, name, tags, markdown, code. Set as the
+# table's rank function so ORDER BY rank is fts5's own ranking.
+RANK = 'bm25(0.0, 10.0, 5.0, 2.0, 1.0)'
+
+Document = collections.namedtuple('Document',
+                                  ['path', 'name', 'tags', 'stamp', 'load'])
+
+
+def _source(cell):
+    source = cell.get('source') or ''
+    if isinstance(source, list):
+        source = ''.join(source)
+    return source
+
+
+def notebook_text(nb):
+    """ (markdown, code) of a notebook dict """
+    markdown = []
+    code = []
+    for cell in (nb or {}).get('cells', []):
+        if cell.get('cell_type') == 'markdown':
+            markdown.append(_source(cell))
+        elif cell.get('cell_type') == 'code':
+            code.append(_source(cell))
+    return '\n'.join(markdown), '\n'.join(code)
+
+
+def match_expression(query):
+    """
+    FTS5 MATCH expression for a user query: every word, as a prefix.
+    FTS5 operators and punctuation in the query are ignored. None if the
+    query has no words.
+    """
+    words = re.findall(r'\w+', query or '')
+    if not words:
+        return None
+    return ' '.join('"{0}"*'.format(word) for word in words)
+
+
+def _stamp(model):
+    last_modified = model.get('last_modified')
+    if last_modified is None:
+        return None
+    return last_modified.timestamp()
+
+
+class SearchIndex(object):
+    """
+    Parameters
+    ----------
+    path : str
+        sqlite file. ':memory:' rebuilds the index on every start.
+    log : logging.Logger, optional
+    """
+    def __init__(self, path=':memory:', log=None):
+        self.path = path
+        self.log = log or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.conn.execute("INSERT INTO notebooks (notebooks, rank) "
+                          "VALUES ('rank', ?)", (RANK,))
+        self.conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute(
+                "SELECT count(*) FROM indexed").fetchone()[0]
+
+    def stamp(self, path):
+        """ last_modified timestamp path was indexed at. None if unknown """
+        with self._lock:
+            row = self.conn.execute("SELECT stamp FROM indexed WHERE path = ?",
+                                    (path,)).fetchone()
+        return row and row[0]
+
+    def stamps(self, prefix=''):
+        """ {path: stamp} of every indexed path starting with prefix """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT path, stamp FROM indexed WHERE substr(path, 1, ?) = ?",
+                (len(prefix), prefix)).fetchall()
+        return dict(rows)
+
+    def add(self, path, name, tags='', nb=None, stamp=None):
+        self.add_many([(path, name, tags, nb, stamp)])
+
+    def add_many(self, docs):
+        """
+        Index an iterable of (path, name, tags, nb, stamp) in one
+        transaction. nb is the notebook content dict, None if not known.
+        """
+        with self._lock:
+            for path, name, tags, nb, stamp in docs:
+                if not isinstance(tags, str):
+                    tags = ' '.join(tags)
+                markdown, code = notebook_text(nb)
+                self._delete(path)
+                cursor = self.conn.execute(
+                    "INSERT INTO notebooks (path, name, tags, markdown, code) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (path, name, tags, markdown, code))
+                self.conn.execute("INSERT INTO indexed VALUES (?, ?, ?)",
+                                  (path, cursor.lastrowid, stamp))
+            self.conn.commit()
+
+    def _delete(self, path):
+        row = self.conn.execute("SELECT docid FROM indexed WHERE path = ?",
+                                (path,)).fetchone()
+        if row is None:
+            return
+        self.conn.execute("DELETE FROM notebooks WHERE rowid = ?", row)
+        self.conn.execute("DELETE FROM indexed WHERE path = ?", (path,))
+
+    def remove(self, paths):
+        with self._lock:
+            for path in paths:
+                self._delete(path)
+            self.conn.commit()
+
+    def search(self, query, limit=20, prefix=''):
+        """
+        Best matches for query, best first. Each result is a dict of path,
+        name, tags, snippet and score (higher is better).
+        """
+        expression = match_expression(query)
+        if expression is None:
+            return []
+        sql = (
+            "SELECT path, name, tags, "
+            "snippet(notebooks, -1, '', '', '...', 16), rank "
+            "FROM notebooks WHERE notebooks MATCH ? "
+            "AND substr(path, 1, ?) = ? "
+            "ORDER BY rank LIMIT ?"
+        )
+        with self._lock:
+            rows = self.conn.execute(
+                sql, (expression, len(prefix), prefix, limit)).fetchall()
+        return [{'path': path, 'name': name, 'tags': tags.split(),
+                 'snippet': snippet, 'score': -rank}
+                for path, name, tags, snippet, rank in rows]
+
+    def close(self):
+        self.conn.close()
+
+
+def _load_notebook(manager, path):
+    return manager.get_notebook(path)['content']
+
+
+def workarea_documents(alias, manager):
+    manager.refresh_indexes()
+    registry = manager.notebook_registry
+    for k, index in sorted(manager.indexes.items()):
+        notebooks = list(index.notebooks)
+        entries = registry.assign_many((k, nb['path'], nb['name'])
+                                       for nb in notebooks)
+        for nb, entry in zip(notebooks, entries):
+            load = functools.partial(_load_notebook, index.manager,
+                                     nb['path'])
+            yield Document('{0}/[{1}].ipynb'.format(alias, entry['key']),
+                           nb['name'], '', _stamp(nb), load)
+
+
+def bundle_documents(alias, manager):
+    for path, notebooks, subdirs in notebook_walk(manager, ''):
+        for nb in notebooks:
+            load = functools.partial(_load_notebook, manager, nb['path'])
+            yield Document('{0}/{1}'.format(alias, nb['path']), nb['name'],
+                           '', _stamp(nb), load)
+
+
+def gist_documents(alias, manager):
+    seen = set()
+    with manager.query_snapshot():
+        for tag, gists in manager.gist_query().items():
+            for key_name, gist in gists.items():
+                if gist.id in seen:
+                    continue
+                seen.add(gist.id)
+                updated_at = gist.updated_at
+                stamp = updated_at and updated_at.timestamp()
+                yield Document('{0}/{1}/{2}'.format(alias, tag, key_name),
+                               gist.name, gist.tags, stamp, None)
+
+
+def manager_documents(alias, manager):
+    """
+    Document for every notebook of a MetaManager sub manager. Managers we
+    don't know how to walk have none.
+    """
+    # WorkareaManager is a BundleNotebookManager. check it first
+    if isinstance(manager, WorkareaManager):
+        return workarea_documents(alias, manager)
+    if isinstance(manager, BundleNotebookManager):
+        return bundle_documents(alias, manager)
+    if isinstance(manager, GistNotebookManager):
+        return gist_documents(alias, manager)
+    return iter(())
+
+
+class SearchCrawler(object):
+    """
+    Brings a SearchIndex up to date with `managers` ({alias: manager}),
+    loading only notebooks whose last_modified changed and dropping ones
+    that are gone. `start` crawls on a daemon thread every `interval`
+    seconds.
+    """
+    batch_size = 100
+
+    def __init__(self, index, managers, interval=300, log=None):
+        self.index = index
+        self.managers = managers
+        self.interval = interval
+        self.log = log or logging.getLogger(__name__)
+        self._thread = None
+        self._stop = threading.Event()
+
+    def crawl(self):
+        for alias, manager in sorted(self.managers.items()):
+            try:
+                self.crawl_manager(alias, manager)
+            except Exception:
+                self.log.exception("Search crawl of %s failed", alias)
+
+    def crawl_manager(self, alias, manager):
+        """ Returns the number of notebooks (re)indexed """
+        stamps = self.index.stamps(alias + '/')
+        seen = set()
+        batch = []
+        count = 0
+        for doc in manager_documents(alias, manager):
+            seen.add(doc.path)
+            if doc.path in stamps and stamps[doc.path] == doc.stamp:
+                continue
+            nb = None
+            if doc.load is not None:
+                try:
+                    nb = doc.load()
+                except Exception:
+                    self.log.debug("Could not load %s for search", doc.path)
+            batch.append((doc.path, doc.name, doc.tags, nb, doc.stamp))
+            if len(batch) >= self.batch_size:
+                self.index.add_many(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            self.index.add_many(batch)
+            count += len(batch)
+
+        gone = [path for path in stamps if path not in seen]
+        if gone:
+            self.index.remove(gone)
+        return count
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                self.crawl()
+                if not self.interval or self._stop.wait(self.interval):
+                    return
+
+        self._thread = threading.Thread(target=run, name='nbx-search-crawl',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+class SearchMiddleware(LoggingConfigurable):
+    """
+    Reindex notebooks when they're saved. Uses the parent MetaManager's
+    search_index. Added by MetaManager when enable_search is on.
+    """
+    def post_save(self, nbm, local_path, model, path, result=None):
+        index = getattr(self.parent, 'search_index', None)
+        if index is None or model.get('type') != 'notebook':
+            return
+        # only gist metadata is indexed. the crawler picks up the change
+        if isinstance(nbm, GistNotebookManager):
+            return
+        path = path.strip('/')
+        alias = path.split('/', 1)[0]
+        name = path.rsplit('/', 1)[-1]
+        if isinstance(nbm, WorkareaManager):
+            entry = nbm.get_entry(local_path)
+            if entry is None:
+                return
+            name = entry['name']
+            path = '{0}/[{1}].ipynb'.format(alias, entry['key'])
+        stamp = None
+        if result:
+            stamp = _stamp(result)
+        index.add(path, name, '', model.get('content'), stamp)
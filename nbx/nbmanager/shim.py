@@ -1,6 +1,6 @@
 from notebook.services.contents.manager import ContentsManager
 
-from .util import get_invoked_arg, set_invoked_arg, _path_split
+from .util import arg_map, _path_split
 
 API = ['save', 'update', 'delete', 'get', 'rename', 'file_exists', 'exists',
        'get_checkpoint_path', 'get_checkpoint_model', 'create_checkpoint',
@@ -11,70 +11,96 @@ class ShimManager(ContentsManager):
     """
     Provide backwards compat to ipython removing name from its api calls
 
-    This could be done with inspect and a metaclass
+    Subclasses that set __shim_target__ get `_shim_specs` built once at
+    class creation, so shimmed calls don't inspect anything.
     """
     _shim_cache = {}
+    _shim_specs = {}
     _manager = None
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if '__shim_target__' in cls.__dict__:
+            cls._shim_specs = cls._build_shim_specs(cls.__shim_target__)
+
+    @classmethod
+    def _build_shim_specs(cls, target):
+        return {}
+
     def __init__(self, *args, **kwargs):
         self._shim_cache = {}
         self._manager = self.__shim_target__(*args, **kwargs)
 
     def __getattribute__(self, name):
-        if name.startswith('_'):
+        if name[0] == '_':
             return object.__getattribute__(self, name)
 
-        if name in self._shim_cache:
-            return self._shim_cache[name]
+        cache = object.__getattribute__(self, '_shim_cache')
+        try:
+            return cache[name]
+        except KeyError:
+            pass
 
         if self._should_shim(name):
             meth = self._shim(name)
-            self._shim_cache[name] = meth
+            cache[name] = meth
             return meth
 
         # local defined in shim class
-        if name in self.__dict__:
+        if name in object.__getattribute__(self, '__dict__'):
             return object.__getattribute__(self, name)
 
-        if hasattr(self._manager, name):
-            return getattr(self._manager, name)
-
-        return object.__getattribute__(self, name)
+        try:
+            return getattr(object.__getattribute__(self, '_manager'), name)
+        except AttributeError:
+            return object.__getattribute__(self, name)
 
     def _should_shim(self, name):
         return name in API
 
 class ContentsNameApiShim(ShimManager):
 
+    @classmethod
+    def _build_shim_specs(cls, target):
+        specs = {}
+        for name in API:
+            current_api = getattr(ContentsManager, name, None)
+            legacy = getattr(target, name, None)
+            if current_api is None or legacy is None:
+                continue
+            # (current api, legacy) ArgMaps
+            specs[name] = (arg_map(current_api), arg_map(legacy))
+        return specs
+
     def _shim(self, name):
-        current_api = getattr(ContentsManager, name)
         legacy = getattr(self._manager, name)
-        def method(self, *args, **kwargs):
+        spec = self._shim_specs.get(name)
+        if spec is None:
+            spec = (arg_map(getattr(ContentsManager, name)), arg_map(legacy))
+        current, legacy_args = spec
+        has_model = 'model' in current
+
+        def method(*args, **kwargs):
             args = list(args) # make mutable
-            old_path = path = get_invoked_arg(current_api, 'path', args, kwargs)
+            path = current.get('path', args, kwargs)
             name, path = _path_split(path)
-            set_invoked_arg(legacy, 'name', name, args, kwargs)
-            set_invoked_arg(legacy, 'path', path, args, kwargs)
+            legacy_args.set('name', name, args, kwargs)
+            legacy_args.set('path', path, args, kwargs)
 
             # see if we're getting a model. update the name and path
             # in model to represent the old way
-            try:
-                model = get_invoked_arg(current_api, 'model', args, kwargs)
-                model_path = model.get('path', '')
-                model_name, model_path = _path_split(model_path)
-                model['path'] = model_path
-                model['name'] = model_name
-                set_invoked_arg(legacy, 'model', model, args, kwargs)
-            except:
-                pass
-
-            try:
-                ret = legacy(*args, **kwargs)
-                return ret
-            except Exception as e:
-                # TODO add debugging prints here
-                raise e
-        method = method.__get__(self)
+            if has_model:
+                try:
+                    model = current.get('model', args, kwargs)
+                    model_path = model.get('path', '')
+                    model_name, model_path = _path_split(model_path)
+                    model['path'] = model_path
+                    model['name'] = model_name
+                    legacy_args.set('model', model, args, kwargs)
+                except:
+                    pass
+
+            return legacy(*args, **kwargs)
         return method
 
     def rename(self, old_path, new_path):
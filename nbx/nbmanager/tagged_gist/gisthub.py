@@ -4,9 +4,14 @@ Interface with github gists with tagging.
 This file should have no knowledge of notebooks and only deal with
 gists and tagging.
 """
+import time
+import logging
+import threading
+
 import github
 
 import nbx.compat as compat
+from .tag_index import TagIndex
 
 def _hashtags(desc):
     if not desc:
@@ -22,6 +27,10 @@ class TaggedGist(object):
 
     system_tags = ['#inactive']
 
+    # time.monotonic() of the last time .gist was fetched/validated against
+    # github. None means .gist came from a listing (or the mirror).
+    fetched_at = None
+
     def __init__(self, gist, name, tags, active=True):
         self.gist = gist
         self.name = name
@@ -97,10 +106,51 @@ class TaggedGist(object):
         return out.format(public=self.public, **self.__dict__)
 
 class GistHub(object):
-    def __init__(self, hub):
+    """
+    Parameters
+    ----------
+    hub : github.Github
+    mirror : GistMirror, optional
+        Local mirror of the gist list. When set, the gist list is loaded
+        from the mirror and kept fresh with incremental syncs. Those run on
+        a background thread while queries are served from the mirror.
+    """
+    def __init__(self, hub, mirror=None, log=None):
         self.hub = hub
         self.user = hub.get_user()
+        self.mirror = mirror
+        self.log = log or logging.getLogger(__name__)
         self._tagged_gists = None
+        self._sync_lock = threading.Lock()
+        self._sync_thread = None
+        # (changed, removed) from background syncs, applied by the next query
+        self._synced = []
+        self._sync_retry_at = 0
+
+    # setting the gist dict wholesale resets the tag index
+    @property
+    def _tagged_gists(self):
+        return self._gists
+
+    @_tagged_gists.setter
+    def _tagged_gists(self, gists):
+        self._gists = gists
+        self._index = None
+
+    def _get_index(self):
+        if self._index is None:
+            self._index = TagIndex(self._get_tagged_gists().values())
+        return self._index
+
+    def _add_gist(self, gist):
+        self._tagged_gists[gist.id] = gist
+        if self._index is not None:
+            self._index.add(gist)
+
+    def _remove_gist(self, gist_id):
+        self._tagged_gists.pop(gist_id, None)
+        if self._index is not None:
+            self._index.remove(gist_id)
 
     def _get_gists(self):
         gists = self.user.get_gists()
@@ -115,18 +165,15 @@ class GistHub(object):
         Query gists by our tag format.
         Always returns gists grouped by tags.
         """
-        tagged_gists = self._get_tagged_gists().values()
-
-        tagged_gists = self._filter_active(tagged_gists, active)
+        tagged_gists = self._get_tagged_gists()
+        index = self._get_index()
 
         filter_tag = self._normalize_tag(filter_tag)
-        if filter_tag:
-            tagged_gists = self._filter_tag(tagged_gists, filter_tag)
-
-        if not drop_filter:
-            filter_tag = None
-
-        return self._select_tag(tagged_gists, tag, filter_tag=filter_tag)
+        select_tag = self._normalize_tag(tag)
+        grouped = index.query(active, filter_tag, select_tag,
+                              group_filter=drop_filter)
+        return dict((gtag, [tagged_gists[gist_id] for gist_id in gist_ids])
+                    for gtag, gist_ids in grouped.items())
 
     def _normalize_tag(self, tag):
         if tag is None:
@@ -183,6 +230,9 @@ class GistHub(object):
         return gists
 
     def _get_tagged_gists(self):
+        if self.mirror is not None:
+            return self._get_mirrored_gists()
+
         if self._tagged_gists is None:
             gists = self._get_gists()
             tagged_gists = [(gist.id, TaggedGist.from_gist(gist))
@@ -191,20 +241,98 @@ class GistHub(object):
             self._tagged_gists = tagged_gists
         return self._tagged_gists
 
+    def _get_mirrored_gists(self):
+        if self._tagged_gists is None:
+            from .mirror import MirroredGist
+            rows = self.mirror.load()
+            gists = [MirroredGist(row, self.hub) for row in rows]
+            tagged_gists = [(gist.id, TaggedGist.from_gist(gist))
+                            for gist in gists if gist.description]
+            self._tagged_gists = dict(tagged_gists)
+
+            if self.mirror.synced_at is None:
+                # nothing mirrored yet, so nothing to serve meanwhile
+                self.sync()
+
+        with self._sync_lock:
+            synced, self._synced = self._synced, []
+        for changed, removed in synced:
+            self._apply_sync(changed, removed)
+
+        if self.mirror.needs_sync():
+            self._start_sync()
+        return self._tagged_gists
+
+    def _start_sync(self):
+        with self._sync_lock:
+            if (self._sync_thread is not None or
+                    time.monotonic() < self._sync_retry_at):
+                return
+            self._sync_thread = threading.Thread(
+                target=self._background_sync, name='nbx-gist-mirror-sync',
+                daemon=True)
+            self._sync_thread.start()
+
+    def _background_sync(self):
+        try:
+            synced = self.mirror.sync(self.user)
+        except Exception:
+            self.log.exception("Gist mirror sync failed")
+            synced = None
+        with self._sync_lock:
+            if synced is None:
+                # don't retry on every query while github is down
+                self._sync_retry_at = time.monotonic() + self.mirror.max_age
+            else:
+                self._synced.append(synced)
+            self._sync_thread = None
+
+    def sync(self, full=None):
+        """
+        Pull gist changes from github into the mirror and the in-memory
+        gist list.
+        """
+        changed, removed = self.mirror.sync(self.user, full=full)
+        self._apply_sync(changed, removed)
+
+    def _apply_sync(self, changed, removed):
+        for gist_id in removed:
+            self._remove_gist(gist_id)
+        for gist in changed:
+            if not gist.description:
+                self._remove_gist(gist.id)
+                continue
+            tagged_gist = self._tagged_gists.get(gist.id)
+            if tagged_gist is None:
+                self._add_gist(TaggedGist.from_gist(gist))
+                continue
+            tagged_gist.gist = gist
+            tagged_gist.update_from_gist()
+            self._add_gist(tagged_gist)
+
     def refresh_gist(self, gist_id):
         if hasattr(gist_id, 'id'):
             gist_id = gist_id.id
-        gist = self.hub.get_gist(gist_id)
         tagged_gist = self._tagged_gists[gist_id]
-        tagged_gist.gist = gist
-        self.update_gist(tagged_gist)
+        if tagged_gist.fetched_at is not None:
+            # conditional request using the etag from the last fetch. an
+            # unchanged gist costs a 304.
+            changed = tagged_gist.gist.update()
+        else:
+            tagged_gist.gist = self.hub.get_gist(gist_id)
+            changed = True
+        tagged_gist.fetched_at = time.monotonic()
+        if changed:
+            self.update_gist(tagged_gist)
         return tagged_gist
 
     def update_gist(self, gist):
         assert gist.id in self._tagged_gists
         gist.update_from_gist()
         assert isinstance(gist, TaggedGist)
-        self._tagged_gists[gist.id] = gist
+        self._add_gist(gist)
+        if self.mirror is not None:
+            self.mirror.upsert(gist.gist)
 
     def create_gist(self, name, tags, content='', public=True):
         desc = "{name} #notebook {tags}".format(name=name, tags=" ".join(tags))
@@ -212,9 +340,15 @@ class GistHub(object):
         files = {"{name}.ipynb".format(name=name): file}
         gist = self.hub.get_user().create_gist(public, files, desc)
         tg = TaggedGist.from_gist(gist)
-        self._tagged_gists[tg.id] = tg
+        self._add_gist(tg)
+        if self.mirror is not None:
+            self.mirror.upsert(gist)
         return tg
 
-def gisthub(user, password):
+def gisthub(user, password, mirror_path=None):
     g = github.Github(user, password, user_agent="nbx")
-    return GistHub(g)
+    mirror = None
+    if mirror_path:
+        from .mirror import GistMirror
+        mirror = GistMirror(mirror_path)
+    return GistHub(g, mirror=mirror)
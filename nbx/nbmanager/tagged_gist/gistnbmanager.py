@@ -1,4 +1,7 @@
 import itertools
+import functools
+import threading
+from contextlib import contextmanager
 
 from tornado import web
 
@@ -7,16 +10,58 @@ import nbformat
 from ..nbxmanager import NBXContentsManager
 from .notebook_gisthub import parse_tags
 
+def with_snapshot(func):
+    """
+    Run method within a query snapshot. See GistNotebookManager.query_snapshot
+    """
+    @functools.wraps(func)
+    def _wrapped(self, *args, **kwargs):
+        with self.query_snapshot():
+            return func(self, *args, **kwargs)
+    return _wrapped
+
+
 class GistNotebookManager(NBXContentsManager):
     """
     """
     def __init__(self, *args, **kwargs):
         self.gisthub = kwargs.pop('gisthub')
         super(GistNotebookManager, self).__init__(*args, **kwargs)
+        # handlers, the search crawler and workers share the manager. each
+        # thread gets its own snapshot
+        self._local = threading.local()
+
+    @contextmanager
+    def query_snapshot(self):
+        """
+        Within this context every gist_query is answered from one grouping
+        of the gists. A single Contents API call hits gist_query from many
+        helpers (exists checks, _get_gist, model building), so we only want
+        to query GistHub once per call. Nested contexts share the snapshot.
+        Snapshots are per thread.
+        """
+        local = self._local
+        local.depth = getattr(local, 'depth', 0) + 1
+        try:
+            yield
+        finally:
+            local.depth -= 1
+            if not local.depth:
+                local.snapshot = None
+
+    def invalidate_snapshot(self):
+        """ Call after changing gists so the next query sees the change """
+        self._local.snapshot = None
+
+    @with_snapshot
+    def dispatch_method(self, hook, model_type, *args, **kwargs):
+        return super(GistNotebookManager, self).dispatch_method(
+            hook, model_type, *args, **kwargs)
 
     def is_hidden(self, path):
         return False
 
+    @with_snapshot
     def path_exists(self, path):
         if path == '':
             return True
@@ -31,6 +76,23 @@ class GistNotebookManager(NBXContentsManager):
         return model
 
     def gist_query(self, tag=None):
+        if getattr(self._local, 'depth', 0):
+            return self._snapshot_query(tag)
+        return self._gist_query(tag)
+
+    def _snapshot_query(self, tag=None):
+        tags = getattr(self._local, 'snapshot', None)
+        if tags is None:
+            tags = self._local.snapshot = self._gist_query()
+        if tag is None:
+            return dict(tags)
+        if not tag.startswith('#'):
+            tag = '#' + tag
+        if tag not in tags:
+            return {}
+        return {tag: tags[tag]}
+
+    def _gist_query(self, tag=None):
         tags = self.gisthub.query(tag)
         if tag is None:
             # query and grab the inactive notebook. put them by themselves
@@ -46,6 +108,7 @@ class GistNotebookManager(NBXContentsManager):
         gists = list(tagged.values())[0]
         return gists
 
+    @with_snapshot
     def list_dirs(self, path=''):
         # only return dirs for ''
         if path != '':
@@ -57,17 +120,42 @@ class GistNotebookManager(NBXContentsManager):
             dirs.append(model)
         return dirs
 
+    @with_snapshot
     def list_notebooks(self, path=''):
         if path == '':
             return []
 
         # get notebooks by tag
         gists = self.gists_by_tag(path)
-        notebooks = [self.get_notebook(gist.key_name, path, content=False) for gist in gists.values()]
+        notebooks = self.get_notebook_models(gists, path)
         # sort by date, descending
         notebooks = sorted(notebooks, key=lambda x: x['last_modified'], reverse=True)
         return notebooks
 
+    def get_notebook_models(self, gists, path=''):
+        """
+        Build content-less models for a tag's gists in one pass.
+
+        gists : dict
+            {key_name: NotebookGist} as returned by gists_by_tag
+        """
+        path = path.strip('/')
+        return [self._notebook_model(gist, name, path)
+                for name, gist in gists.items()]
+
+    def _notebook_model(self, gist, name, path):
+        model ={}
+        model['name'] = name
+        model['path'] = path
+        model['last_modified'] = gist.updated_at
+        model['created'] = gist.created_at
+        model['type'] = 'notebook'
+        model['format'] = None
+        model['writable'] = True
+        model['mimetype'] = None
+        return model
+
+    @with_snapshot
     def notebook_exists(self, name, path=''):
         gist = self._get_gist(name, path)
         return gist is not None
@@ -79,6 +167,7 @@ class GistNotebookManager(NBXContentsManager):
             print('gist not found', gists.keys(), name, path)
         return gists.get(name, None)
 
+    @with_snapshot
     def get_notebook(self, name, path='', content=True, **kwargs):
         """ Takes a path and name for a notebook and returns its model
 
@@ -97,19 +186,11 @@ class GistNotebookManager(NBXContentsManager):
             dict in the model as well.
         """
         path = path.strip('/')
-        if not self.notebook_exists(name=name, path=path):
-            raise web.HTTPError(404, u'Notebook does not exist: %s' % name)
         gist = self._get_gist(name, path)
+        if gist is None:
+            raise web.HTTPError(404, u'Notebook does not exist: %s' % name)
         # Create the notebook model.
-        model ={}
-        model['name'] = name
-        model['path'] = path
-        model['last_modified'] = gist.updated_at
-        model['created'] = gist.created_at
-        model['type'] = 'notebook'
-        model['format'] = None
-        model['writable'] = True
-        model['mimetype'] = None
+        model = self._notebook_model(gist, name, path)
         if content:
             model['format'] = 'json'
             notebook_content = gist.notebook_content
@@ -138,6 +219,7 @@ class GistNotebookManager(NBXContentsManager):
                 return True
         return False
 
+    @with_snapshot
     def increment_filename(self, basename, path=''):
         """Increment a notebook filename without the .ipynb to make it unique.
 
@@ -161,6 +243,7 @@ class GistNotebookManager(NBXContentsManager):
                 break
         return name
 
+    @with_snapshot
     def save_notebook(self, model, name='', path=''):
         """Save the notebook model and return the model with no content."""
         path = path.strip('/')
@@ -180,6 +263,7 @@ class GistNotebookManager(NBXContentsManager):
                 tags.append(path)
             content = nbformat.writes(nb, version=nbformat.NO_CONVERT)
             gist = self.gisthub.create_gist(name, tags, content)
+            self.invalidate_snapshot()
 
         # One checkpoint should always exist
         #if self.notebook_exists(name, path) and not self.list_checkpoints(name, path):
@@ -204,12 +288,15 @@ class GistNotebookManager(NBXContentsManager):
             self.gisthub.save(gist)
         except Exception as e:
             raise web.HTTPError(400, u'Unexpected error while autosaving notebook: %s %s %s' % (path, name, e))
+        finally:
+            self.invalidate_snapshot()
 
         # NOTE: since gist.name might not have [gist_id] suffix on rename
         # we use gist.key_name
         model = self.get_notebook(gist.key_name, new_path, content=False)
         return model
 
+    @with_snapshot
     def update_notebook(self, model, name, path=''):
         """Update the notebook's path and/or name"""
         path = path.strip('/')
@@ -228,11 +315,14 @@ class GistNotebookManager(NBXContentsManager):
             self.gisthub.save(gist)
         except Exception as e:
             raise web.HTTPError(400, u'Unexpected error while renaming notebook: %s %s %s' % (path, name, e))
+        finally:
+            self.invalidate_snapshot()
         # NOTE: since gist.name might not have [gist_id] suffix on rename
         # we use gist.key_name
         model = self.get_notebook(gist.key_name, new_path, content=False)
         return model
 
+    @with_snapshot
     def delete_notebook(self, name, path=''):
         """Delete notebook by name and path."""
         path = path.strip('/')
@@ -243,6 +333,8 @@ class GistNotebookManager(NBXContentsManager):
             self.gisthub.save(gist)
         except Exception as e:
             raise web.HTTPError(400, u'Unexpected error while deleting notebook: %s %s %s' % (path, name, e))
+        finally:
+            self.invalidate_snapshot()
 
     def get_checkpoint_model(self, commit):
         """construct the info dict for a given checkpoint"""
@@ -252,6 +344,7 @@ class GistNotebookManager(NBXContentsManager):
         )
         return info
 
+    @with_snapshot
     def list_checkpoints(self, name, path=''):
         " each commit is a checkpoint "
         path = path.strip('/')
@@ -260,6 +353,7 @@ class GistNotebookManager(NBXContentsManager):
         checkpoints = list(map(self.get_checkpoint_model, revisions))
         return checkpoints
 
+    @with_snapshot
     def restore_checkpoint(self, checkpoint_id, name, path=''):
         """restore a notebook to a checkpointed state"""
         path = path.strip('/')
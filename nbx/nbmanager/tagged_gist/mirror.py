@@ -0,0 +1,253 @@
+"""
+On disk mirror of a user's gist list.
+
+Listing every gist is a paginated crawl of the github api. The mirror keeps
+the metadata we need for tagging (description, dates, file names) in a
+sqlite file so a restart can serve `GistHub.query` without touching the
+network. After that, only gists updated since the last sync are fetched.
+
+Incremental syncs can't see gists that were deleted outside of nbx, so a
+full sync is done once `full_sync_interval` seconds have passed.
+"""
+import datetime
+import json
+import sqlite3
+import threading
+
+from .gisthub import _hashtags
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS gists (
+    id TEXT PRIMARY KEY,
+    description TEXT,
+    tags TEXT,
+    public INTEGER,
+    created_at TEXT,
+    updated_at TEXT,
+    files TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _to_iso(dt):
+    if dt is None:
+        return None
+    return dt.isoformat()
+
+
+def _from_iso(value):
+    if value is None:
+        return None
+    return datetime.datetime.fromisoformat(value)
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+class MirroredFile(object):
+    """
+    Stand-in for github.GistFile. The filename is mirrored. Anything else
+    (content, raw_url, ...) fetches the real gist.
+    """
+    def __init__(self, filename, gist):
+        self.filename = filename
+        self._gist = gist
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._gist._fetch().files[self.filename], name)
+
+    def __repr__(self):
+        return "MirroredFile(filename={0!r})".format(self.filename)
+
+
+class MirroredGist(object):
+    """
+    Stand-in for github.Gist built from a mirror row.
+
+    Only the listing metadata is available locally. `files` are stubs that
+    only know their filenames. Anything else (file contents, history,
+    edit) fetches the real gist from `hub` on first use.
+    """
+    def __init__(self, row, hub):
+        self.id = row['id']
+        self.description = row['description']
+        self.public = row['public']
+        self.created_at = row['created_at']
+        self.updated_at = row['updated_at']
+        self.filenames = row['files']
+        self._hub = hub
+        self._gist = None
+        self._files = None
+
+    @property
+    def files(self):
+        if self._gist is not None:
+            return self._gist.files
+        if self._files is None:
+            self._files = dict((filename, MirroredFile(filename, self))
+                               for filename in self.filenames)
+        return self._files
+
+    def _fetch(self):
+        if self._gist is None:
+            self._gist = self._hub.get_gist(self.id)
+        return self._gist
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._fetch(), name)
+
+    def __repr__(self):
+        return "MirroredGist(id={0}, description={1!r})".format(
+            self.id, self.description)
+
+
+class GistMirror(object):
+    """
+    Parameters
+    ----------
+    path : str
+        sqlite file. ':memory:' works for testing.
+    max_age : float
+        Seconds between incremental syncs.
+    full_sync_interval : float
+        Seconds between full syncs.
+    """
+    def __init__(self, path, max_age=60, full_sync_interval=24 * 60 * 60):
+        self.path = path
+        self.max_age = max_age
+        self.full_sync_interval = full_sync_interval
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def _get_meta(self, key):
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?",
+                                    (key,)).fetchone()
+        return row and row[0]
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                          (key, value))
+
+    @property
+    def synced_at(self):
+        return _from_iso(self._get_meta('synced_at'))
+
+    @property
+    def full_synced_at(self):
+        return _from_iso(self._get_meta('full_synced_at'))
+
+    def needs_sync(self):
+        synced_at = self.synced_at
+        if synced_at is None:
+            return True
+        age = (_utcnow() - synced_at).total_seconds()
+        return age > self.max_age
+
+    def load(self):
+        """
+        Return every mirrored gist as a list of row dicts.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT id, description, tags, public, created_at, "
+                "updated_at, files FROM gists").fetchall()
+        return [self._row_dict(row) for row in rows]
+
+    def _row_dict(self, row):
+        id, description, tags, public, created_at, updated_at, files = row
+        return {
+            'id': id,
+            'description': description,
+            'tags': json.loads(tags),
+            'public': bool(public),
+            'created_at': _from_iso(created_at),
+            'updated_at': _from_iso(updated_at),
+            'files': json.loads(files),
+        }
+
+    def _upsert(self, gist):
+        filenames = getattr(gist, 'filenames', None)
+        if filenames is None:
+            filenames = sorted(gist.files)
+        desc = gist.description or ''
+        self.conn.execute(
+            "INSERT OR REPLACE INTO gists VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (str(gist.id), desc, json.dumps(_hashtags(desc)),
+             int(bool(gist.public)), _to_iso(gist.created_at),
+             _to_iso(gist.updated_at), json.dumps(list(filenames)))
+        )
+
+    def upsert(self, gist):
+        with self._lock:
+            self._upsert(gist)
+            self.conn.commit()
+
+    def remove(self, gist_id):
+        with self._lock:
+            self.conn.execute("DELETE FROM gists WHERE id = ?",
+                              (str(gist_id),))
+            self.conn.commit()
+
+    def sync(self, user, full=None):
+        """
+        Pull changes from github.
+
+        Parameters
+        ----------
+        user : github.AuthenticatedUser
+        full : bool, optional
+            Force/skip a full sync. By default a full sync happens when the
+            mirror is empty or `full_sync_interval` has passed.
+
+        Returns
+        -------
+        changed : list of github.Gist
+            Gists updated since the last sync.
+        removed : list of str
+            Ids of gists that no longer exist. Only found on full syncs.
+        """
+        since = self.synced_at
+        if full is None:
+            full_synced_at = self.full_synced_at
+            full = (full_synced_at is None or
+                    (_utcnow() - full_synced_at).total_seconds() >
+                    self.full_sync_interval)
+
+        # stamp with the start time so changes made mid-crawl are picked up
+        # by the next sync
+        started = _utcnow()
+        if full or since is None:
+            gists = list(user.get_gists())
+        else:
+            gists = list(user.get_gists(since=since))
+
+        removed = []
+        with self._lock:
+            if full:
+                seen = set(str(gist.id) for gist in gists)
+                rows = self.conn.execute("SELECT id FROM gists").fetchall()
+                removed = [row[0] for row in rows if row[0] not in seen]
+                self.conn.executemany("DELETE FROM gists WHERE id = ?",
+                                      [(id,) for id in removed])
+                self._set_meta('full_synced_at', _to_iso(started))
+            for gist in gists:
+                self._upsert(gist)
+            self._set_meta('synced_at', _to_iso(started))
+            self.conn.commit()
+        return gists, removed
+
+    def close(self):
+        self.conn.close()
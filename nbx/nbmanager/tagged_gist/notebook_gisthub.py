@@ -1,3 +1,5 @@
+import time
+
 import github
 
 import nbformat
@@ -109,9 +111,22 @@ class NotebookGist(object):
         rev_fobj = self.gist.get_revision_file(commit_id, fobj.filename)
         return rev_fobj['content']
 
-    def _refresh(self):
+    def _refresh(self, force=False):
+        """
+        Make sure .gist is up to date with github. Skipped if the gist was
+        fetched less than `gisthub.max_age` seconds ago.
+        """
+        if not force and self._is_fresh():
+            return
         self.gist = self.gisthub.refresh_gist(self)
 
+    def _is_fresh(self):
+        fetched_at = getattr(self.gist, 'fetched_at', None)
+        max_age = self.gisthub.max_age
+        if fetched_at is None or not max_age:
+            return False
+        return time.monotonic() - fetched_at < max_age
+
     def _get_notebook_file(self):
         """
             Will return the first notebook in a gist.
@@ -164,8 +179,17 @@ class NotebookGist(object):
         return key_name.replace(' '+self.suffix, '')
 
 class NotebookGistHub(object):
-    def __init__(self, gisthub):
+    """
+    Parameters
+    ----------
+    gisthub : GistHub
+    max_age : float
+        Seconds a fetched gist is used without checking github for changes.
+        0 to always check.
+    """
+    def __init__(self, gisthub, max_age=10):
         self.gisthub = gisthub
+        self.max_age = max_age
 
     def _wrap_results(self, results):
         wrapped = {}
@@ -195,6 +219,6 @@ class NotebookGistHub(object):
         nb = NotebookGist(gist, self)
         return nb
 
-def notebook_gisthub(user, password):
-    g = gisthub(user, password)
-    return NotebookGistHub(g)
+def notebook_gisthub(user, password, mirror_path=None, max_age=10):
+    g = gisthub(user, password, mirror_path=mirror_path)
+    return NotebookGistHub(g, max_age=max_age)
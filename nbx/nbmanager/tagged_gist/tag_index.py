@@ -0,0 +1,145 @@
+"""
+Inverted index over TaggedGists.
+
+GistHub.query groups gists by tag. Doing that by scanning every gist gets
+slow once an account has thousands of gists, so we keep tag -> ids and an
+active/inactive split up to date as gists change and answer queries with
+set intersections. Query results are memoized until the next change.
+"""
+import itertools
+
+
+class TagIndex(object):
+    def __init__(self, gists=None):
+        self.tags = {}
+        # frozenset(tags) -> ids. used for '#untagged'
+        self.tagsets = {}
+        self.active = set()
+        self.inactive = set()
+        self._entries = {}
+        self._order = {}
+        self._counter = itertools.count()
+        self._memo = {}
+        if gists is not None:
+            for gist in gists:
+                self.add(gist)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, gist_id):
+        return gist_id in self._entries
+
+    def add(self, gist):
+        """
+        Index gist. Re-adding an indexed gist updates it in place.
+        """
+        self._memo.clear()
+        gist_id = gist.id
+        if gist_id in self._entries:
+            self._unindex(gist_id)
+        else:
+            self._order[gist_id] = next(self._counter)
+
+        tags = frozenset(gist.tags)
+        active = bool(gist.active)
+        self._entries[gist_id] = (tags, active)
+        for tag in tags:
+            self.tags.setdefault(tag, set()).add(gist_id)
+        self.tagsets.setdefault(tags, set()).add(gist_id)
+        if active:
+            self.active.add(gist_id)
+        else:
+            self.inactive.add(gist_id)
+
+    update = add
+
+    def remove(self, gist_id):
+        if gist_id not in self._entries:
+            return
+        self._memo.clear()
+        self._unindex(gist_id)
+        del self._entries[gist_id]
+        del self._order[gist_id]
+
+    def _unindex(self, gist_id):
+        tags, active = self._entries[gist_id]
+        for tag in tags:
+            _discard(self.tags, tag, gist_id)
+        _discard(self.tagsets, tags, gist_id)
+        self.active.discard(gist_id)
+        self.inactive.discard(gist_id)
+
+    def query(self, active=True, filter_tag=None, select_tag=None,
+              group_filter=True):
+        """
+        candidates() + group(). If group_filter is False, the filter tags
+        are kept when grouping.
+        """
+        key = (active, tuple(filter_tag or ()), tuple(select_tag or ()),
+               group_filter)
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        ids = self.candidates(active, filter_tag)
+        grouped = self.group(ids, select_tag,
+                             filter_tag=filter_tag if group_filter else None)
+        self._memo[key] = grouped
+        return grouped
+
+    def candidates(self, active=True, filter_tag=None):
+        """
+        Ids matching the active state that have every tag in filter_tag.
+        """
+        if active is None:
+            ids = set(self._entries)
+        elif active:
+            ids = self.active
+        else:
+            ids = self.inactive
+
+        for tag in filter_tag or ():
+            ids = ids & self.tags.get(tag, set())
+            if not ids:
+                break
+        return ids
+
+    def group(self, ids, select_tag=None, filter_tag=None):
+        """
+        Group ids by tag. Mirrors GistHub._select_tag: tags in filter_tag
+        are ignored, gists with no other tags go under '#untagged' and
+        inactive gists are also listed under '#inactive'.
+
+        Returns {tag: [ids]} with ids in the order they were added.
+        """
+        filter_tag = frozenset(filter_tag or ())
+        if select_tag:
+            tags = [tag for tag in select_tag if tag not in filter_tag]
+        else:
+            tags = [tag for tag in self.tags if tag not in filter_tag]
+
+        grouped = {}
+        for tag in tags:
+            grouped[tag] = ids & self.tags.get(tag, set())
+
+        # gists whose only tags were filtered out
+        if not select_tag or '#untagged' in select_tag:
+            untagged = ids & self.tagsets.get(filter_tag, set())
+            grouped['#untagged'] = grouped.get('#untagged', set()) | untagged
+        if not select_tag or '#inactive' in select_tag:
+            inactive = ids & self.inactive
+            grouped['#inactive'] = grouped.get('#inactive', set()) | inactive
+
+        order = self._order.__getitem__
+        return dict((tag, sorted(group_ids, key=order))
+                    for tag, group_ids in grouped.items() if group_ids)
+
+
+def _discard(index, key, gist_id):
+    ids = index.get(key)
+    if ids is None:
+        return
+    ids.discard(gist_id)
+    if not ids:
+        del index[key]
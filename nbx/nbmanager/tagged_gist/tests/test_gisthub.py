@@ -172,3 +172,68 @@ class TestGistHub:
         assert_items_equal(list(test.keys()), ['#bob'])
         bobs = test['#bob']
         assert len(bobs) == 2
+
+    def test_query_index(self):
+        """
+        The tag index should give the same results as filtering every gist
+        """
+        names = [
+            "Test gist #frank",
+            "Frank bob number 2 #frank #bob",
+            "bob inactive #bob #inactive",
+            "bob twin #bob #twin",
+            "bob twin #bob #twin",
+            "just a notebook #notebook",
+            "old notebook #notebook #inactive",
+            "notebook twin #notebook #twin",
+            "no tags",
+        ]
+        gh = generate_gisthub(names)
+
+        def scan_query(tag=None, active=True, filter_tag=None,
+                       drop_filter=True):
+            gists = gh._tagged_gists.values()
+            gists = gh._filter_active(gists, active)
+            filter_tag = gh._normalize_tag(filter_tag)
+            if filter_tag:
+                gists = gh._filter_tag(gists, filter_tag)
+            if not drop_filter:
+                filter_tag = None
+            return gh._select_tag(gists, tag, filter_tag=filter_tag)
+
+        queries = [
+            {},
+            {'active': None},
+            {'active': False},
+            {'filter_tag': 'notebook'},
+            {'filter_tag': 'notebook', 'active': None},
+            {'filter_tag': 'notebook', 'drop_filter': False},
+            {'filter_tag': ['bob', 'twin']},
+            {'tag': 'bob'},
+            {'tag': ['#untagged', '#twin'], 'filter_tag': 'notebook'},
+            {'tag': '#inactive', 'active': None},
+            {'tag': 'missing'},
+            {'filter_tag': 'missing'},
+        ]
+        for kwargs in queries:
+            test = gh.query(**kwargs)
+            valid = scan_query(**kwargs)
+            assert test == valid, kwargs
+
+    def test_update_gist_index(self):
+        names = [
+            "Test gist #frank",
+            "Frank bob number 2 #frank #bob",
+        ]
+        gh = generate_gisthub(names)
+        assert_items_equal(gh.query(), ['#frank', '#bob'])
+
+        gist = gh._tagged_gists[1]
+        gist.gist.description = "Test gist #bob #inactive"
+        gh.update_gist(gist)
+
+        test = gh.query()
+        assert_items_equal(test, ['#frank', '#bob'])
+        assert [g.name for g in test['#frank']] == ['Frank bob number 2']
+        test = gh.query(active=False)
+        assert_items_equal(test, ['#bob', '#inactive'])
@@ -0,0 +1,108 @@
+import datetime
+import threading
+from types import SimpleNamespace
+
+from mock import Mock
+
+from nbx.tools import assert_items_equal
+
+from ..gisthub import GistHub, TaggedGist
+from ..notebook_gisthub import NotebookGistHub
+from ..gistnbmanager import GistNotebookManager
+
+
+def make_manager(names):
+    gists = {}
+    for id, name in enumerate(names, 1):
+        date = datetime.datetime(2000, 1, id)
+        gist = SimpleNamespace(id=id, description=name, public=True,
+                               updated_at=date, created_at=date)
+        gists[id] = TaggedGist.from_gist(gist)
+    gh = GistHub(Mock())
+    gh._tagged_gists = gists
+
+    calls = []
+    query = gh.query
+    def counting_query(*args, **kwargs):
+        calls.append((args, kwargs))
+        return query(*args, **kwargs)
+    gh.query = counting_query
+
+    nbm = GistNotebookManager(gisthub=NotebookGistHub(gh))
+    return nbm, calls
+
+
+class TestGistNotebookManager:
+
+    names = [
+        "first #notebook #bob",
+        "second #notebook #bob",
+        "third #notebook #bob #frank",
+        "old #notebook #bob #inactive",
+    ]
+
+    def test_list_notebooks(self):
+        nbm, calls = make_manager(self.names)
+        notebooks = nbm.list_notebooks('#bob')
+        # one grouping for the whole listing
+        assert len(calls) == 2
+        names = [model['name'] for model in notebooks]
+        assert names == ['third [3].ipynb', 'second [2].ipynb',
+                         'first [1].ipynb']
+
+        # snapshot does not outlive the call
+        nbm.list_notebooks('#frank')
+        assert len(calls) == 4
+
+    def test_snapshot(self):
+        nbm, calls = make_manager(self.names)
+        with nbm.query_snapshot():
+            assert_items_equal([d['name'] for d in nbm.list_dirs()],
+                               ['#bob', '#frank', '#inactive'])
+            assert nbm.path_exists('#frank')
+            assert nbm.notebook_exists('first [1].ipynb', '#bob')
+            # bare tag names work too
+            assert nbm.notebook_exists('first [1].ipynb', 'bob')
+            assert not nbm.notebook_exists('first [1].ipynb', '#frank')
+            model = nbm.get_notebook('third [3].ipynb', '#frank',
+                                     content=False)
+            assert model['last_modified'] == datetime.datetime(2000, 1, 3)
+        assert len(calls) == 2
+
+        # without a snapshot every helper queries
+        nbm.gist_query()
+        nbm.gist_query()
+        assert len(calls) == 6
+
+    def test_invalidate_snapshot(self):
+        nbm, calls = make_manager(self.names)
+        with nbm.query_snapshot():
+            nbm.gist_query()
+            nbm.invalidate_snapshot()
+            nbm.gist_query()
+        assert len(calls) == 4
+
+    def test_snapshot_per_thread(self):
+        nbm, calls = make_manager(self.names)
+        entered = threading.Event()
+        done = threading.Event()
+
+        def crawl():
+            with nbm.query_snapshot():
+                nbm.gist_query()
+                entered.set()
+                done.wait(5)
+                nbm.gist_query()
+
+        thread = threading.Thread(target=crawl)
+        thread.start()
+        assert entered.wait(5)
+        # another thread's snapshot neither answers us nor ends with us
+        nbm.gist_query()
+        assert len(calls) == 4
+        with nbm.query_snapshot():
+            nbm.gist_query()
+        assert len(calls) == 6
+        done.set()
+        thread.join(5)
+        assert len(calls) == 6
@@ -0,0 +1,169 @@
+import os
+import datetime
+
+from IPython.utils.tempdir import TemporaryDirectory
+
+from nbx.tools import assert_items_equal
+
+from ..gisthub import GistHub
+from ..mirror import GistMirror, MirroredGist
+from nbx.nbmanager.tests.common import FakeGithub, FakeGithubGist
+
+
+def make_hub():
+    gists = [
+        FakeGithubGist(1, "Test gist #frank"),
+        FakeGithubGist(2, "Frank bob number 2 #frank #bob"),
+        FakeGithubGist(3, "bob inactive #bob #inactive"),
+        FakeGithubGist(4, ""),
+    ]
+    return FakeGithub(gists)
+
+
+def past(seconds):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return now - datetime.timedelta(seconds=seconds)
+
+
+class TestGistMirror:
+
+    def test_sync(self):
+        hub = make_hub()
+        mirror = GistMirror(':memory:')
+        changed, removed = mirror.sync(hub.get_user())
+        assert len(changed) == 4
+        assert removed == []
+        # first sync is a full crawl
+        assert hub.list_calls == [None]
+
+        rows = dict((row['id'], row) for row in mirror.load())
+        assert_items_equal(rows, ['1', '2', '3', '4'])
+        assert rows['2']['tags'] == ['#frank', '#bob']
+        assert rows['1']['files'] == ['1.ipynb']
+
+        # incremental sync only grabs what changed
+        hub.add(FakeGithubGist(5, "new one #bob"))
+        changed, removed = mirror.sync(hub.get_user())
+        assert hub.list_calls[-1] == mirror.full_synced_at
+        assert [g.id for g in changed] == ['5']
+
+    def test_full_sync_removes(self):
+        hub = make_hub()
+        mirror = GistMirror(':memory:')
+        mirror.sync(hub.get_user())
+
+        del hub.gists['1']
+        changed, removed = mirror.sync(hub.get_user(), full=True)
+        assert removed == ['1']
+        assert_items_equal([row['id'] for row in mirror.load()],
+                           ['2', '3', '4'])
+
+    def test_needs_sync(self):
+        hub = make_hub()
+        mirror = GistMirror(':memory:', max_age=60)
+        assert mirror.needs_sync()
+        mirror.sync(hub.get_user())
+        assert not mirror.needs_sync()
+        mirror._set_meta('synced_at', past(120).isoformat())
+        assert mirror.needs_sync()
+
+    def test_mirrored_gist(self):
+        hub = make_hub()
+        mirror = GistMirror(':memory:')
+        mirror.sync(hub.get_user())
+        row = [row for row in mirror.load() if row['id'] == '1'][0]
+
+        gist = MirroredGist(row, hub)
+        assert gist.description == "Test gist #frank"
+        assert hub.get_calls == []
+        # file names are mirrored
+        assert list(gist.files) == ['1.ipynb']
+        assert gist.files['1.ipynb'].filename == '1.ipynb'
+        assert hub.get_calls == []
+        # reading content hits github
+        gist.files['1.ipynb'].content
+        assert hub.get_calls == ['1']
+        # after which the real files are used
+        assert gist.files is hub.gists['1'].files
+
+
+class TestMirroredGistHub:
+
+    def test_restart(self):
+        with TemporaryDirectory() as td:
+            path = os.path.join(td, 'gists.sqlite')
+            hub = make_hub()
+            gh = GistHub(hub, mirror=GistMirror(path))
+            test = gh.query()
+            assert len(hub.list_calls) == 1
+            assert_items_equal(test, ['#frank', '#bob'])
+
+            # fresh process with a fresh mirror. no api calls needed
+            hub = make_hub()
+            gh = GistHub(hub, mirror=GistMirror(path))
+            test = gh.query()
+            assert hub.list_calls == []
+            assert hub.get_calls == []
+            assert_items_equal(test, ['#frank', '#bob'])
+            assert_items_equal([g.name for g in test['#frank']],
+                               ['Test gist', 'Frank bob number 2'])
+
+    def test_incremental(self):
+        hub = make_hub()
+        mirror = GistMirror(':memory:', max_age=60)
+        gh = GistHub(hub, mirror=mirror)
+        gh.query()
+
+        # edit outside of nbx
+        hub.gists['1'].description = "Test gist #frank #inactive"
+        hub.gists['1'].updated_at = datetime.datetime.now(
+            datetime.timezone.utc)
+        hub.add(FakeGithubGist(5, "new one #bob"))
+
+        # still fresh
+        test = gh.query()
+        assert len(hub.list_calls) == 1
+        assert_items_equal([g.name for g in test['#frank']],
+                           ['Test gist', 'Frank bob number 2'])
+
+        mirror._set_meta('synced_at', past(120).isoformat())
+        # stale. served from the mirror while it syncs in the background
+        test = gh.query()
+        assert_items_equal([g.name for g in test['#frank']],
+                           ['Test gist', 'Frank bob number 2'])
+        thread = gh._sync_thread
+        if thread is not None:
+            thread.join(5)
+        assert len(hub.list_calls) == 2
+
+        test = gh.query()
+        assert len(hub.list_calls) == 2
+        assert_items_equal([g.name for g in test['#frank']],
+                           ['Frank bob number 2'])
+        assert_items_equal([g.name for g in test['#bob']],
+                           ['Frank bob number 2', 'new one'])
+
+    def test_sync_failure(self):
+        hub = make_hub()
+        mirror = GistMirror(':memory:', max_age=60)
+        gh = GistHub(hub, mirror=mirror)
+        gh.query()
+
+        def down(since=None):
+            hub.list_calls.append(since)
+            raise Exception('github down')
+        hub.get_gists = down
+        mirror._set_meta('synced_at', past(120).isoformat())
+
+        test = gh.query()
+        assert_items_equal(test, ['#frank', '#bob'])
+        thread = gh._sync_thread
+        if thread is not None:
+            thread.join(5)
+        assert len(hub.list_calls) == 2
+        # the mirror is still served and the failed sync isn't retried on
+        # every query
+        test = gh.query()
+        assert_items_equal(test, ['#frank', '#bob'])
+        assert gh._sync_thread is None
+        assert len(hub.list_calls) == 2
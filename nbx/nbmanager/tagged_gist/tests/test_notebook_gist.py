@@ -1,5 +1,7 @@
+from mock import Mock
+
 from ..notebook_gisthub import NotebookGistHub
-from ..gisthub import GistHub
+from ..gisthub import GistHub, TaggedGist
 from .test_gisthub import generate_gisthub
 
 from nbx.tools import assert_items_equal
@@ -8,6 +10,7 @@ from nbx.nbmanager.tests.common import (
     hub,
     require_github,
     make_notebookgist,
+    makeFakeGist,
 )
 
 
@@ -144,3 +147,36 @@ class TestNotebookGistHub:
         gisthub = GistHub(hub)
         nbhub = NotebookGistHub(gisthub)
         nbhub.query()
+
+    def test_refresh_max_age(self):
+        """
+        A fetched gist is reused within max_age and then revalidated with a
+        conditional request instead of a full fetch.
+        """
+        gist = makeFakeGist()
+        gist.update.return_value = False
+        hub = Mock()
+        hub.get_gist.return_value = gist
+        gh = GistHub(hub)
+        gh._tagged_gists = {gist.id: TaggedGist.from_gist(gist)}
+        nbgh = NotebookGistHub(gh, max_age=60)
+
+        nb = nbgh.query(filter_tag=None)['#pandas']['Test Gist [123].ipynb']
+        nb.notebook_content
+        nb.revisions
+        nb._generate_payload()
+        assert hub.get_gist.call_count == 1
+        assert gist.update.call_count == 0
+
+        # stale. revalidate
+        nb.gist.fetched_at -= 120
+        nb.revisions
+        assert hub.get_gist.call_count == 1
+        assert gist.update.call_count == 1
+
+        # max_age=0 always checks
+        nbgh.max_age = 0
+        nb.revisions
+        nb.revisions
+        assert hub.get_gist.call_count == 1
+        assert gist.update.call_count == 3
@@ -1,3 +1,5 @@
+import datetime
+
 import github
 import pandas as pd
 from mock import Mock
@@ -84,3 +86,48 @@ def make_notebookgist():
     gisthub = NotebookGistHub(TestGistHub())
     nb = NotebookGist(tg, gisthub)
     return nb
+
+
+class FakeGithubGist(object):
+    """
+    Minimal github.Gist stand-in for the gist list endpoints.
+    """
+    def __init__(self, id, description, files=None, public=True,
+                 updated_at=None):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        self.id = str(id)
+        self.description = description
+        if files is None:
+            files = ['{0}.ipynb'.format(id)]
+        self.files = dict((fn, Mock(filename=fn)) for fn in files)
+        self.public = public
+        self.created_at = updated_at or now
+        self.updated_at = updated_at or now
+
+
+class FakeGithub(object):
+    """
+    Local stand-in for github.Github that serves a fixed set of gists and
+    counts the api calls.
+    """
+    def __init__(self, gists=()):
+        self.gists = dict((gist.id, gist) for gist in gists)
+        self.list_calls = []
+        self.get_calls = []
+
+    def add(self, gist):
+        self.gists[gist.id] = gist
+
+    def get_user(self):
+        return self
+
+    def get_gists(self, since=None):
+        self.list_calls.append(since)
+        gists = self.gists.values()
+        if since is not None:
+            gists = [g for g in gists if g.updated_at >= since]
+        return list(gists)
+
+    def get_gist(self, gist_id):
+        self.get_calls.append(gist_id)
+        return self.gists[str(gist_id)]
@@ -0,0 +1,93 @@
+from ..dispatch import DispatcherMixin, _dispatch_tables
+from ..metamanager import MetaManager
+
+
+class Manager(DispatcherMixin):
+    def __init__(self):
+        self.probes = []
+
+    def is_dir(self, path):
+        self.probes.append(('is_dir', path))
+        return path == 'dir'
+
+    def is_notebook(self, path):
+        self.probes.append(('is_notebook', path))
+        return path.endswith('.ipynb')
+
+    def get_dir(self, path, content=True, **kwargs):
+        return 'dir'
+
+    def get_notebook(self, path, content=True, **kwargs):
+        return 'notebook'
+
+    def get_default(self, path, content=True, **kwargs):
+        return 'default'
+
+    def delete_notebook(self, path):
+        return 'deleted notebook'
+
+
+class LegacyManager(object):
+    """ plain ContentsManager signatures """
+    def get(self, path, content=True, type=None, format=None):
+        return {'type': 'file', 'path': path}
+
+    def delete(self, path):
+        return 'deleted ' + path
+
+
+class TestDispatch:
+
+    def test_dispatch(self):
+        nbm = Manager()
+        assert nbm.get('dir') == 'dir'
+        assert nbm.get('nb.ipynb') == 'notebook'
+        # no get_file. falls back to default
+        assert nbm.get('file.txt') == 'default'
+        assert _dispatch_tables[Manager][('get', 'file')] == 'get_default'
+
+        try:
+            nbm.delete('file.txt')
+        except AttributeError:
+            pass
+        else:
+            raise AssertionError("delete_file doesn't exist")
+        assert _dispatch_tables[Manager][('delete', 'file')] is None
+
+    def test_known_type(self):
+        nbm = Manager()
+        assert nbm.get('dir', model_type='directory') == 'dir'
+        assert nbm.get('nb.ipynb', model_type='notebook') == 'notebook'
+        assert nbm.delete('nb.ipynb', model_type='notebook') == 'deleted notebook'
+        assert nbm.probes == []
+
+        # unknown types still probe
+        assert nbm.get('nb.ipynb', model_type='unknown') == 'notebook'
+        assert nbm.probes
+
+    def test_client_type_probes(self):
+        nbm = Manager()
+        # the editor opens bundle notebooks with type=file
+        assert nbm.get('nb.ipynb', type='file') == 'notebook'
+        assert nbm.get('dir', type='file') == 'dir'
+        assert nbm.probes
+
+    def test_instance_method(self):
+        nbm = Manager()
+        nbm.delete_file = lambda path: 'deleted file'
+        assert nbm.delete('file.txt') == 'deleted file'
+
+    def test_metamanager_hint(self):
+        mm = MetaManager(enable_custom_handlers=False)
+        nbm = Manager()
+        mm.router.add('nbx', nbm)
+        mm.router.add('legacy', LegacyManager())
+
+        assert mm.delete('nbx/nb.ipynb', model_type='notebook') == \
+            'deleted notebook'
+        assert nbm.probes == []
+        # managers without dispatch never see the hint
+        assert mm.delete('legacy/nb.ipynb', model_type='notebook') == \
+            'deleted nb.ipynb'
+        model = mm.get('legacy/nb.ipynb', model_type='notebook', type='file')
+        assert model['path'] == 'nb.ipynb'
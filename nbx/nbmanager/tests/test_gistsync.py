@@ -0,0 +1,94 @@
+import threading
+import time
+
+from ..gistsync import GistSyncQueue
+
+
+class TestGistSyncQueue:
+
+    def test_coalesce(self):
+        gate = threading.Event()
+        calls = []
+
+        def sync(gist_id, content):
+            gate.wait(5)
+            calls.append((gist_id, content))
+
+        queue = GistSyncQueue(sync)
+        queue.submit('a', 'a', 1)
+        # wait for the worker to pick up the first job
+        while queue.depth:
+            time.sleep(0.001)
+        queue.submit('a', 'a', 2)
+        queue.submit('a', 'a', 3)
+        queue.submit('b', 'b', 1, path='b.ipynb')
+        assert queue.depth == 2
+
+        gate.set()
+        assert queue.join(5)
+        queue.stop()
+
+        # the 2nd save got replaced by the 3rd
+        assert calls == [('a', 1), ('a', 3), ('b', 1)]
+        status = queue.status('a')
+        assert status['submitted'] == 3
+        assert status['synced'] == 2
+        assert not status['pending']
+        assert status['last_sync'] is not None
+        assert queue.status('b')['path'] == 'b.ipynb'
+
+    def test_retry(self):
+        calls = []
+
+        def sync(gist_id):
+            calls.append(gist_id)
+            if len(calls) < 3:
+                raise Exception('github down')
+
+        queue = GistSyncQueue(sync, max_retries=3, backoff=0.01)
+        queue.submit('a', 'a')
+        assert queue.join(5)
+        queue.stop()
+
+        assert len(calls) == 3
+        status = queue.status('a')
+        assert status['synced'] == 1
+        assert status['attempts'] == 3
+        assert status['last_error'] is None
+
+    def test_give_up(self):
+        def sync(gist_id):
+            raise Exception('github down')
+
+        queue = GistSyncQueue(sync, max_retries=1, backoff=0.01)
+        queue.submit('a', 'a')
+        assert queue.join(5)
+        queue.stop()
+
+        status = queue.status('a')
+        assert status['synced'] == 0
+        assert status['attempts'] == 2
+        assert 'github down' in status['last_error']
+        assert status['last_sync'] is None
+
+    def test_shutdown(self):
+        gate = threading.Event()
+        calls = []
+
+        def sync(gist_id):
+            gate.wait(5)
+            calls.append(gist_id)
+
+        queue = GistSyncQueue(sync)
+        queue.submit('a', 'a', path='a.ipynb')
+        queue.submit('b', 'b', path='b.ipynb')
+        assert queue.shutdown(0.05) == ['a', 'b']
+        gate.set()
+        queue._thread.join(5)
+        # a was already running, b never starts
+        assert calls == ['a']
+
+        queue = GistSyncQueue(lambda gist_id: calls.append(gist_id))
+        queue.submit('c', 'c')
+        assert queue.shutdown(5) == []
+        assert calls == ['a', 'c']
@@ -0,0 +1,46 @@
+import datetime
+
+import pytest
+
+from ..listing import page_models, parse_sort, top_models
+
+
+def make_models(n):
+    start = datetime.datetime(2020, 1, 1)
+    return [{'name': 'nb%03d' % i,
+             'last_modified': start + datetime.timedelta(hours=i)}
+            for i in range(n)]
+
+
+class TestListing:
+
+    def test_parse_sort(self):
+        assert parse_sort(None) == ('last_modified', True)
+        assert parse_sort('name') == ('name', False)
+        assert parse_sort('-name') == ('name', True)
+        with pytest.raises(ValueError):
+            parse_sort('size')
+
+    def test_top_models(self):
+        models = make_models(50)
+        top = top_models(models, 3)
+        assert [m['name'] for m in top] == ['nb049', 'nb048', 'nb047']
+        # matches a full sort
+        full = top_models(models)
+        assert top == full[:3]
+        assert top_models(models, 2, 'name')[1]['name'] == 'nb001'
+
+    def test_missing_dates(self):
+        models = make_models(3) + [{'name': 'dir', 'last_modified': None}]
+        assert top_models(models)[-1]['name'] == 'dir'
+        # aware and naive dates still compare
+        aware = {'name': 'aware', 'last_modified':
+                 datetime.datetime(2030, 1, 1, tzinfo=datetime.timezone.utc)}
+        assert top_models(models + [aware], 1)[0]['name'] == 'aware'
+
+    def test_page_models(self):
+        models = make_models(10)
+        page = page_models(models, limit=3, offset=3, sort='name')
+        assert [m['name'] for m in page] == ['nb003', 'nb004', 'nb005']
+        assert len(page_models(models, offset=8)) == 2
+        assert page_models(models, limit=5, offset=20) == []
@@ -0,0 +1,101 @@
+import logging
+
+from ..metamanager import MetaManager
+
+MIDDLEWARE = 'nbx.nbmanager.tests.test_middleware.'
+
+
+class FakeManager(object):
+    def __init__(self):
+        self.saved = []
+
+    def save(self, model, path):
+        self.saved.append(path)
+        return dict(model, saved=True)
+
+
+class RecordingMiddleware(object):
+    calls = []
+
+    def __init__(self, parent=None, log=None):
+        pass
+
+    def pre_save(self, nbm, local_path, model, path):
+        self.calls.append(('pre_save', local_path))
+
+    def post_save(self, nbm, local_path, model, path, result=None):
+        self.calls.append(('post_save', local_path, result))
+
+
+class LegacyMiddleware(object):
+    calls = []
+
+    def __init__(self, parent=None, log=None):
+        pass
+
+    def post_save(self, nbm, local_path, model, path):
+        self.calls.append(('post_save', local_path))
+
+
+def make_manager(**middleware):
+    middleware = dict((name, MIDDLEWARE + cls)
+                      for name, cls in middleware.items())
+    mm = MetaManager(enable_custom_handlers=False,
+                     manager_middleware=middleware)
+    nbm = FakeManager()
+    mm.router.add('fake', nbm)
+    return mm, nbm
+
+
+class TestManagerHook:
+
+    def setup_method(self, method):
+        RecordingMiddleware.calls = []
+        LegacyMiddleware.calls = []
+
+    def test_hook_table(self):
+        mm, nbm = make_manager(recording='RecordingMiddleware',
+                               legacy='LegacyMiddleware')
+        assert sorted(mm.middleware_hooks) == ['post_save', 'pre_save']
+        takes_result = dict((name, flag) for name, method, flag
+                            in mm.middleware_hooks['post_save'])
+        assert takes_result == {'recording': True, 'legacy': False}
+
+    def test_dispatch(self):
+        mm, nbm = make_manager(recording='RecordingMiddleware',
+                               legacy='LegacyMiddleware')
+        res = mm.save({'type': 'file'}, 'fake/dir/file.txt')
+        assert res['saved']
+        assert RecordingMiddleware.calls == [
+            ('pre_save', 'dir/file.txt'),
+            ('post_save', 'dir/file.txt', res),
+        ]
+        assert LegacyMiddleware.calls == [('post_save', 'dir/file.txt')]
+
+        calls, total, longest = mm.middleware_timings[('recording', 'pre_save')]
+        assert calls == 1
+        assert total >= longest >= 0
+
+    def test_no_listeners(self):
+        mm, nbm = make_manager()
+        assert mm.middleware_hooks == {}
+
+        resolved = []
+        nbm_from_path = mm._nbm_from_path
+        def count(path):
+            resolved.append(path)
+            return nbm_from_path(path)
+        mm._nbm_from_path = count
+
+        mm.save({'type': 'file'}, 'fake/file.txt')
+        # only save's own lookup. the hook didn't resolve the path
+        assert resolved == ['fake/file.txt']
+        assert nbm.saved == ['file.txt']
+        assert mm.middleware_timings == {}
+
+    def test_slow_middleware(self, caplog):
+        mm, nbm = make_manager(recording='RecordingMiddleware')
+        mm.middleware_slow_threshold = -1
+        with caplog.at_level(logging.WARNING):
+            mm.save({'type': 'file'}, 'fake/file.txt')
+        assert 'Slow middleware: recording.pre_save' in caplog.text
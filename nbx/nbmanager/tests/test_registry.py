@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+
+from ..registry import NotebookRegistry, path_key_hash, KEY_LENGTH
+
+
+class TestNotebookRegistry:
+
+    def setup_method(self, method):
+        self.td = tempfile.mkdtemp()
+        self.db = os.path.join(self.td, 'registry.sqlite')
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.td)
+
+    def test_stable_keys(self):
+        registry = NotebookRegistry(self.db)
+        entry = registry.assign('work', 'dir/nb.ipynb', 'nb.ipynb')
+        assert len(entry['key']) == KEY_LENGTH
+        assert entry['key'] == path_key_hash('work/dir/nb.ipynb/nb.ipynb')
+        # same path, same entry
+        assert registry.assign('work', 'dir/nb.ipynb', 'nb.ipynb') is entry
+        # and the same key in a fresh registry
+        other = NotebookRegistry(':memory:')
+        assert other.assign('work', 'dir/nb.ipynb', 'nb.ipynb')['key'] == entry['key']
+
+    def test_persistent(self):
+        registry = NotebookRegistry(self.db)
+        key = registry.assign('work', 'nb.ipynb', 'nb.ipynb')['key']
+        registry.close()
+
+        # no listing needed after a restart
+        registry = NotebookRegistry(self.db)
+        entry = registry[key]
+        assert entry['manager_path'] == 'work'
+        assert entry['path'] == 'nb.ipynb'
+        assert registry.get('work/nb.ipynb/nb.ipynb') == entry
+
+    def test_collision(self):
+        registry = NotebookRegistry(self.db)
+        path_key = 'work/nb.ipynb/nb.ipynb'
+        taken = path_key_hash(path_key)
+        registry._remember({'key': taken, 'path_key': 'other',
+                            'manager_path': 'other', 'path': '', 'name': ''})
+        entry = registry.assign('work', 'nb.ipynb', 'nb.ipynb')
+        assert entry['key'] == path_key_hash(path_key, 1)
+        assert registry[taken]['path_key'] == 'other'
+
+    def test_prune(self):
+        registry = NotebookRegistry(self.db)
+        keep, drop = registry.assign_many([('work', 'keep.ipynb', 'keep.ipynb'),
+                                           ('work', 'drop.ipynb', 'drop.ipynb')])
+        gone = registry.prune(lambda entry: entry['name'] == 'keep.ipynb')
+        assert gone == [drop['key']]
+        assert drop['key'] not in registry
+        assert keep['key'] in registry
+
+        registry.close()
+        registry = NotebookRegistry(self.db)
+        assert len(registry) == 1
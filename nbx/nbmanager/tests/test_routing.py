@@ -0,0 +1,80 @@
+from ..routing import PathRouter
+
+
+def make_router(cache_size=1024):
+    managers = {
+        'server-home': 'home',
+        'gist:dale': 'gist',
+        'work/reports': 'reports',
+    }
+    return PathRouter(managers, root='root', cache_size=cache_size)
+
+
+class TestPathRouter:
+
+    def test_root(self):
+        router = make_router()
+        for path in ['', '/', None]:
+            nbm, meta = router.resolve(path)
+            assert nbm == 'root'
+            assert meta.path == ''
+            assert meta.nbm_path == ''
+
+    def test_resolve(self):
+        router = make_router()
+        nbm, meta = router.resolve('/server-home/dir1/dir2/notebook.ipynb')
+        assert nbm == 'home'
+        assert meta.nbm_path == 'server-home'
+        assert meta.path == 'dir1/dir2/notebook.ipynb'
+        assert meta.request_path == 'server-home/dir1/dir2/notebook.ipynb'
+
+        nbm, meta = router.resolve('server-home')
+        assert nbm == 'home'
+        assert meta.path == ''
+
+        nbm, meta = router.resolve('gist:dale/#pandas')
+        assert nbm == 'gist'
+        assert meta.path == '#pandas'
+
+    def test_nested_alias(self):
+        router = make_router()
+        nbm, meta = router.resolve('work/reports/q1.ipynb')
+        assert nbm == 'reports'
+        assert meta.nbm_path == 'work/reports'
+        assert meta.path == 'q1.ipynb'
+
+        # prefix of an alias is not a manager
+        nbm, meta = router.resolve('work/other')
+        assert nbm is None
+        assert meta.nbm_path == 'work'
+        assert meta.path == 'other'
+
+    def test_missing(self):
+        router = make_router()
+        nbm, meta = router.resolve('missing/dir')
+        assert nbm is None
+        assert meta.nbm_path == 'missing'
+        assert meta.path == 'dir'
+
+    def test_cache(self):
+        router = make_router(cache_size=2)
+        first = router.resolve('server-home/a')
+        assert router.resolve('server-home/a') is first
+        assert router.stats()['hits'] == 1
+        assert router.stats()['misses'] == 1
+
+        router.resolve('server-home/b')
+        router.resolve('server-home/c')
+        # a was evicted
+        assert router.stats()['size'] == 2
+        assert router.resolve('server-home/a') is not first
+        assert router.stats()['misses'] == 4
+
+    def test_add_clears_cache(self):
+        router = make_router()
+        nbm, meta = router.resolve('new/dir')
+        assert nbm is None
+        router.add('new', 'new-manager')
+        nbm, meta = router.resolve('new/dir')
+        assert nbm == 'new-manager'
+        assert meta.path == 'dir'
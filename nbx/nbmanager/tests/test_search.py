@@ -0,0 +1,146 @@
+import os
+import shutil
+import tempfile
+
+import nbformat
+from nbformat.v4 import new_notebook, new_code_cell, new_markdown_cell
+
+from ..bundle.bundlenbmanager import BundleNotebookManager
+from ..metamanager import MetaManager
+from ..scratchpad import WorkareaManager
+from ..search import SearchIndex, SearchCrawler, match_expression
+from .test_workarea import workarea
+
+
+def make_nb(markdown='', code=''):
+    return new_notebook(cells=[new_markdown_cell(markdown),
+                               new_code_cell(code)])
+
+
+def write_nb(root, path, nb):
+    os_path = os.path.join(root, path)
+    if not os.path.isdir(os.path.dirname(os_path)):
+        os.makedirs(os.path.dirname(os_path))
+    nbformat.write(nb, os_path)
+
+
+class TestSearchIndex:
+
+    def test_match_expression(self):
+        assert match_expression('pandas merge') == '"pandas"* "merge"*'
+        # fts5 syntax in the query isn't interpreted
+        assert match_expression('a OR "b') == '"a"* "OR"* "b"*'
+        assert match_expression(' -*') is None
+
+    def test_search(self):
+        index = SearchIndex()
+        index.add('b/code.ipynb', 'code.ipynb',
+                  nb=make_nb(code='import pandas as pd'))
+        index.add('b/title.ipynb', 'pandas tricks.ipynb',
+                  nb=make_nb(markdown='# notes'))
+        index.add('g/#data/gist.ipynb', 'gist.ipynb', tags=['#data'])
+
+        results = index.search('pandas')
+        # name matches rank above code matches
+        assert [r['path'] for r in results] == ['b/title.ipynb',
+                                               'b/code.ipynb']
+        assert results[0]['score'] > results[1]['score']
+        assert index.search('pan')[0]['path'] == 'b/title.ipynb'
+        assert index.search('data')[0]['tags'] == ['#data']
+        assert index.search('pandas', prefix='g/') == []
+
+        # re-adding replaces the old text
+        index.add('b/code.ipynb', 'code.ipynb', nb=make_nb(code='import os'))
+        assert [r['path'] for r in index.search('pandas')] == ['b/title.ipynb']
+        assert len(index) == 3
+
+        index.remove(['b/title.ipynb'])
+        assert index.search('pandas') == []
+
+    def test_persistent(self):
+        td = tempfile.mkdtemp()
+        try:
+            path = os.path.join(td, 'search.sqlite')
+            index = SearchIndex(path)
+            index.add('b/nb.ipynb', 'nb.ipynb', nb=make_nb('hello'), stamp=5)
+            index.close()
+
+            index = SearchIndex(path)
+            assert index.stamp('b/nb.ipynb') == 5
+            assert index.search('hello')[0]['path'] == 'b/nb.ipynb'
+        finally:
+            shutil.rmtree(td)
+
+
+class CountingLoads(object):
+    def __init__(self, manager):
+        self.manager = manager
+        self.loaded = []
+        self._get_notebook = manager.get_notebook
+        manager.get_notebook = self.get_notebook
+
+    def get_notebook(self, path, *args, **kwargs):
+        self.loaded.append(path)
+        return self._get_notebook(path, *args, **kwargs)
+
+
+class TestSearchCrawler:
+
+    def test_bundle(self):
+        td = tempfile.mkdtemp()
+        try:
+            write_nb(td, 'one.ipynb', make_nb('alpha'))
+            write_nb(td, 'sub/two.ipynb', make_nb(code='beta = 1'))
+            manager = BundleNotebookManager(root_dir=td)
+            loads = CountingLoads(manager)
+            index = SearchIndex()
+            crawler = SearchCrawler(index, {'b': manager})
+
+            assert crawler.crawl_manager('b', manager) == 2
+            assert index.search('beta')[0]['path'] == 'b/sub/two.ipynb'
+
+            # unchanged notebooks aren't loaded again
+            loads.loaded = []
+            assert crawler.crawl_manager('b', manager) == 0
+            assert loads.loaded == []
+
+            # deleted notebooks are dropped
+            os.remove(os.path.join(td, 'one.ipynb'))
+            manager.listing_cache.clear()
+            crawler.crawl_manager('b', manager)
+            assert index.search('alpha') == []
+            assert len(index) == 1
+        finally:
+            shutil.rmtree(td)
+
+    def test_workarea(self):
+        with workarea() as td:
+            write_nb(td, 'a/findme.ipynb', make_nb('needle'))
+            wm = WorkareaManager(workarea_paths={'w1': td})
+            index = SearchIndex()
+            SearchCrawler(index, {'wa': wm}).crawl()
+
+            result = index.search('needle')[0]
+            key = result['path'][len('wa/['):-len('].ipynb')]
+            entry = wm.get_entry(result['path'])
+            assert entry['key'] == key
+            assert entry['name'] == 'findme.ipynb'
+
+
+class TestSearchMiddleware:
+
+    def test_post_save(self):
+        td = tempfile.mkdtemp()
+        try:
+            mm = MetaManager(enable_custom_handlers=False, enable_search=True,
+                             search_crawl_interval=None,
+                             bundle_dirs={'b': td})
+            mm.search_crawler.stop()
+            assert 'search' in mm.middleware
+
+            model = {'type': 'notebook', 'content': make_nb('saved text')}
+            mm.save(model, 'b/new.ipynb')
+            results = mm.search_index.search('saved')
+            assert [r['path'] for r in results] == ['b/new.ipynb']
+        finally:
+            shutil.rmtree(td)
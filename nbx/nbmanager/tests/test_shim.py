@@ -0,0 +1,78 @@
+import functools
+
+from notebook.services.contents.manager import ContentsManager
+
+from ..shim import contents_api_name
+from ..util import arg_map, get_invoked_arg, set_invoked_arg
+
+
+class LegacyManager(ContentsManager):
+    """ name/path style api """
+    def get(self, name, path='', content=True, type=None, format=None):
+        return name, path, content
+
+    def save(self, model, name, path=''):
+        return dict(model), name, path
+
+    def file_exists(self, name, path=''):
+        return name, path
+
+
+def middleware(func):
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        return func(self, *args, **kwargs)
+    return wrapper
+
+
+class TestArgMap:
+
+    def test_cached(self):
+        manager = LegacyManager()
+        # bound methods share the map of their function
+        assert arg_map(manager.get) is arg_map(LegacyManager.get)
+        assert arg_map(LegacyManager.get).args == [
+            'name', 'path', 'content', 'type', 'format']
+
+    def test_wrapped(self):
+        wrapped = middleware(LegacyManager.save)
+        assert arg_map(wrapped) is arg_map(LegacyManager.save)
+
+    def test_invoked_arg(self):
+        func = LegacyManager.get
+        assert get_invoked_arg(func, 'path', ['a', 'b'], {}) == 'b'
+        assert get_invoked_arg(func, 'path', ['a'], {'path': 'c'}) == 'c'
+
+        args = ['a']
+        set_invoked_arg(func, 'path', 'b', args, {})
+        assert args == ['a', 'b']
+
+        kwargs = {}
+        set_invoked_arg(func, 'other', 1, args, kwargs)
+        assert kwargs == {'other': 1}
+
+
+class TestContentsNameApiShim:
+
+    def test_specs(self):
+        shimmed = contents_api_name(LegacyManager)
+        # built once, when the class is created
+        current, legacy = shimmed._shim_specs['get']
+        assert current is arg_map(ContentsManager.get)
+        assert legacy is arg_map(LegacyManager.get)
+
+    def test_calls(self):
+        manager = contents_api_name(LegacyManager)()
+        assert manager.get('dir/sub/nb.ipynb') == ('nb.ipynb', 'dir/sub', True)
+        assert manager.get('nb.ipynb', content=False) == ('nb.ipynb', '', False)
+        assert manager.file_exists('dir/nb.ipynb') == ('nb.ipynb', 'dir')
+
+        model, name, path = manager.save({'path': 'dir/nb.ipynb'},
+                                         'dir/nb.ipynb')
+        assert model == {'name': 'nb.ipynb', 'path': 'dir'}
+        assert (name, path) == ('nb.ipynb', 'dir')
+
+        # shimmed methods are built once per instance
+        assert manager.get is manager.get
+        # everything else comes from the wrapped manager
+        assert manager.root_dir == manager._manager.root_dir
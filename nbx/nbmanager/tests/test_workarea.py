@@ -0,0 +1,295 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from traitlets.config import Config
+
+from ..bundle.bundlenbmanager import BundleNotebookManager
+from ..scratchpad import WorkareaIndex, WorkareaManager, crawl
+
+NB_JSON = json.dumps({"cells": [], "metadata": {}, "nbformat": 4,
+                      "nbformat_minor": 4})
+
+
+def make_notebook(root, path, mtime):
+    os_path = os.path.join(root, path)
+    dirname = os.path.dirname(os_path)
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname)
+    with open(os_path, 'w') as f:
+        f.write(NB_JSON)
+    os.utime(os_path, (mtime, mtime))
+
+
+def touch_dir(root, path, mtime):
+    # make sure the dir mtime moves even on coarse filesystems
+    os.utime(os.path.join(root, path), (mtime, mtime))
+
+
+@contextmanager
+def workarea():
+    td = tempfile.mkdtemp()
+    try:
+        make_notebook(td, 'a/one.ipynb', 1000)
+        make_notebook(td, 'a/sub/two.ipynb', 3000)
+        make_notebook(td, 'b/three.ipynb', 2000)
+        yield td
+    finally:
+        shutil.rmtree(td)
+
+
+class CountingManager(BundleNotebookManager):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.listed = []
+
+    def list_notebooks(self, path):
+        self.listed.append(path)
+        return super().list_notebooks(path)
+
+
+class FailingManager(CountingManager):
+    """ list_notebooks raises for paths in `failing` """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failing = set()
+
+    def list_notebooks(self, path):
+        if path in self.failing:
+            raise PermissionError(path)
+        return super().list_notebooks(path)
+
+
+class SlowManager(BundleNotebookManager):
+    """ list_notebooks blocks until released """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = threading.Event()
+
+    def list_notebooks(self, path):
+        if path:
+            self.release.wait(5)
+        return super().list_notebooks(path)
+
+
+class FakeWatcher(object):
+    def __init__(self):
+        self.callbacks = {}
+
+    def watch(self, path, callback):
+        self.callbacks[path] = callback
+
+    def unwatch(self, path):
+        del self.callbacks[path]
+
+
+def names(notebooks):
+    return [nb['path'] for nb in notebooks]
+
+
+class TestWorkareaIndex:
+
+    def test_sorted(self):
+        with workarea() as td:
+            index = WorkareaIndex(BundleNotebookManager(root_dir=td))
+            assert index.refresh()
+            assert names(index.notebooks) == [
+                'a/sub/two.ipynb', 'b/three.ipynb', 'a/one.ipynb']
+            assert not index.refresh()
+            assert index.version == 1
+
+    def test_incremental(self):
+        with workarea() as td:
+            manager = CountingManager(root_dir=td)
+            index = WorkareaIndex(manager)
+            index.refresh()
+            assert sorted(manager.listed) == ['', 'a', 'a/sub', 'b']
+
+            del manager.listed[:]
+            make_notebook(td, 'b/four.ipynb', 2500)
+            touch_dir(td, 'b', 5000)
+            assert index.refresh()
+            # only the changed dir was listed
+            assert manager.listed == ['b']
+            assert names(index.notebooks) == [
+                'a/sub/two.ipynb', 'b/four.ipynb', 'b/three.ipynb',
+                'a/one.ipynb']
+
+            shutil.rmtree(os.path.join(td, 'a', 'sub'))
+            touch_dir(td, 'a', 6000)
+            assert index.refresh()
+            assert names(index.notebooks) == [
+                'b/four.ipynb', 'b/three.ipynb', 'a/one.ipynb']
+
+    def test_resort(self):
+        with workarea() as td:
+            index = WorkareaIndex(BundleNotebookManager(root_dir=td))
+            index.resort_threshold = 0
+            index.refresh()
+            make_notebook(td, 'a/five.ipynb', 500)
+            touch_dir(td, 'a', 5000)
+            index.refresh()
+            assert names(index.notebooks) == [
+                'a/sub/two.ipynb', 'b/three.ipynb', 'a/one.ipynb',
+                'a/five.ipynb']
+
+    def test_max_age(self):
+        with workarea() as td:
+            manager = CountingManager(root_dir=td)
+            index = WorkareaIndex(manager, max_age=0)
+            index.refresh()
+            del manager.listed[:]
+            # in place edit. the dir mtime doesn't change
+            make_notebook(td, 'b/three.ipynb', 4000)
+            index.refresh()
+            assert 'b' in manager.listed
+            assert names(index.notebooks)[0] == 'b/three.ipynb'
+
+    def test_list_error(self):
+        with workarea() as td:
+            manager = FailingManager(root_dir=td)
+            index = WorkareaIndex(manager, max_age=None)
+            index.refresh()
+            before = names(index.notebooks)
+
+            # a failed relist keeps the old subtree and retries next time
+            manager.failing.add('a')
+            index.invalidate('a')
+            index.refresh()
+            assert names(index.notebooks) == before
+            manager.failing.clear()
+            del manager.listed[:]
+            index.refresh()
+            assert 'a' in manager.listed
+
+            # a dir that never listed isn't stored as empty
+            make_notebook(td, 'c/new.ipynb', 9000)
+            touch_dir(td, '', 9000)
+            manager.failing.add('c')
+            index.refresh()
+            assert 'c' not in index._dirs
+            manager.failing.clear()
+            index.refresh()
+            assert names(index.notebooks)[0] == 'c/new.ipynb'
+
+    def test_watcher(self):
+        with workarea() as td:
+            watcher = FakeWatcher()
+            manager = CountingManager(root_dir=td)
+            index = WorkareaIndex(manager, watcher=watcher, max_age=None)
+            index.refresh()
+            del manager.listed[:]
+
+            make_notebook(td, 'b/four.ipynb', 2500)
+            # nothing reported yet
+            assert not index.refresh()
+            watcher.callbacks[os.path.join(td, 'b')](os.path.join(td, 'b'))
+            assert index.refresh()
+            assert manager.listed == ['b']
+
+
+class TestCrawl:
+
+    def test_matches_serial(self):
+        with workarea() as td1, workarea() as td2:
+            serial = WorkareaIndex(BundleNotebookManager(root_dir=td1))
+            serial.refresh()
+            indexes = {
+                'w1': WorkareaIndex(BundleNotebookManager(root_dir=td1)),
+                'w2': WorkareaIndex(BundleNotebookManager(root_dir=td2)),
+            }
+            with ThreadPoolExecutor(4) as executor:
+                timed_out = crawl(indexes, executor, timeout=10)
+            assert timed_out == set()
+            assert names(indexes['w1'].notebooks) == names(serial.notebooks)
+            assert len(indexes['w2']) == 3
+
+    def test_timeout(self):
+        with workarea() as td1, workarea() as td2:
+            slow = SlowManager(root_dir=td2)
+            indexes = {
+                'fast': WorkareaIndex(BundleNotebookManager(root_dir=td1)),
+                'slow': WorkareaIndex(slow),
+            }
+            executor = ThreadPoolExecutor(4)
+            try:
+                start = time.monotonic()
+                timed_out = crawl(indexes, executor, timeout=.2)
+                assert time.monotonic() - start < 2
+                assert timed_out == set(['slow'])
+                # fast root is complete. slow one has what it got so far
+                assert len(indexes['fast']) == 3
+                assert len(indexes['slow']) == 0
+                assert '' in indexes['slow']._dirs
+
+                slow.release.set()
+                assert crawl(indexes, executor, timeout=5) == set()
+                assert len(indexes['slow']) == 3
+            finally:
+                slow.release.set()
+                executor.shutdown()
+
+
+class TestWorkareaManager:
+
+    def test_list_notebooks(self):
+        with workarea() as td1, workarea() as td2:
+            make_notebook(td2, 'c/newest.ipynb', 9000)
+            wm = WorkareaManager(workarea_paths={'w1': td1, 'w2': td2})
+            notebooks = wm.list_notebooks('')
+            assert len(notebooks) == 7
+            assert notebooks[0]['path'] == 'c/newest.ipynb'
+            assert notebooks[0]['name'].startswith('1. ')
+            key = notebooks[0]['key']
+            assert wm.notebook_registry[key]['manager_path'] == 'w2'
+
+            # unchanged workareas are served from the cached listing
+            listing = wm._listing
+            notebooks[0]['name'] = 'changed'
+            again = wm.list_notebooks('')
+            assert wm._listing is listing
+            assert again[0]['name'].startswith('1. ')
+            assert again[0]['key'] == key
+
+    def test_list_notebooks_limit(self):
+        with workarea() as td1, workarea() as td2:
+            wm = WorkareaManager(workarea_paths={'w1': td1, 'w2': td2})
+            top = wm.list_notebooks('', limit=2)
+            assert [nb['path'] for nb in top] == ['a/sub/two.ipynb'] * 2
+            # numbered against the whole listing
+            assert top[0]['name'].startswith('1. ')
+            # only the page was built
+            assert wm._listing == (None, None)
+
+            full = wm.list_notebooks('')
+            assert len(full) == 6
+            assert [nb['key'] for nb in full[:2]] == [nb['key'] for nb in top]
+            # the full listing is sliced once built
+            assert wm.list_notebooks('', limit=3) == full[:3]
+
+            by_name = wm.list_notebooks('', limit=1, sort='-name')
+            assert by_name[0]['name'] == max(nb['name'] for nb in full)
+
+    def test_registry_survives_restart(self):
+        with workarea() as td:
+            db = os.path.join(td, 'registry.sqlite')
+            paths = {'w1': os.path.join(td, 'a')}
+            config = Config({'WorkareaManager': {'registry_path': db}})
+            wm = WorkareaManager(workarea_paths=paths, config=config)
+            notebooks = wm.list_notebooks('')
+            key = notebooks[0]['key']
+            name = notebooks[0]['name']
+
+            wm = WorkareaManager(workarea_paths=paths, config=config)
+            # resolves without listing first
+            entry = wm.get_entry('w1/' + name)
+            assert entry['key'] == key
+
+            # deleted notebooks are pruned
+            shutil.rmtree(os.path.join(td, 'a', 'sub'))
+            assert wm.notebook_registry.prune(wm._entry_exists) == [key]
@@ -1,4 +1,5 @@
 import inspect
+import functools
 
 def _path_split(path):
     bits = path.rsplit('/', 1)
@@ -8,26 +9,65 @@ def _path_split(path):
         path = bits[0]
     return name, path
 
-def get_invoked_arg(func, name, args, kwargs):
-    var = None
-    if name in kwargs:
-        var = kwargs[name]
-        return var
+class ArgMap(object):
+    """
+    Positions of a function's arguments, not counting self. Built once per
+    function by arg_map so callers don't inspect on every call.
+    """
+    def __init__(self, func):
+        argspec = inspect.getfullargspec(func)
+        args = argspec.args
+        # we're assuming self is not in *args for method calls
+        if args and args[0] == 'self':
+            args = args[1:]
+        self.args = args
+        self.positions = dict((arg, i) for i, arg in enumerate(args))
+        self.num_args = len(args)
+        self.defaults_len = len(argspec.defaults or ())
+
+    def __contains__(self, name):
+        return name in self.positions
+
+    def get(self, name, args, kwargs):
+        if name in kwargs:
+            return kwargs[name]
+
+        index = self.positions.get(name)
+        if index is None:
+            raise Exception('{name} was not found in invoked function'.format(name=name))
+        return args[index]
+
+    def set(self, name, value, args, kwargs):
+        # assume that if var is in kwargs, it should stay there.
+        # possible that source func had name in kwargs, but target has
+        # the name in args (positionally). not handling for now
+        index = self.positions.get(name)
+        if index is None or name in kwargs:
+            kwargs[name] = value
+            return
+
+        if len(args) == self.num_args:
+            args[index] = value
+        elif len(args) == index:
+            args.append(value)
+        elif len(args) + self.defaults_len >= self.num_args:
+            args[index] = value
+        else:
+            args.insert(index, value)
+
+@functools.lru_cache(maxsize=None)
+def _arg_map(func):
+    return ArgMap(func)
 
+def arg_map(func):
     # handle functools.wraps functions. specifically the middleware
-    if hasattr(func, '__wrapped__'):
-        argspec = inspect.getargspec(func.__wrapped__)
-    else:
-        argspec = inspect.getargspec(func)
-    if name not in argspec.args:
-        raise Exception('{name} was not found in invoked function'.format(name=name))
+    func = getattr(func, '__wrapped__', func)
+    # bound methods share the map of their function
+    func = getattr(func, '__func__', func)
+    return _arg_map(func)
 
-    index = argspec.args.index(name)
-    # we're assuming self is not in *args for method calls
-    if argspec.args[0] == 'self':
-        index -= 1
-    var = args[index]
-    return var
+def get_invoked_arg(func, name, args, kwargs):
+    return arg_map(func).get(name, args, kwargs)
 
 def set_invoked_arg(func, name, value, args, kwargs):
     """
@@ -38,38 +78,5 @@ def set_invoked_arg(func, name, value, args, kwargs):
     if isinstance(args, tuple):
         raise Exception("args must be a list")
 
-    # handle functools.wraps functions. specifically the middleware
-    if hasattr(func, '__wrapped__'):
-        argspec = inspect.getargspec(func.__wrapped__)
-    else:
-        argspec = inspect.getargspec(func)
-
-    # assume that if var is in kwargs, it should stay there.
-    # possible that source func had name in kwargs, but target has
-    # the name in args (positionally). not handling for now
-    if name in kwargs or name not in argspec.args:
-        kwargs[name] = value
-        return
-
-    index = argspec.args.index(name)
-    num_args = len(argspec.args)
-    # we're assuming self is not in args for method calls
-    if argspec.args[0] == 'self':
-        index -= 1
-        num_args -= 1
-
-    defaults_len = 0
-    if argspec.defaults:
-        defaults_len = len(argspec.defaults)
-
-    if len(args) == num_args:
-        args[index] = value
-    elif len(args) == index: # 
-        args.append(value)
-    elif len(args) + defaults_len >= num_args:
-        args[index] = value
-    else:
-        args.insert(index, value)
-
+    arg_map(func).set(name, value, args, kwargs)
     return args, kwargs
-
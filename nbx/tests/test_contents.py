@@ -0,0 +1,40 @@
+import re
+
+import pytest
+from tornado import web
+
+from notebook.services.contents.handlers import TrustNotebooksHandler
+
+from nbx.handlers.contents import NBXContentsHandler, default_handlers
+
+
+class FakeHandler(object):
+    get_paging = NBXContentsHandler.get_paging
+
+    def __init__(self, **args):
+        self.args = args
+
+    def get_query_argument(self, name, default=None):
+        return self.args.get(name, default)
+
+
+def test_get_paging():
+    assert FakeHandler().get_paging() == {}
+    paging = FakeHandler(limit='10', offset='20', sort='name').get_paging()
+    assert paging == {'limit': 10, 'offset': 20, 'sort': 'name'}
+
+    for args in [{'limit': '-1'}, {'offset': 'x'}, {'sort': 'size'}]:
+        with pytest.raises(web.HTTPError) as e:
+            FakeHandler(**args).get_paging()
+        assert e.value.status_code == 400
+
+
+def test_routes():
+    """ trust and checkpoint urls aren't swallowed by the contents route """
+    def route(url):
+        for pattern, handler in default_handlers:
+            if re.match(pattern + '$', url):
+                return handler
+
+    assert route('/api/contents/w1/nb.ipynb/trust') is TrustNotebooksHandler
+    assert route('/api/contents/w1/nb.ipynb') is NBXContentsHandler
@@ -0,0 +1,265 @@
+import time
+import asyncio
+import threading
+from queue import Queue
+
+import pytest
+
+import nbx.kernel_client as kernel_client
+from nbx.kernel_client import run_cell, KernelClient, KernelClientPool
+
+
+def make_msg(msg_type, parent_id, content):
+    return {
+        'header': {'msg_type': msg_type},
+        'parent_header': {'msg_id': parent_id},
+        'content': content,
+    }
+
+
+class FakeClient(object):
+    """
+    Stand-in for jupyter_client's BlockingKernelClient. Executing a cell
+    queues a canned reply and iopub messages.
+    """
+    def __init__(self, result=None, respond=True):
+        self.result = result
+        self.respond = respond
+        self.shell = Queue()
+        self.iopub = Queue()
+        self.count = 0
+        self.started = False
+
+    def start_channels(self):
+        self.started = True
+
+    def stop_channels(self):
+        self.started = False
+
+    def execute(self, code, store_history=True):
+        self.count += 1
+        msg_id = 'msg-{0}'.format(self.count)
+        if not self.respond:
+            return msg_id
+        self.iopub.put(make_msg('status', msg_id, {'execution_state': 'busy'}))
+        self.iopub.put(make_msg('stream', msg_id, {'text': 'printed'}))
+        if self.result is not None:
+            self.iopub.put(make_msg('execute_result', msg_id,
+                                    {'data': self.result}))
+        self.iopub.put(make_msg('status', msg_id, {'execution_state': 'idle'}))
+        self.shell.put(make_msg('execute_reply', msg_id,
+                                {'status': 'ok', 'payload': []}))
+        return msg_id
+
+    def get_shell_msg(self, timeout=None):
+        return self.shell.get(timeout=timeout)
+
+    def get_iopub_msg(self, timeout=None):
+        return self.iopub.get(timeout=timeout)
+
+
+class TestRunCell:
+
+    def test_run_cell(self):
+        client = FakeClient(result={'text/plain': "'123'"})
+        data = run_cell(client, "'123'")
+        assert data == {'text/plain': "'123'"}
+        assert client.shell.empty()
+        assert client.iopub.empty()
+
+    def test_empty_cell(self):
+        client = FakeClient()
+        assert run_cell(client, '  ') is None
+        assert client.count == 0
+
+    def test_no_result(self):
+        client = FakeClient()
+        assert run_cell(client, 'x = 1') is None
+
+    def test_stale_messages(self):
+        """
+        Messages left over from earlier requests are skipped
+        """
+        client = FakeClient(result={'text/plain': 'old'})
+        client.execute('old')
+        client.result = {'text/plain': 'new'}
+        data = run_cell(client, 'new')
+        assert data == {'text/plain': 'new'}
+
+    def test_timeout(self):
+        client = FakeClient(respond=False)
+        start = time.monotonic()
+        with pytest.raises(TimeoutError):
+            run_cell(client, '1', timeout=.1)
+        assert time.monotonic() - start < 1
+
+    def test_kernel_client(self):
+        client = FakeClient(result={'text/plain': '1'})
+        kc = KernelClient(client, timeout=5)
+        assert client.started
+        assert kc.execute('1') == {'text/plain': '1'}
+        kc.exit()
+        assert not client.started
+
+
+    def test_drains_idle_output(self):
+        client = FakeClient(result={'text/plain': '1'})
+        kc = KernelClient(client, timeout=5)
+        # broadcast output from other requests while the client sat idle
+        for i in range(50):
+            client.iopub.put(make_msg('stream', 'other', {'text': 'x'}))
+        assert kc.execute('1') == {'text/plain': '1'}
+        assert client.iopub.empty()
+
+
+class TestKernelClientPool:
+
+    def test_reuse(self):
+        made = []
+        def factory():
+            client = FakeClient(result={'text/plain': '1'})
+            made.append(client)
+            return client
+
+        pool = KernelClientPool()
+        kc = pool.get('k1', factory)
+        assert pool.get('k1', factory) is kc
+        assert len(made) == 1
+        assert made[0].started
+
+        pool.get('k2', factory)
+        assert len(made) == 2
+        assert len(pool) == 2
+
+        pool.discard('k1')
+        assert 'k1' not in pool
+        assert not made[0].started
+
+        pool.clear()
+        assert len(pool) == 0
+        assert not made[1].started
+
+    def test_idle_eviction(self):
+        pool = KernelClientPool(idle_timeout=60)
+        client = FakeClient()
+        pool.get('k1', lambda: client)
+        # age the entry
+        pool._clients['k1'][1] -= 120
+
+        pool.get('k2', FakeClient)
+        assert 'k1' not in pool
+        assert not client.started
+        assert 'k2' in pool
+
+
+    def test_slow_start_doesnt_block_other_kernels(self):
+        release = threading.Event()
+
+        class StuckClient(FakeClient):
+            def wait_for_ready(self, timeout=None):
+                release.wait(5)
+
+        pool = KernelClientPool()
+        stuck = threading.Thread(target=pool.get,
+                                 args=('busy', StuckClient))
+        stuck.start()
+        try:
+            start = time.monotonic()
+            pool.get('k2', FakeClient)
+            assert time.monotonic() - start < 1
+        finally:
+            release.set()
+            stuck.join()
+        assert 'busy' in pool
+
+    def test_ready_timeout(self):
+        class DeadClient(FakeClient):
+            def wait_for_ready(self, timeout=None):
+                raise RuntimeError("Kernel didn't respond in 1 seconds")
+
+        client = DeadClient()
+        with pytest.raises(TimeoutError):
+            KernelClientPool().get('k1', lambda: client)
+        assert not client.started
+
+
+class SlowClient(FakeClient):
+    """ Kernel that takes `delay` seconds to run anything """
+    def __init__(self, delay, log, **kwargs):
+        super(SlowClient, self).__init__(**kwargs)
+        self.delay = delay
+        self.log = log
+
+    def execute(self, code, store_history=True):
+        self.log.append(('start', code))
+        time.sleep(self.delay)
+        self.log.append(('end', code))
+        return super(SlowClient, self).execute(code, store_history)
+
+
+class FakeKernelManager(object):
+    def __init__(self, delay):
+        self.delay = delay
+        self.log = []
+
+    def get_kernel(self, kernel_id):
+        km = self
+        class Kernel(object):
+            def client(self):
+                return SlowClient(km.delay, km.log,
+                                  result={'text/plain': kernel_id})
+        return Kernel()
+
+
+class TestExecuteAsync:
+
+    def teardown_method(self, method):
+        kernel_client.client_pool.clear()
+
+    def test_loop_stays_responsive(self):
+        """
+        A slow kernel round trip shouldn't stall other work on the loop
+        """
+        km = FakeKernelManager(delay=.5)
+
+        async def ticker(lags):
+            # stands in for other requests being served
+            while True:
+                start = time.monotonic()
+                await asyncio.sleep(.01)
+                lags.append(time.monotonic() - start)
+
+        async def main():
+            lags = []
+            tick = asyncio.ensure_future(ticker(lags))
+            data = await kernel_client.execute_async(km, 'k1', 'slow')
+            tick.cancel()
+            return data, lags
+
+        data, lags = asyncio.run(main())
+        assert data == {'text/plain': 'k1'}
+        assert len(lags) > 10
+        assert max(lags) < .25
+
+    def test_per_kernel_limit(self):
+        km = FakeKernelManager(delay=.2)
+
+        async def main():
+            jobs = [
+                kernel_client.execute_async(km, 'k1', 'a'),
+                kernel_client.execute_async(km, 'k1', 'b'),
+                kernel_client.execute_async(km, 'k2', 'c'),
+            ]
+            return await asyncio.gather(*jobs)
+
+        start = time.monotonic()
+        results = asyncio.run(main())
+        elapsed = time.monotonic() - start
+        assert [r['text/plain'] for r in results] == ['k1', 'k1', 'k2']
+
+        # same kernel runs one at a time
+        log = [entry for entry in km.log if entry[1] in ('a', 'b')]
+        assert [event for event, code in log] == ['start', 'end',
+                                                  'start', 'end']
+        # different kernels overlap
+        assert elapsed < .55
@@ -0,0 +1,140 @@
+import os
+import asyncio
+
+import zmq
+from mock import Mock, patch
+
+import nbx.nbmanager.metamanager as metamanager
+
+from nbx.kernel_state import KernelStateTracker, STATE_TOPIC
+from nbx.extensions.track_cwd import CwdTracker, load_ipython_extension
+
+
+def cwd_msg(cwd, msg_type='nbx_state'):
+    return {'header': {'msg_type': msg_type}, 'content': {'cwd': cwd}}
+
+
+class TestKernelStateTracker:
+
+    def test_cwd(self):
+        tracker = KernelStateTracker()
+        assert tracker.get_cwd('k1') is None
+
+        tracker.set_cwd('k1', '/start')
+        assert tracker.get_cwd('k1') == '/start'
+
+        tracker.handle_msg('k1', cwd_msg('/moved'))
+        assert tracker.get_cwd('k1') == '/moved'
+
+        # other messages are ignored
+        tracker.handle_msg('k1', cwd_msg('/nope', msg_type='stream'))
+        assert tracker.get_cwd('k1') == '/moved'
+
+        tracker.forget('k1')
+        assert tracker.get_cwd('k1') is None
+
+    def test_execution_key(self):
+        tracker = KernelStateTracker()
+        tracker.started('k1', '/start')
+        # extension hasn't reported yet
+        assert tracker.get_execution_key('k1') is None
+        assert not tracker.is_reporting('k1')
+
+        msg = cwd_msg('/moved')
+        msg['content'].update({'execution_count': 3, 'session': 's1'})
+        tracker.handle_msg('k1', msg)
+        assert tracker.get_execution_key('k1') == ('s1', 3)
+        assert tracker.is_reporting('k1')
+
+        tracker.restarted('k1')
+        assert tracker.get_execution_key('k1') is None
+        assert not tracker.is_reporting('k1')
+        # back where it started
+        assert tracker.get_cwd('k1') == '/start'
+
+    def test_watch(self):
+        tracker = KernelStateTracker()
+        kernel = Mock()
+        stream = kernel.connect_iopub.return_value
+        tracker.watch('k1', kernel)
+        assert tracker.is_watching('k1')
+        # subscribed to our topic only
+        stream.socket.setsockopt.assert_called_with(
+            zmq.SUBSCRIBE, STATE_TOPIC)
+
+        # a message off the wire updates the cwd
+        kernel.session.feed_identities.return_value = ([STATE_TOPIC], ['msg'])
+        kernel.session.deserialize.return_value = cwd_msg('/wire')
+        on_recv = stream.on_recv.call_args[0][0]
+        on_recv([STATE_TOPIC, 'msg'])
+        assert tracker.get_cwd('k1') == '/wire'
+
+        tracker.forget('k1')
+        assert not tracker.is_watching('k1')
+        assert stream.close.called
+
+
+class TestTrackCwdExtension:
+
+    def test_publish_on_change(self):
+        shell = Mock()
+        shell.execution_count = 1
+        shell.kernel.session.session = 'session-1'
+        load_ipython_extension(shell)
+        send = shell.kernel.session.send
+        # starting cwd is reported on load
+        assert send.call_count == 1
+        args, kwargs = send.call_args
+        assert args[1] == 'nbx_state'
+        assert args[2] == {'cwd': os.getcwd(), 'execution_count': 1,
+                           'session': 'session-1'}
+        assert kwargs['ident'] == STATE_TOPIC
+
+        post_execute = shell.events.register.call_args[0][1]
+        post_execute()
+        # unchanged, nothing sent
+        assert send.call_count == 1
+
+        shell.execution_count = 2
+        post_execute()
+        assert send.call_count == 2
+        assert send.call_args[0][2]['execution_count'] == 2
+
+    def test_no_kernel(self):
+        shell = Mock(spec=['events', 'execution_count'])
+        shell.execution_count = 1
+        tracker = CwdTracker(shell)
+        # plain IPython. nothing to publish to
+        tracker.post_execute()
+        assert tracker.cwd == os.getcwd()
+
+
+class TestStartKernel:
+
+    def start(self, python):
+        async def fake_start(self, kernel_id=None, path=None, **kwargs):
+            return 'k1'
+
+        km = Mock()
+        km.nbx_track_cwd = True
+        km.cwd_for_path.return_value = '/start'
+        tracker = KernelStateTracker()
+        with patch.object(metamanager, '_start_kernel', fake_start), \
+                patch.object(metamanager, '_is_python_kernel',
+                             return_value=python), \
+                patch.object(metamanager.kernel_state, 'tracker', tracker):
+            asyncio.run(metamanager.start_kernel(km, path='nb'))
+        return tracker
+
+    def test_tracked(self):
+        tracker = self.start(python=True)
+        assert tracker.is_watching('k1')
+        assert tracker.get_cwd('k1') == '/start'
+        # not trusted until the extension reports
+        assert not tracker.is_reporting('k1')
+
+    def test_untracked(self):
+        # nothing would tell us about a %cd. kernel-info has to ask
+        tracker = self.start(python=False)
+        assert not tracker.is_watching('k1')
+        assert tracker.get_cwd('k1') is None
@@ -0,0 +1,271 @@
+import asyncio
+import logging
+
+import mock
+import pytest
+from tornado import web
+
+import nbx.handlers.standalone as standalone
+from nbx.handlers.standalone import (
+    StandaloneHandler,
+    RenderCache,
+    send_html_chunk,
+    CHUNK_MIMETYPE,
+)
+from nbx.kernel_state import KernelStateTracker
+
+
+class Report(object):
+    def __init__(self, html):
+        self.html = html
+        self.renders = 0
+
+    def to_html(self):
+        self.renders += 1
+        return self.html
+
+
+class FakeKernel(object):
+    """
+    Runs send_html_chunk in process, the way the kernel would for
+    CHUNK_CODE_FMT.
+    """
+    def __init__(self, objs, fail_at=None):
+        self.objs = objs
+        self.calls = 0
+        self.fail_at = fail_at
+
+    async def execute_async(self, km, kernel_id, code, store_history=True,
+                            mimetype=None):
+        self.calls += 1
+        if self.calls == self.fail_at:
+            # as if the kernel raised
+            return None
+        published = []
+        with mock.patch('IPython.display.publish_display_data',
+                        published.append):
+            exec(code, dict(self.objs))
+        return published[0] if published else None
+
+
+class FakeHandler(object):
+    kernel_manager = None
+    log = logging.getLogger(__name__)
+    stream_html = StandaloneHandler.stream_html
+    fetch_chunk = StandaloneHandler.fetch_chunk
+    discard_stream = StandaloneHandler.discard_stream
+
+    def __init__(self, chunk_size, if_none_match=None):
+        self.chunk_size = chunk_size
+        self.if_none_match = if_none_match
+        self.written = []
+        self.flushes = 0
+        self.finished = False
+        self.status = 200
+        self.headers = {}
+        self.request = mock.Mock()
+        self.session_manager = mock.Mock()
+        self.session_manager.get_session.return_value = {
+            'kernel': {'id': 'k1'}}
+
+    def write(self, chunk):
+        self.written.append(chunk)
+
+    async def flush(self):
+        self.flushes += 1
+
+    def finish(self, chunk=None):
+        if chunk is not None:
+            self.write(chunk)
+        self.finished = True
+
+    def set_header(self, name, value):
+        self.headers[name] = value
+
+    def set_status(self, status):
+        self.status = status
+
+    def check_etag_header(self):
+        return self.if_none_match == self.headers.get('Etag')
+
+
+def stream(report, chunk_size, fail_at=None):
+    kernel = FakeKernel({'report': report}, fail_at=fail_at)
+    handler = FakeHandler(chunk_size)
+    with mock.patch.object(standalone.kernel_client, 'execute_async',
+                           kernel.execute_async):
+        asyncio.run(StandaloneHandler.stream_html(handler, 'k1', 'report',
+                                                  'to_html'))
+    return handler, kernel
+
+
+class TestStreamHtml:
+
+    def test_chunks(self):
+        html = ''.join(str(i % 10) for i in range(1050))
+        report = Report(html)
+        handler, kernel = stream(report, chunk_size=100)
+
+        assert ''.join(handler.written) == html
+        assert max(len(chunk) for chunk in handler.written) == 100
+        assert len(handler.written) == 11
+        assert handler.flushes == 11
+        assert handler.finished
+        # rendered once, not once per chunk
+        assert report.renders == 1
+        # kernel side cache was cleaned up
+        assert not standalone._html_streams
+
+    def test_exact_multiple(self):
+        report = Report('a' * 200)
+        handler, kernel = stream(report, chunk_size=100)
+        assert handler.written == ['a' * 100, 'a' * 100]
+
+    def test_empty(self):
+        report = Report('')
+        handler, kernel = stream(report, chunk_size=100)
+        assert handler.written == ['']
+        assert handler.finished
+
+    def test_first_chunk_fails(self):
+        report = Report('a' * 250)
+        with pytest.raises(web.HTTPError) as e:
+            stream(report, chunk_size=100, fail_at=1)
+        assert e.value.status_code == 500
+
+    def test_later_chunk_fails(self):
+        report = Report('a' * 250)
+        handler, kernel = stream(report, chunk_size=100, fail_at=2)
+        # the 200 already went out. drop the connection instead of
+        # finishing a truncated page
+        assert handler.written == ['a' * 100]
+        assert not handler.finished
+        assert handler.request.connection.close.called
+        # and the kernel was told to let go of the html
+        assert kernel.calls == 3
+        assert not standalone._html_streams
+
+
+class TestRenderCache:
+
+    def test_lru(self):
+        cache = RenderCache(max_size=10, max_entry_size=6)
+        cache.put('a', 'aaaa')
+        cache.put('b', 'bbbb')
+        assert cache.get('a') == 'aaaa'
+        # over max_size. 'b' is least recently used
+        cache.put('c', 'cccc')
+        assert cache.get('b') is None
+        assert cache.get('c') == 'cccc'
+        assert cache.size == 8
+        # too big to cache at all
+        cache.put('d', 'ddddddd')
+        assert cache.get('d') is None
+        assert cache.stats()['hits'] == 2
+
+    def test_invalidate_kernel(self):
+        cache = RenderCache()
+        cache.put(('k1', 'report', 'to_html', 's', 1), 'one')
+        cache.put(('k2', 'report', 'to_html', 's', 1), 'two')
+        cache.invalidate_kernel('k1')
+        assert cache.get(('k1', 'report', 'to_html', 's', 1)) is None
+        assert cache.get(('k2', 'report', 'to_html', 's', 1)) == 'two'
+        assert cache.size == 3
+
+    def test_etag(self):
+        key = ('k1', 'report', 'to_html', 's', 1)
+        assert RenderCache.etag(key) == RenderCache.etag(key)
+        assert RenderCache.etag(key) != RenderCache.etag(key[:-1] + (2,))
+
+
+class TestCachedGet:
+
+    def setup_method(self, method):
+        self.tracker = KernelStateTracker()
+        self.cache = RenderCache()
+        self.report = Report('a' * 250)
+        self.kernel = FakeKernel({'report': self.report})
+        self.patches = [
+            mock.patch.object(standalone, 'tracker', self.tracker),
+            mock.patch.object(standalone, 'render_cache', self.cache),
+            mock.patch.object(standalone.kernel_client, 'execute_async',
+                              self.kernel.execute_async),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def teardown_method(self, method):
+        for patch in self.patches:
+            patch.stop()
+
+    def get(self, if_none_match=None):
+        handler = FakeHandler(100, if_none_match=if_none_match)
+        get = StandaloneHandler.get.__wrapped__
+        asyncio.run(get(handler, 'nb.ipynb', 'nb.ipynb', 'report', 'to_html'))
+        return handler
+
+    def executed(self, count):
+        self.tracker.update('k1', {'execution_count': count,
+                                   'session': 's1'})
+
+    def test_untracked_kernel(self):
+        # no execution count, no caching
+        self.get()
+        handler = self.get()
+        assert ''.join(handler.written) == 'a' * 250
+        assert 'Etag' not in handler.headers
+        assert self.report.renders == 2
+
+    def test_cache_hit(self):
+        self.executed(1)
+        first = self.get()
+        assert self.report.renders == 1
+        second = self.get()
+        assert ''.join(second.written) == 'a' * 250
+        assert second.headers['Etag'] == first.headers['Etag']
+        # served from cache. kernel wasn't asked
+        assert self.report.renders == 1
+        assert self.kernel.calls == 3
+
+    def test_not_modified(self):
+        self.executed(1)
+        etag = self.get().headers['Etag']
+        handler = self.get(if_none_match=etag)
+        assert handler.status == 304
+        assert handler.written == []
+
+        # user ran a cell. rerender
+        self.executed(2)
+        handler = self.get(if_none_match=etag)
+        assert handler.status == 200
+        assert handler.headers['Etag'] != etag
+        assert self.report.renders == 2
+
+    def test_too_big(self):
+        self.cache.max_entry_size = 200
+        self.executed(1)
+        self.get()
+        self.get()
+        assert self.report.renders == 2
+        assert self.cache.size == 0
+
+
+class TestSendHtmlChunk:
+
+    def test_abandoned_streams(self):
+        published = []
+        with mock.patch('IPython.display.publish_display_data',
+                        published.append):
+            for i in range(standalone.MAX_HTML_STREAMS + 2):
+                send_html_chunk(Report('abcd'), 'to_html', str(i), 0, 2)
+        assert len(standalone._html_streams) == standalone.MAX_HTML_STREAMS
+        assert published[0][CHUNK_MIMETYPE] == {'chunk': 'ab', 'done': False}
+        standalone._html_streams.clear()
+
+    def test_error_drops_stream(self):
+        def publish(data):
+            raise ValueError('publish failed')
+        with mock.patch('IPython.display.publish_display_data', publish):
+            with pytest.raises(ValueError):
+                send_html_chunk(Report('abcd'), 'to_html', 't', 0, 2)
+        assert 't' not in standalone._html_streams